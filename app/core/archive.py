@@ -0,0 +1,195 @@
+"""Append-only segment files for records that have left Redis.
+
+Each segment is a sequence of length-prefixed records::
+
+    [payload length: u32][crc32 of payload: u32][payload]
+
+Records are indexed twice, in files sharded by a hash of the key and of the
+record id, with one ``key<TAB>score<TAB>id<TAB>segment<TAB>offset`` line per
+record. A query reads only the shard of its key or id, so no process holds
+the whole archive's index: per-key indexes are loaded on first use, kept for
+the most recently queried keys only, and extended with new lines from their
+shard on each query. Payloads stay on disk and are read through ``mmap`` only
+for the records a query returns. Every method blocks on file I/O; call them
+off the event loop.
+
+Writers take an exclusive ``flock`` so several workers (or processes) can
+append to the same directory. A record is indexed only after its payload is
+fsynced, so a crash mid-write leaves unindexed bytes, never a dangling index
+entry. The number of shards is part of the on-disk layout and must not change
+for an existing directory.
+"""
+from typing import Dict, List, Optional, Tuple, NamedTuple
+from collections import OrderedDict
+import bisect
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+_HEADER = struct.Struct(">II")
+
+class ArchiveEntry(NamedTuple):
+    score: float
+    id: str
+    segment: int
+    offset: int
+
+class _KeyIndex:
+    """One key's entries sorted by score, as read up to ``position`` of its shard."""
+
+    def __init__(self):
+        self.position = 0
+        self.scores: List[float] = []
+        self.entries: List[ArchiveEntry] = []
+        self.ids: Dict[str, ArchiveEntry] = {}
+
+    def add(self, entry: ArchiveEntry) -> None:
+        # A record archived twice (a retried batch) resolves to its latest copy,
+        # so pages never count one record twice
+        previous = self.ids.get(entry.id)
+        if previous is not None:
+            stale = self.entries.index(previous, bisect.bisect_left(self.scores, previous.score))
+            del self.scores[stale], self.entries[stale]
+        position = bisect.bisect_right(self.scores, entry.score)
+        self.scores.insert(position, entry.score)
+        self.entries.insert(position, entry)
+        self.ids[entry.id] = entry
+
+class SegmentArchive:
+    """Append-only, memory-mapped record storage with sharded key and id indexes."""
+
+    def __init__(
+        self,
+        directory: str,
+        segment_max_bytes: int = 64 * 1024 * 1024,
+        index_shards: int = 64,
+        cached_keys: int = 1024
+    ):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.index_shards = index_shards
+        self.cached_keys = cached_keys  # Per-key indexes kept in memory, least recently used dropped
+        self._keys: "OrderedDict[str, _KeyIndex]" = OrderedDict()
+        self._maps: Dict[int, mmap.mmap] = {}
+        self._lock = threading.Lock()
+
+    def append(self, records: List[Tuple[str, float, str, bytes]]) -> None:
+        """Durably append ``(key, score, id, payload)`` records."""
+        if not records:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, "lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            segment = self._writable_segment()
+            shards: Dict[str, List[str]] = {}
+            with open(self._segment_path(segment), "ab") as data:
+                offset = data.tell()
+                for key, score, record_id, payload in records:
+                    data.write(_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+                    line = f"{key}\t{score!r}\t{record_id}\t{segment}\t{offset}\n"
+                    shards.setdefault(self._shard_path("keys", key), []).append(line)
+                    shards.setdefault(self._shard_path("ids", record_id), []).append(line)
+                    offset += _HEADER.size + len(payload)
+                data.flush()
+                os.fsync(data.fileno())
+            for path, lines in shards.items():
+                with open(path, "a") as index:
+                    index.write("".join(lines))
+                    index.flush()
+                    os.fsync(index.fileno())
+
+    def entries(self, key: str, before: Optional[float] = None, limit: int = 20) -> List[ArchiveEntry]:
+        """Up to ``limit`` entries for ``key`` with score below ``before``, highest first."""
+        with self._lock:
+            index = self._key_index(key)
+            end = len(index.scores) if before is None else bisect.bisect_left(index.scores, before)
+            return index.entries[max(end - limit, 0):end][::-1]
+
+    def find(self, record_id: str) -> Optional[ArchiveEntry]:
+        """The entry for a record id, or None if it has not been archived."""
+        found = None
+        lines, _ = self._read_lines(self._shard_path("ids", record_id), 0, record_id, field=2)
+        for _, entry in lines:
+            found = entry  # The latest copy wins
+        return found
+
+    def read(self, entry: ArchiveEntry) -> bytes:
+        """The payload of one record, read from the mapped segment."""
+        mapped = self._map(entry.segment, entry.offset + _HEADER.size)
+        length, checksum = _HEADER.unpack_from(mapped, entry.offset)
+        start = entry.offset + _HEADER.size
+        if start + length > len(mapped):
+            mapped = self._map(entry.segment, start + length)
+        payload = mapped[start:start + length]
+        if zlib.crc32(payload) != checksum:
+            raise ValueError(f"Corrupt archive record at segment {entry.segment} offset {entry.offset}")
+        return payload
+
+    def close(self) -> None:
+        with self._lock:
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+            self._keys.clear()
+
+    def _key_index(self, key: str) -> _KeyIndex:
+        """A key's index, extended with lines appended since it was last read. Call holding the lock."""
+        index = self._keys.pop(key, None) or _KeyIndex()
+        lines, index.position = self._read_lines(self._shard_path("keys", key), index.position, key, field=0)
+        for _, entry in lines:
+            index.add(entry)
+        self._keys[key] = index
+        while len(self._keys) > self.cached_keys:
+            self._keys.popitem(last=False)
+        return index
+
+    def _read_lines(self, path: str, position: int, value: str, field: int) -> Tuple[List[Tuple[str, ArchiveEntry]], int]:
+        """Lines of a shard past ``position`` whose ``field`` is ``value``, and the new position."""
+        try:
+            with open(path, "rb") as index:
+                index.seek(position)
+                chunk = index.read()
+        except FileNotFoundError:
+            return [], position
+        # A writer may be mid-line; leave the partial line for the next read
+        complete = chunk[:chunk.rfind(b"\n") + 1]
+        matches = []
+        for line in complete.decode().splitlines():
+            if value not in line:
+                continue
+            fields = line.split("\t")
+            if fields[field] == value:
+                key, score, record_id, segment, offset = fields
+                matches.append((key, ArchiveEntry(float(score), record_id, int(segment), int(offset))))
+        return matches, position + len(complete)
+
+    def _writable_segment(self) -> int:
+        segment = 1
+        while os.path.exists(self._segment_path(segment + 1)):
+            segment += 1
+        path = self._segment_path(segment)
+        if os.path.exists(path) and os.path.getsize(path) >= self.segment_max_bytes:
+            segment += 1
+        return segment
+
+    def _map(self, segment: int, min_size: int) -> mmap.mmap:
+        with self._lock:
+            mapped = self._maps.get(segment)
+            if mapped is None or len(mapped) < min_size:
+                # The newest segment grows; remap it when a record lies past the mapped end
+                if mapped is not None:
+                    mapped.close()
+                with open(self._segment_path(segment), "rb") as data:
+                    mapped = mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps[segment] = mapped
+            return mapped
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"segment-{segment:06d}.log")
+
+    def _shard_path(self, kind: str, value: str) -> str:
+        shard = zlib.crc32(value.encode()) % self.index_shards
+        return os.path.join(self.directory, f"{kind}-{shard:03d}.idx")
@@ -0,0 +1,22 @@
+from fastapi.middleware.gzip import GZipMiddleware
+
+class CompressionMiddleware(GZipMiddleware):
+    """GZip middleware that leaves Server-Sent Events alone.
+
+    Compressing an event stream makes zlib hold tokens back until its
+    buffer fills, which defeats streaming.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and self._is_event_stream(scope):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+    def _is_event_stream(self, scope) -> bool:
+        if scope["path"].endswith("/stream"):
+            return True
+        for name, value in scope["headers"]:
+            if name == b"accept" and b"text/event-stream" in value:
+                return True
+        return False
@@ -9,24 +9,64 @@ load_dotenv()
 class Settings(BaseSettings):
     # API Configuration
     API_V1_STR: str = "/api/v1"
+    BASE_URL: str = os.getenv("BASE_URL", "http://localhost:8000")  # Public URL M-Pesa sends callbacks to
     PROJECT_NAME: str = "AI Terminal Recommender System"
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
     
     # AI Configuration
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL: str = "gpt-4-turbo-preview"
+    OPENAI_BASE_URL: Optional[str] = os.getenv("OPENAI_BASE_URL")  # Overrides the API host, e.g. a local stand-in
     LOCAL_LLM_ENABLED: bool = os.getenv("LOCAL_LLM_ENABLED", "false").lower() == "true"
     
+    # Near-duplicate cache of query analyses (per worker, in memory)
+    SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.85"))  # Cosine similarity; see benchmarks/semantic_cache_eval.py
+    SEMANTIC_CACHE_SIZE: int = int(os.getenv("SEMANTIC_CACHE_SIZE", "2048"))  # Entries, least recently used evicted first
+    SEMANTIC_CACHE_TTL: float = float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))  # Seconds
+    
+    # Conversation context kept in NLP prompts
+    CONTEXT_MAX_TURNS: int = int(os.getenv("CONTEXT_MAX_TURNS", "4"))
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "400"))
+    
     # M-Pesa Configuration
     MPESA_CONSUMER_KEY: str = os.getenv("MPESA_CONSUMER_KEY", "")
     MPESA_CONSUMER_SECRET: str = os.getenv("MPESA_CONSUMER_SECRET", "")
     MPESA_ENV: str = os.getenv("MPESA_ENV", "sandbox")
+    MPESA_BASE_URL: Optional[str] = os.getenv("MPESA_BASE_URL")  # Overrides the Daraja host, e.g. a local stand-in
     
     # Redis Configuration
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379")
     
+    # Background Workers
+    CALLBACK_WORKER_ENABLED: bool = os.getenv("CALLBACK_WORKER_ENABLED", "true").lower() == "true"
+    RECONCILIATION_WORKER_ENABLED: bool = os.getenv("RECONCILIATION_WORKER_ENABLED", "true").lower() == "true"
+    ARCHIVE_WORKER_ENABLED: bool = os.getenv("ARCHIVE_WORKER_ENABLED", "true").lower() == "true"
+    
+    # Transaction Archive (settled transactions older than the hot window move from Redis to disk)
+    ARCHIVE_DIR: str = os.getenv("ARCHIVE_DIR", "data/archive")  # Empty keeps everything in Redis
+    ARCHIVE_AFTER_HOURS: float = float(os.getenv("ARCHIVE_AFTER_HOURS", "24"))
+    
+    # Tip analytics rollups (daily counters, kept this long)
+    ANALYTICS_RETENTION_DAYS: int = int(os.getenv("ANALYTICS_RETENTION_DAYS", "400"))
+    
     # Rate Limiting
-    RATE_LIMIT_PER_MINUTE: int = 60
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_PER_MINUTE: int = 60  # Recommendation requests; cache-served ones cost a quarter
+    RATE_LIMIT_TIP_PER_MINUTE: int = int(os.getenv("RATE_LIMIT_TIP_PER_MINUTE", "10"))
+    RATE_LIMIT_STATUS_PER_MINUTE: int = int(os.getenv("RATE_LIMIT_STATUS_PER_MINUTE", "120"))
+    RATE_LIMIT_BATCH_PER_MINUTE: int = int(os.getenv("RATE_LIMIT_BATCH_PER_MINUTE", "5"))
+    
+    # Batch Recommendations
+    BATCH_NLP_CONCURRENCY: int = int(os.getenv("BATCH_NLP_CONCURRENCY", "10"))  # LLM calls in flight per batch
+    
+    # Logging
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")  # json or text
+    PARSE_ERROR_LOG_INTERVAL: float = float(os.getenv("PARSE_ERROR_LOG_INTERVAL", "60"))  # Seconds between parse-error summaries
+    
+    # Response Compression
+    GZIP_MINIMUM_SIZE: int = int(os.getenv("GZIP_MINIMUM_SIZE", "1000"))  # Bytes
     
     # CORS Configuration
     BACKEND_CORS_ORIGINS: list[str] = [
@@ -37,12 +77,29 @@ class Settings(BaseSettings):
         "https://your-production-domain.com"  # Production frontend
     ]
     
+    # Vendor hosts (overridable to point searches at a local stand-in)
+    JUMIA_BASE_URL: str = os.getenv("JUMIA_BASE_URL", "https://www.jumia.co.ke")
+    AMAZON_BASE_URL: str = os.getenv("AMAZON_BASE_URL", "https://www.amazon.com")
+    EBAY_BASE_URL: str = os.getenv("EBAY_BASE_URL", "https://www.ebay.com")
+    
+    # Prices (vendor prices are converted to PRICE_CURRENCY)
+    PRICE_CURRENCY: str = os.getenv("PRICE_CURRENCY", "KES")
+    FX_RATES: str = os.getenv("FX_RATES", "USD=1,KES=129.5")  # Units per USD, used until fetched rates arrive
+    FX_RATES_URL: Optional[str] = os.getenv("FX_RATES_URL")  # JSON {"base": ..., "rates": {...}}; unset keeps FX_RATES
+    FX_REFRESH_HOURS: float = float(os.getenv("FX_REFRESH_HOURS", "6"))
+    
     # Product API Keys
     JUMIA_API_KEY: Optional[str] = os.getenv("JUMIA_API_KEY")
     AMAZON_API_KEY: Optional[str] = os.getenv("AMAZON_API_KEY")
     
     # Sentry Configuration
     SENTRY_DSN: Optional[str] = os.getenv("SENTRY_DSN")
+    SENTRY_TRACES_SAMPLE_RATE: float = float(os.getenv("SENTRY_TRACES_SAMPLE_RATE", "0.1"))
+    SENTRY_MAX_TRACES_PER_SECOND: float = float(os.getenv("SENTRY_MAX_TRACES_PER_SECOND", "2"))  # Per worker; lowers the rate under load
+    
+    # Diagnostics
+    SERVER_TIMING_ENABLED: bool = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+    ADMIN_API_KEY: Optional[str] = os.getenv("ADMIN_API_KEY")  # Enables /admin endpoints when set
     
     class Config:
         case_sensitive = True
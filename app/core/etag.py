@@ -0,0 +1,29 @@
+from typing import Any, Optional
+import hashlib
+import orjson
+from fastapi import Request, Response
+
+def etag_for(body: bytes) -> str:
+    """Strong ETag for a response body."""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+def if_none_match(header: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches ``etag`` (weak comparison, per RFC 9110)."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = (candidate.strip() for candidate in header.split(","))
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+def etag_response(request: Request, content: Any) -> Response:
+    """Serialize ``content`` once, and answer 304 when the client already has it.
+
+    ``Cache-Control: no-cache`` makes browsers revalidate every time, so a
+    polling client pays for a full body only when the resource changed.
+    """
+    body = orjson.dumps(content)
+    headers = {"ETag": etag_for(body), "Cache-Control": "no-cache"}
+    if if_none_match(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,38 @@
+from typing import Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+class LazyService(Generic[T]):
+    """Module-level service handle that builds the service on first use.
+
+    Attribute reads and writes go to the underlying instance, so modules can
+    keep ``from .transactions import transaction_service`` without the import
+    constructing anything (Redis clients, HTTP clients, SDK configuration).
+    """
+
+    __slots__ = ("_factory", "_instance")
+
+    def __init__(self, factory: Callable[[], T]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+
+    def get(self) -> T:
+        """Return the service, constructing it on the first call."""
+        instance = self._instance
+        if instance is None:
+            instance = self._factory()
+            object.__setattr__(self, "_instance", instance)
+        return instance
+
+    @property
+    def is_built(self) -> bool:
+        return self._instance is not None
+
+    def __getattr__(self, name: str):
+        return getattr(self.get(), name)
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(self.get(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(self.get(), name)
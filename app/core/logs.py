@@ -0,0 +1,135 @@
+"""Structured, non-blocking logging.
+
+Application loggers (``app.*``) hand records to a queue; a background
+listener thread formats them and writes to stdout, so logging from the event
+loop never waits on the stream. Errors that repeat per item, such as vendor
+markup no longer matching a selector, go through an ``ErrorAggregator`` that
+logs one line with counts per interval instead of one line per occurrence.
+A flusher thread writes those summaries when they are due, so a burst of
+errors followed by quiet is still logged.
+"""
+from typing import List, Optional, Tuple, TextIO
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+
+FLUSH_TICK = 1.0  # Seconds between checks for aggregated counts that are due
+
+# Attributes every LogRecord has; anything else was passed in ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS})
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class _FieldsQueueHandler(QueueHandler):
+    """Queue the record as is; the listener thread does the formatting."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve args and tracebacks now, while they still describe this moment
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class ErrorAggregator:
+    """Counts repeated errors by key and logs them as one summary per interval."""
+
+    def __init__(self, logger: logging.Logger, message: str, fields: Tuple[str, ...], interval: float):
+        self.logger = logger
+        self.message = message
+        self.fields = fields
+        self.interval = interval
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        _aggregators.append(self)
+
+    def record(self, *key: str) -> None:
+        with self._lock:
+            self._counts[key] += 1
+        self.flush_if_due()
+
+    def flush_if_due(self) -> None:
+        if time.monotonic() - self._last_flush >= self.interval:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            since, self._last_flush = self._last_flush, time.monotonic()
+        for key, count in counts.items():
+            self.logger.warning(
+                self.message,
+                extra={**dict(zip(self.fields, key)), "count": count, "window_s": round(self._last_flush - since, 1)}
+            )
+
+_aggregators: List[ErrorAggregator] = []
+_listener: Optional[QueueListener] = None
+_handler: Optional[QueueHandler] = None
+_flusher: Optional[threading.Thread] = None
+_flusher_stop = threading.Event()
+
+def _flush_due_aggregators() -> None:
+    while not _flusher_stop.wait(FLUSH_TICK):
+        for aggregator in list(_aggregators):
+            aggregator.flush_if_due()
+
+def setup_logging(level: str = "INFO", fmt: str = "json", stream: Optional[TextIO] = None) -> None:
+    """Send ``app.*`` loggers through the queue to a background writer; idempotent."""
+    global _listener, _handler, _flusher
+    if _listener:
+        return
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    if fmt == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _handler = _FieldsQueueHandler(log_queue)
+    _listener = QueueListener(log_queue, output)
+    logger = logging.getLogger("app")
+    logger.setLevel(level)
+    logger.addHandler(_handler)
+    logger.propagate = False
+    _listener.start()
+    _flusher_stop.clear()
+    _flusher = threading.Thread(target=_flush_due_aggregators, name="log-aggregator-flusher", daemon=True)
+    _flusher.start()
+
+def stop_logging() -> None:
+    """Flush aggregated counts and wait for queued records to be written."""
+    global _listener, _handler, _flusher
+    if _flusher:
+        _flusher_stop.set()
+        _flusher.join()
+        _flusher = None
+    for aggregator in _aggregators:
+        aggregator.flush()
+    if _listener:
+        _listener.stop()
+        logging.getLogger("app").removeHandler(_handler)
+        logging.getLogger("app").propagate = True
+        _listener = _handler = None
@@ -0,0 +1,68 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Label values must stay low-cardinality: operation names and exception
+# class names only, never IDs or URLs.
+
+DARAJA_REQUEST_SECONDS = Histogram(
+    "daraja_request_seconds",
+    "Latency of Safaricom Daraja API calls",
+    ["operation", "outcome"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+)
+
+# Recommendation pipeline. Stages: language_detection, llm_analysis,
+# llm_clarification, html_parse, scoring, cache_get, cache_set, serialization.
+RECOMMENDATION_STAGE_SECONDS = Histogram(
+    "recommendation_stage_seconds",
+    "Latency of each stage of the recommendation pipeline",
+    ["stage"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+VENDOR_SEARCH_SECONDS = Histogram(
+    "vendor_search_seconds",
+    "Latency of a product search against one vendor, fetch and parse included",
+    ["vendor"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0)
+)
+
+VENDOR_ERRORS = Counter(
+    "vendor_errors_total",
+    "Failed vendor searches and unparseable product listings",
+    ["vendor", "error"]
+)
+
+PRODUCT_CACHE_REQUESTS = Counter(
+    "product_cache_requests_total",
+    "Product search cache lookups",
+    ["result"]
+)
+
+SEMANTIC_CACHE_REQUESTS = Counter(
+    "semantic_cache_requests_total",
+    "Query analysis lookups in the near-duplicate cache",
+    ["result"]
+)
+
+RESPONSE_SERIALIZATION_SECONDS = Histogram(
+    "response_serialization_seconds",
+    "Time spent rendering JSON response bodies",
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+)
+
+RECOMMENDATIONS_IN_FLIGHT = Gauge(
+    "recommendations_in_flight",
+    "Recommendation requests currently being processed",
+    ["route"]
+)
+
+VENDOR_SEARCHES_IN_FLIGHT = Gauge(
+    "vendor_searches_in_flight",
+    "Vendor searches currently waiting on or parsing a response",
+    ["vendor"]
+)
+
+LLM_CALLS_IN_FLIGHT = Gauge(
+    "llm_calls_in_flight",
+    "OpenAI requests currently outstanding"
+)
@@ -0,0 +1,90 @@
+"""On-demand profiling for a running worker.
+
+Both modes produce "folded" stacks: one ``frame;frame;frame value`` line
+per distinct stack, root first. The output loads directly into
+speedscope, or renders with ``flamegraph.pl``.
+"""
+from typing import Dict, List
+from collections import Counter
+import asyncio
+import sys
+import threading
+import tracemalloc
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})"
+
+def _fold(counts: Dict[str, float]) -> str:
+    ordered = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+    return "".join(f"{stack} {int(value)}\n" for stack, value in ordered)
+
+class SamplingProfiler:
+    """Samples every thread's Python stack at a fixed interval.
+
+    Runs in its own thread, so it sees the event loop thread whether it is
+    busy or idle in ``select``; the per-sample cost is one walk of each stack.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack: List[str] = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                thread_name = names.get(thread_id) or str(thread_id)
+                self.samples[";".join([thread_name] + stack[::-1])] += 1
+
+    def folded(self) -> str:
+        return _fold(self.samples)
+
+async def profile_cpu(seconds: float, interval: float = 0.005) -> str:
+    """Sample stacks for ``seconds`` and return them folded, weighted by sample count."""
+    profiler = SamplingProfiler(interval)
+    profiler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+    return profiler.folded()
+
+async def profile_memory(seconds: float, depth: int = 25) -> str:
+    """Trace allocations for ``seconds`` and return those still live, folded and weighted by bytes."""
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start(depth)
+    try:
+        before = tracemalloc.take_snapshot()
+        await asyncio.sleep(seconds)
+        after = tracemalloc.take_snapshot()
+    finally:
+        if not already_tracing:
+            tracemalloc.stop()
+
+    counts: Dict[str, float] = {}
+    for stat in after.compare_to(before, "traceback"):
+        if stat.size_diff <= 0:
+            continue
+        # Tracebacks iterate oldest frame first, already root-first
+        stack = ";".join(f"{frame.filename.rsplit('/', 1)[-1]}:{frame.lineno}" for frame in stat.traceback)
+        counts[stack] = counts.get(stack, 0) + stat.size_diff
+    return _fold(counts)
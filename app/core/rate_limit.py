@@ -0,0 +1,166 @@
+from typing import Dict, Optional, Tuple
+import redis
+import json
+import math
+from contextvars import ContextVar
+from dataclasses import dataclass
+from .config import settings
+
+# Token bucket refilled continuously at ``rate`` tokens per second, up to
+# ``capacity``. Uses the Redis clock so every worker sees the same bucket.
+# With ARGV[4] == '1' the cost is applied unconditionally; a negative cost
+# then refunds tokens to requests that turned out to be cheap.
+#
+# KEYS[1]  bucket key
+# ARGV[1]  capacity, ARGV[2] refill rate, ARGV[3] cost, ARGV[4] force
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= cost or ARGV[4] == '1' then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+# Requests served from cache are charged this share of a full request
+CACHED_REQUEST_COST = 0.25
+
+_request_flags: ContextVar[Optional[Dict[str, bool]]] = ContextVar("rate_limit_flags", default=None)
+
+def mark_cache_served() -> None:
+    """Flag the current request as served from cache, making it cheaper."""
+    flags = _request_flags.get()
+    if flags is not None:
+        flags["cache_served"] = True
+
+@dataclass
+class RouteLimit:
+    name: str
+    per_minute: int
+    cache_discount: bool = False  # Refund all but CACHED_REQUEST_COST when served from cache or failed
+
+class RateLimiter:
+    """Redis token-bucket limiter; one script call per check."""
+
+    def __init__(self):
+        self.redis_client = redis.from_url(settings.REDIS_URL)
+        self._script = self.redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    def hit(self, client_id: str, limit: RouteLimit, cost: float = 1.0, force: bool = False) -> Tuple[bool, float, float]:
+        """Charge ``cost`` to a client's bucket for a route.
+
+        Returns whether the request is allowed, the tokens left and the
+        seconds to wait before retrying.
+        """
+        allowed, remaining, retry_after = self._script(
+            keys=[f"ratelimit:{limit.name}:{client_id}"],
+            args=[limit.per_minute, limit.per_minute / 60, cost, 1 if force else 0],
+            client=self.redis_client
+        )
+        return bool(allowed), float(remaining), float(retry_after)
+
+    def refund(self, client_id: str, limit: RouteLimit, amount: float) -> None:
+        """Give ``amount`` tokens back to a client's bucket, up to its capacity."""
+        self.hit(client_id, limit, -amount, force=True)
+
+class RateLimitMiddleware:
+    """ASGI middleware enforcing per-client, per-route request rates."""
+
+    def __init__(self, app, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.limiter = limiter or RateLimiter()
+        api = settings.API_V1_STR
+        # Checked in order; the first matching prefix wins
+        self.routes = [
+            (f"{api}/tip/callback", None),  # Safaricom's callbacks are never limited
+            (f"{api}/tip/status", RouteLimit("status", settings.RATE_LIMIT_STATUS_PER_MINUTE)),
+            (f"{api}/tip/history", RouteLimit("status", settings.RATE_LIMIT_STATUS_PER_MINUTE)),
+            (f"{api}/tip", RouteLimit("tip", settings.RATE_LIMIT_TIP_PER_MINUTE)),
+            (f"{api}/recommend/batch", RouteLimit("recommend_batch", settings.RATE_LIMIT_BATCH_PER_MINUTE)),
+            (f"{api}/recommend", RouteLimit("recommend", settings.RATE_LIMIT_PER_MINUTE, cache_discount=True)),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self._route_limit(scope["path"])
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Behind a reverse proxy this is the proxy's address unless uvicorn runs with
+        # --proxy-headers and --forwarded-allow-ips naming the proxy, which then
+        # takes the client from X-Forwarded-For; otherwise every user shares a bucket
+        client_id = scope["client"][0] if scope.get("client") else "unknown"
+        try:
+            # The full cost up front, so the common case (a cache miss) is one script call
+            allowed, remaining, retry_after = self.limiter.hit(client_id, limit)
+        except redis.RedisError:
+            # Fail open: losing the limiter must not take the API down
+            await self.app(scope, receive, send)
+            return
+
+        if not allowed:
+            await self._reject(send, limit, retry_after)
+            return
+
+        flags = {"cache_served": False}
+        status = 500  # Unless the app gets as far as starting a response
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = _request_flags.set(flags)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _request_flags.reset(token)
+            # Cache hits and requests that failed (validation errors included)
+            # never ran the expensive path
+            if limit.cache_discount and (flags["cache_served"] or status >= 400):
+                try:
+                    self.limiter.refund(client_id, limit, 1.0 - CACHED_REQUEST_COST)
+                except redis.RedisError:
+                    pass
+
+    def _route_limit(self, path: str) -> Optional[RouteLimit]:
+        for prefix, limit in self.routes:
+            if path.startswith(prefix):
+                return limit
+        return None
+
+    async def _reject(self, send, limit: RouteLimit, retry_after: float) -> None:
+        body = json.dumps({"error": "Rate limit exceeded"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+                (b"x-ratelimit-limit", str(limit.per_minute).encode()),
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
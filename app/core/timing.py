@@ -0,0 +1,86 @@
+from typing import Any, Dict, List, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+import time
+from fastapi.responses import ORJSONResponse
+from .metrics import RECOMMENDATION_STAGE_SECONDS, RESPONSE_SERIALIZATION_SECONDS
+
+# Stage name -> [total seconds, count] for the request being handled. The
+# dict is shared by reference with tasks spawned from the request (e.g. the
+# concurrent vendor searches), so they all record into the same request.
+_request_timings: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar("request_timings", default=None)
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Add a stage duration to the current request's timings, if any."""
+    timings = _request_timings.get()
+    if timings is not None:
+        entry = timings.setdefault(stage, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+@contextmanager
+def timed_stage(stage: str):
+    """Time a pipeline stage into the stage histogram and the request's Server-Timing.
+
+    Also usable as a decorator on synchronous functions.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        RECOMMENDATION_STAGE_SECONDS.labels(stage).observe(elapsed)
+        record_stage(stage, elapsed)
+
+class TimedORJSONResponse(ORJSONResponse):
+    """ORJSONResponse that records how long rendering its body took."""
+
+    def render(self, content: Any) -> bytes:
+        started = time.perf_counter()
+        try:
+            return super().render(content)
+        finally:
+            elapsed = time.perf_counter() - started
+            RESPONSE_SERIALIZATION_SECONDS.observe(elapsed)
+            record_stage("response_serialization", elapsed)
+
+def format_server_timing(timings: Dict[str, List[float]], total: float) -> str:
+    """Render timings as a Server-Timing header value, in milliseconds."""
+    metrics = []
+    for stage, (seconds, count) in timings.items():
+        metric = f"{stage};dur={seconds * 1000:.1f}"
+        if count > 1:
+            metric += f';desc="x{count}"'
+        metrics.append(metric)
+    metrics.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(metrics)
+
+class ServerTimingMiddleware:
+    """ASGI middleware adding a Server-Timing header with the request's stages.
+
+    Only stages finished before the response starts are listed, so streamed
+    responses carry the stages that ran before their first event.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: Dict[str, List[float]] = {}
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                value = format_server_timing(timings, time.perf_counter() - started)
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", value.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
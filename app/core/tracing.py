@@ -0,0 +1,62 @@
+from typing import Any, Dict, Optional
+import threading
+import time
+from .config import settings
+
+# Never worth a trace: probes and scrapes
+UNTRACED_PATHS = {"/health", "/metrics", "/"}
+
+class AdaptiveTracesSampler:
+    """Sentry ``traces_sampler`` that keeps traces under a per-second budget.
+
+    Each transaction is sampled at ``base_rate``, lowered to
+    ``max_per_second / observed request rate`` when traffic is high enough
+    for the base rate to exceed the budget. The request rate is an
+    exponentially weighted average over one-second windows.
+    """
+
+    def __init__(self, base_rate: float, max_per_second: float, smoothing: float = 0.3):
+        self.base_rate = base_rate
+        self.max_per_second = max_per_second
+        self.smoothing = smoothing
+        self._rate = 0.0  # Smoothed requests per second
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, sampling_context: Dict[str, Any]) -> float:
+        parent_sampled = sampling_context.get("parent_sampled")
+        if parent_sampled is not None:
+            # Keep distributed traces whole
+            return 1.0 if parent_sampled else 0.0
+
+        scope = sampling_context.get("asgi_scope") or {}
+        if scope.get("path") in UNTRACED_PATHS:
+            return 0.0
+
+        return self.current_rate(self._observe())
+
+    def current_rate(self, requests_per_second: Optional[float] = None) -> float:
+        """Sample rate for the given (or last observed) request rate."""
+        if requests_per_second is None:
+            requests_per_second = self._rate
+        if requests_per_second * self.base_rate <= self.max_per_second:
+            return self.base_rate
+        return self.max_per_second / requests_per_second
+
+    def _observe(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._window_count += 1
+            elapsed = now - self._window_start
+            if elapsed >= 1.0:
+                observed = self._window_count / elapsed
+                self._rate += self.smoothing * (observed - self._rate)
+                self._window_start = now
+                self._window_count = 0
+            return self._rate
+
+traces_sampler = AdaptiveTracesSampler(
+    settings.SENTRY_TRACES_SAMPLE_RATE,
+    settings.SENTRY_MAX_TRACES_PER_SECOND
+)
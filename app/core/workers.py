@@ -0,0 +1,49 @@
+from typing import Optional
+import asyncio
+import logging
+
+class PeriodicWorker:
+    """A background task that repeats one round of work until stopped.
+
+    Subclasses implement ``tick``, which does a round and returns the seconds
+    to wait before the next. A failing round is logged with
+    ``error_message`` and retried after ``error_delay``.
+    """
+
+    error_message = "Error in background worker"
+    error_delay = 30.0
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def tick(self) -> float:
+        raise NotImplementedError
+
+    async def run(self) -> None:
+        """Run rounds until cancelled."""
+        logger = logging.getLogger(type(self).__module__)
+        while True:
+            try:
+                delay = await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(self.error_message)
+                delay = self.error_delay
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    def start(self) -> None:
+        """Start the worker on the running event loop, unless it is already running."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Cancel the worker and wait for it to finish."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
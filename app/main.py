@@ -1,27 +1,87 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from .core.config import settings
-from .routes import recommend, tips
-import sentry_sdk
-from sentry_sdk.integrations.fastapi import FastApiIntegration
+from .core.compression import CompressionMiddleware
+from .core.logs import setup_logging, stop_logging
+from .core.rate_limit import RateLimitMiddleware
+from .core.timing import ServerTimingMiddleware, TimedORJSONResponse
+from .core.tracing import traces_sampler
+from .routes import admin, recommend, tips
+from .services.archive import archive_service
+from .services.callbacks import callback_service
+from .services.fx import fx_service
+from .services.mpesa import mpesa_service
+from .services.reconciliation import reconciliation_service
 
-# Initialize Sentry if SENTRY_DSN is set
+# Application logs are written by a background thread, off the event loop
+setup_logging(settings.LOG_LEVEL, settings.LOG_FORMAT)
+
+# Initialize Sentry if SENTRY_DSN is set (imported only then; it is slow to load)
 if settings.SENTRY_DSN:
+    import sentry_sdk
+    from sentry_sdk.integrations.fastapi import FastApiIntegration
+
     sentry_sdk.init(
         dsn=settings.SENTRY_DSN,
         integrations=[FastApiIntegration()],
-        traces_sample_rate=1.0,
+        traces_sampler=traces_sampler,
         environment=settings.ENVIRONMENT
     )
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background workers with the application.
+
+    Services are built on first use; the ones needed by background workers
+    are built here, and shutdown only touches services that exist.
+    """
+    if settings.CALLBACK_WORKER_ENABLED:
+        callback_service.start()
+    if settings.ARCHIVE_WORKER_ENABLED and settings.ARCHIVE_DIR:
+        archive_service.start()
+    if settings.FX_RATES_URL:
+        fx_service.start()
+    await mpesa_service.daraja.start()
+    if settings.MPESA_CONSUMER_KEY:
+        mpesa_service.token_refresher.start()
+        if settings.RECONCILIATION_WORKER_ENABLED:
+            reconciliation_service.start()
+    yield
+    if reconciliation_service.is_built:
+        await reconciliation_service.stop()
+    if archive_service.is_built:
+        await archive_service.stop()
+    if fx_service.is_built:
+        await fx_service.stop()
+    await mpesa_service.token_refresher.stop()
+    if callback_service.is_built:
+        await callback_service.stop()
+    await mpesa_service.daraja.close()
+    stop_logging()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
+    lifespan=lifespan,
+    default_response_class=TimedORJSONResponse,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     docs_url="/docs",
     redoc_url="/redoc"
 )
 
+# Rate limiting (added before CORS so rejections still carry CORS headers)
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
+# Compress larger bodies; small ones (tip status) aren't worth the CPU
+app.add_middleware(CompressionMiddleware, minimum_size=settings.GZIP_MINIMUM_SIZE, compresslevel=6)
+
+# Per-request stage timings in a Server-Timing header
+if settings.SERVER_TIMING_ENABLED:
+    app.add_middleware(ServerTimingMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -44,6 +104,13 @@ app.include_router(
     tags=["tips"]
 )
 
+app.include_router(
+    admin.router,
+    prefix="/admin",
+    tags=["admin"],
+    include_in_schema=False
+)
+
 @app.get("/")
 async def root():
     """Root endpoint."""
@@ -59,6 +126,11 @@ async def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics endpoint."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     """Global HTTP exception handler."""
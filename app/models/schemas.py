@@ -36,6 +36,16 @@ class RecommendationResponse(BaseModel):
     session_id: str
     query_type: QueryType
 
+class BatchRecommendationRequest(BaseModel):
+    requests: List[RecommendationRequest] = Field(..., min_length=1, max_length=50)
+
+class BatchRecommendationResult(BaseModel):
+    response: Optional[RecommendationResponse] = None
+    error: Optional[str] = None  # Set instead of response when this query failed
+
+class BatchRecommendationResponse(BaseModel):
+    results: List[BatchRecommendationResult]  # One per request, in order
+
 class TipRequest(BaseModel):
     phone_number: str = Field(..., pattern=r"^\+254[0-9]{9}$")
     amount: float = Field(..., ge=10, le=5000)
@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+import asyncio
+import hmac
+from ..core.config import settings
+from ..core.profiling import profile_cpu, profile_memory
+from ..services.analytics import AnalyticsService, get_analytics_service
+
+router = APIRouter()
+
+# One profile at a time per worker; overlapping samplers skew each other
+_profile_lock = asyncio.Lock()
+
+def _require_admin(admin_key: Optional[str]) -> None:
+    """Reject requests without the configured admin key; 404 when none is configured."""
+    if not settings.ADMIN_API_KEY:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not admin_key or not hmac.compare_digest(admin_key, settings.ADMIN_API_KEY):
+        raise HTTPException(status_code=403, detail="Invalid admin key")
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def profile(
+    mode: str = Query("cpu", pattern="^(cpu|memory)$"),
+    seconds: float = Query(10.0, gt=0, le=60),
+    interval_ms: float = Query(5.0, ge=1, le=100),
+    admin_key: Optional[str] = Header(None, alias="X-Admin-Key")
+):
+    """
+    Profile this worker for ``seconds`` and return folded stacks.
+    ``cpu`` samples stacks every ``interval_ms`` (values are sample counts);
+    ``memory`` traces allocations still live at the end (values are bytes).
+    """
+    _require_admin(admin_key)
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+
+    async with _profile_lock:
+        if mode == "cpu":
+            return await profile_cpu(seconds, interval_ms / 1000)
+        return await profile_memory(seconds)
+
+@router.get("/analytics/tips")
+async def tip_analytics(
+    days: int = Query(7, ge=1, le=366),
+    admin_key: Optional[str] = Header(None, alias="X-Admin-Key"),
+    analytics_service: AnalyticsService = Depends(get_analytics_service)
+):
+    """
+    Tips per day for the last ``days`` days (today included): counts by
+    status, amounts, success rate and initiation-to-completion latency.
+    Read from rollups kept up to date on every write, so the cost depends
+    on ``days`` only, not on the number of transactions.
+    """
+    _require_admin(admin_key)
+    return await analytics_service.tip_summary(days)
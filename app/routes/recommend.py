@@ -1,38 +1,76 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
+from typing import List, AsyncIterator
+from contextlib import contextmanager
+import asyncio
 import uuid
+import json
 from ..models.schemas import (
     RecommendationRequest,
     RecommendationResponse,
+    BatchRecommendationRequest,
+    BatchRecommendationResponse,
+    BatchRecommendationResult,
     Product,
     QueryType
 )
-from ..services.nlp import nlp_service
-from ..services.products import product_service
+from ..services.nlp import NLPService, get_nlp_service
+from ..services.products import ProductService, get_product_service
+from ..services.sessions import SessionService, get_session_service
+from ..services.context import context_manager
 from ..core.config import settings
+from ..core.metrics import RECOMMENDATIONS_IN_FLIGHT
 
-router = APIRouter()
+@contextmanager
+def _in_flight(request: Request):
+    with RECOMMENDATIONS_IN_FLIGHT.labels(request.scope["route"].name).track_inprogress():
+        yield
+
+async def _track_in_flight(request: Request) -> AsyncIterator[None]:
+    """Count requests in progress per endpoint while their handler runs.
+
+    Dependencies exit before a streamed body is sent, so streaming
+    endpoints also count themselves inside their body generator.
+    """
+    with _in_flight(request):
+        yield
+
+router = APIRouter(dependencies=[Depends(_track_in_flight)])
+
+TOP_PRODUCTS = 5  # Products returned per recommendation
 
 @router.post("/", response_model=RecommendationResponse)
-async def get_recommendations(request: RecommendationRequest):
+async def get_recommendations(
+    request: RecommendationRequest,
+    nlp_service: NLPService = Depends(get_nlp_service),
+    product_service: ProductService = Depends(get_product_service),
+    session_service: SessionService = Depends(get_session_service)
+):
     """
     Get product recommendations based on user query.
     """
     try:
-        # Process query with NLP
-        nlp_result = await nlp_service.process_query(
-            request.query,
-            request.context
-        )
-        
         # Generate session ID
         session_id = str(uuid.uuid4())
         
+        # Process query with NLP
+        context = context_manager.new_state()
+        nlp_result = await _process_with_context(nlp_service, request, context)
+        
         # If clarification is needed, return early
         if nlp_result["needs_clarification"]:
             clarification = await nlp_service.generate_clarification_question(
                 nlp_result["analysis"]
             )
+            await session_service.save_session(
+                session_id,
+                {
+                    "query": request.query,
+                    "clarification": clarification,
+                    "query_type": nlp_result["query_type"],
+                    "context": context
+                }
+            )
             return RecommendationResponse(
                 clarification=clarification,
                 products=[],
@@ -41,19 +79,14 @@ async def get_recommendations(request: RecommendationRequest):
             )
         
         # Search for products
+        # Top products, best first
         products = await product_service.search_products(
             request.query,
-            {
-                "language": nlp_result["language"],
-                "query_type": nlp_result["query_type"]
-            }
+            _search_filters(nlp_result, context),
+            limit=TOP_PRODUCTS
         )
         
-        # Sort products by confidence score
-        products.sort(key=lambda x: x.confidence_score, reverse=True)
-        
-        # Limit to top 5 products
-        products = products[:5]
+        await context_manager.save(session_service, session_id, context)
         
         return RecommendationResponse(
             clarification=None,
@@ -68,35 +101,107 @@ async def get_recommendations(request: RecommendationRequest):
             detail=f"Error processing recommendation: {str(e)}"
         )
 
+@router.post("/stream")
+async def stream_recommendations(
+    request: RecommendationRequest,
+    http_request: Request,
+    nlp_service: NLPService = Depends(get_nlp_service),
+    product_service: ProductService = Depends(get_product_service),
+    session_service: SessionService = Depends(get_session_service)
+):
+    """
+    Get product recommendations as a Server-Sent Events stream.
+
+    Clarification questions are forwarded token by token as the model
+    produces them; otherwise a single ``result`` event carries the
+    recommendations.
+    """
+    session_id = str(uuid.uuid4())
+    context = context_manager.new_state()
+    try:
+        nlp_result = await _process_with_context(nlp_service, request, context)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing recommendation: {str(e)}"
+        )
+
+    async def event_stream() -> AsyncIterator[str]:
+        # The endpoint dependency has already exited by the time the body runs
+        with _in_flight(http_request):
+            try:
+                if nlp_result["needs_clarification"]:
+                    tokens = []
+                    async for token in nlp_service.stream_clarification_question(
+                        nlp_result["analysis"]
+                    ):
+                        tokens.append(token)
+                        yield _sse("token", {"token": token})
+
+                    clarification = "".join(tokens).strip()
+                    await session_service.save_session(
+                        session_id,
+                        {
+                            "query": request.query,
+                            "clarification": clarification,
+                            "query_type": nlp_result["query_type"],
+                            "context": context
+                        }
+                    )
+                    yield _sse("done", {
+                        "clarification": clarification,
+                        "session_id": session_id,
+                        "query_type": nlp_result["query_type"]
+                    })
+                    return
+
+                products = await product_service.search_products(
+                    request.query,
+                    _search_filters(nlp_result, context),
+                    limit=TOP_PRODUCTS
+                )
+                await context_manager.save(session_service, session_id, context)
+                response = RecommendationResponse(
+                    clarification=None,
+                    products=products,
+                    session_id=session_id,
+                    query_type=nlp_result["query_type"]
+                )
+                yield _sse("result", response.model_dump(mode="json"))
+
+            except Exception as e:
+                yield _sse("error", {"error": f"Error streaming recommendation: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/clarify", response_model=RecommendationResponse)
 async def clarify_recommendation(
     request: RecommendationRequest,
-    session_id: str
+    session_id: str,
+    nlp_service: NLPService = Depends(get_nlp_service),
+    product_service: ProductService = Depends(get_product_service),
+    session_service: SessionService = Depends(get_session_service)
 ):
     """
     Handle follow-up questions for clarification.
     """
     try:
-        # Process clarification query
-        nlp_result = await nlp_service.process_query(
-            request.query,
-            request.context
-        )
+        # Process clarification query with the session's conversation so far
+        context = await context_manager.load(session_service, session_id)
+        nlp_result = await _process_with_context(nlp_service, request, context)
+        await context_manager.save(session_service, session_id, context)
         
         # Search for products with updated context
         products = await product_service.search_products(
             request.query,
-            {
-                "language": nlp_result["language"],
-                "query_type": nlp_result["query_type"],
-                "session_id": session_id
-            }
+            _search_filters(nlp_result, context, session_id=session_id),
+            limit=TOP_PRODUCTS
         )
         
-        # Sort and limit products
-        products.sort(key=lambda x: x.confidence_score, reverse=True)
-        products = products[:5]
-        
         return RecommendationResponse(
             clarification=None,
             products=products,
@@ -108,4 +213,101 @@ async def clarify_recommendation(
         raise HTTPException(
             status_code=500,
             detail=f"Error processing clarification: {str(e)}"
-        ) 
\ No newline at end of file
+        ) 
+
+@router.post("/batch", response_model=BatchRecommendationResponse)
+async def get_batch_recommendations(
+    batch: BatchRecommendationRequest,
+    nlp_service: NLPService = Depends(get_nlp_service),
+    product_service: ProductService = Depends(get_product_service),
+    session_service: SessionService = Depends(get_session_service)
+):
+    """
+    Get recommendations for up to 50 queries in one request.
+    Queries are analysed concurrently and identical searches across the
+    batch share one cache lookup and one set of vendor fetches. Results come
+    back in request order; a query that fails gets an ``error`` instead of
+    failing the batch.
+    """
+    semaphore = asyncio.Semaphore(settings.BATCH_NLP_CONCURRENCY)
+
+    async def analyse(request: RecommendationRequest):
+        context = context_manager.new_state()
+        async with semaphore:
+            nlp_result = await _process_with_context(nlp_service, request, context)
+            clarification = None
+            if nlp_result["needs_clarification"]:
+                clarification = await nlp_service.generate_clarification_question(
+                    nlp_result["analysis"]
+                )
+        return context, nlp_result, clarification
+
+    analyses = await asyncio.gather(
+        *(analyse(request) for request in batch.requests),
+        return_exceptions=True
+    )
+
+    searches = {}
+    for index, (request, analysis) in enumerate(zip(batch.requests, analyses)):
+        if not isinstance(analysis, BaseException) and analysis[2] is None:
+            context, nlp_result, _ = analysis
+            searches[index] = (request.query, _search_filters(nlp_result, context))
+
+    try:
+        product_lists = await product_service.search_products_batch(list(searches.values()), limit=TOP_PRODUCTS)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing batch recommendation: {str(e)}"
+        )
+    products_by_index = dict(zip(searches, product_lists))
+
+    results = []
+    sessions = {}
+    for index, (request, analysis) in enumerate(zip(batch.requests, analyses)):
+        if isinstance(analysis, BaseException):
+            results.append(BatchRecommendationResult(
+                error=f"Error processing recommendation: {str(analysis)}"
+            ))
+            continue
+
+        context, nlp_result, clarification = analysis
+        session_id = str(uuid.uuid4())
+        products = products_by_index.get(index, [])
+        if clarification:
+            sessions[session_id] = {
+                "query": request.query,
+                "clarification": clarification,
+                "query_type": nlp_result["query_type"],
+                "context": context
+            }
+        else:
+            sessions[session_id] = {"context": context}
+        results.append(BatchRecommendationResult(response=RecommendationResponse(
+            clarification=clarification,
+            products=products,
+            session_id=session_id,
+            query_type=nlp_result["query_type"]
+        )))
+
+    await session_service.create_sessions(sessions)
+    return BatchRecommendationResponse(results=results)
+
+async def _process_with_context(nlp_service: NLPService, request: RecommendationRequest, context: dict) -> dict:
+    """Run NLP on a query against the bounded session context, recording the turn."""
+    context_manager.merge_client_context(context, request.context)
+    nlp_result = await nlp_service.process_query(request.query, context)
+    context_manager.record_turn(context, request.query, nlp_result["analysis"])
+    return nlp_result
+
+def _search_filters(nlp_result: dict, context: dict, **extra) -> dict:
+    """Product search filters for an analysed query, with the conversation's budget if known."""
+    filters = {"language": nlp_result["language"], "query_type": nlp_result["query_type"], **extra}
+    budget = context_manager.budget(context)
+    if budget:
+        filters["budget"] = budget
+    return filters
+
+def _sse(event: str, data: dict) -> str:
+    """Format a single Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -1,19 +1,65 @@
-from fastapi import APIRouter, HTTPException, Request, Depends
-from typing import Dict, Any, List
+from fastapi import APIRouter, HTTPException, Request, Depends, Query, Header
+from typing import Dict, Any, List, Optional
 from ..models.schemas import TipRequest, TipResponse
-from ..services.mpesa import mpesa_service
-from ..services.transactions import transaction_service
+from ..services.mpesa import MPesaService, get_mpesa_service
+from ..services.transactions import TransactionService, get_transaction_service
+from ..services.callbacks import CallbackService, get_callback_service
+from ..services.idempotency import (
+    IdempotencyService,
+    IdempotencyConflict,
+    IdempotencyInProgress,
+    get_idempotency_service
+)
 from ..core.config import settings
+from ..core.etag import etag_response
 import json
-from datetime import datetime
 
 router = APIRouter()
 
-@router.post("/tip/initiate", response_model=TipResponse)
-async def initiate_tip(request: TipRequest):
+@router.post("/initiate", response_model=TipResponse)
+async def initiate_tip(
+    request: TipRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=128),
+    mpesa_service: MPesaService = Depends(get_mpesa_service),
+    idempotency_service: IdempotencyService = Depends(get_idempotency_service)
+):
     """
     Initiate M-Pesa STK push for tipping.
+    Retries sent with the same ``Idempotency-Key`` header get the original
+    response back, errors included, instead of triggering another STK push.
     """
+    if not idempotency_key:
+        return await _initiate_tip(request, mpesa_service)
+    
+    fingerprint = idempotency_service.fingerprint(request.model_dump())
+    try:
+        replay = await idempotency_service.begin("tip", idempotency_key, fingerprint)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    if replay:
+        if replay["status_code"] != 200:
+            raise HTTPException(
+                status_code=replay["status_code"],
+                detail=replay["body"]["detail"]
+            )
+        return TipResponse(**replay["body"])
+    
+    try:
+        response = await _initiate_tip(request, mpesa_service)
+    except HTTPException as e:
+        # Failures are stored too: after a 5xx (say, a timed-out STK push) the
+        # push may already be on the phone, so a retry must not send another
+        await idempotency_service.complete("tip", idempotency_key, fingerprint, e.status_code, {"detail": e.detail})
+        raise
+    
+    await idempotency_service.complete("tip", idempotency_key, fingerprint, 200, response.model_dump())
+    return response
+
+async def _initiate_tip(request: TipRequest, mpesa_service: MPesaService) -> TipResponse:
+    """Validate a tip request and send the STK push."""
     try:
         # Validate amount
         if request.amount < 10 or request.amount > 5000:
@@ -48,16 +94,22 @@ async def initiate_tip(request: TipRequest):
                 detail=response["message"]
             )
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error initiating tip: {str(e)}"
         )
 
-@router.post("/tip/callback")
-async def tip_callback(request: Request):
+@router.post("/callback")
+async def tip_callback(
+    request: Request,
+    callback_service: CallbackService = Depends(get_callback_service)
+):
     """
     Handle M-Pesa callback for payment status.
+    The payload is queued for the callback worker and acknowledged right away.
     """
     try:
         # Get callback data
@@ -70,60 +122,31 @@ async def tip_callback(request: Request):
                 detail="Invalid callback signature"
             )
         
-        # Process callback
-        result = data.get("Body", {}).get("stkCallback", {})
-        transaction_id = result.get("CheckoutRequestID")
-        
-        if not transaction_id:
-            raise HTTPException(
-                status_code=400,
-                detail="Missing transaction ID in callback"
-            )
-        
-        # Update transaction status
-        if result.get("ResultCode") == 0:
-            # Payment successful
-            await transaction_service.update_transaction(
-                transaction_id,
-                {
-                    "status": "completed",
-                    "mpesa_response": result,
-                    "completed_at": datetime.now().isoformat()
-                }
-            )
-            return {
-                "status": "success",
-                "message": "Payment received successfully",
-                "transaction_id": transaction_id,
-                "amount": result.get("Amount"),
-                "phone_number": result.get("PhoneNumber")
-            }
-        else:
-            # Payment failed
-            await transaction_service.update_transaction(
-                transaction_id,
-                {
-                    "status": "failed",
-                    "error": result.get("ResultDesc", "Payment failed"),
-                    "failed_at": datetime.now().isoformat()
-                }
-            )
-            return {
-                "status": "failed",
-                "message": result.get("ResultDesc", "Payment failed"),
-                "transaction_id": transaction_id
-            }
+        # Queue callback for processing
+        await callback_service.enqueue(data)
+        return {
+            "ResultCode": 0,
+            "ResultDesc": "Accepted"
+        }
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error processing callback: {str(e)}"
         )
 
-@router.get("/tip/status/{transaction_id}")
-async def get_transaction_status(transaction_id: str):
+@router.get("/status/{transaction_id}")
+async def get_transaction_status(
+    transaction_id: str,
+    request: Request,
+    transaction_service: TransactionService = Depends(get_transaction_service)
+):
     """
     Get transaction status.
+    Responses carry an ETag; pollers sending it back as ``If-None-Match``
+    get a bodyless 304 until the status changes.
     """
     try:
         transaction = await transaction_service.get_transaction(transaction_id)
@@ -133,7 +156,7 @@ async def get_transaction_status(transaction_id: str):
                 detail="Transaction not found"
             )
             
-        return {
+        return etag_response(request, {
             "transaction_id": transaction["id"],
             "status": transaction["status"],
             "amount": transaction["amount"],
@@ -141,7 +164,7 @@ async def get_transaction_status(transaction_id: str):
             "created_at": transaction["created_at"],
             "updated_at": transaction["updated_at"],
             "error": transaction.get("error")
-        }
+        })
             
     except HTTPException:
         raise
@@ -151,18 +174,42 @@ async def get_transaction_status(transaction_id: str):
             detail=f"Error getting transaction status: {str(e)}"
         )
 
-@router.get("/tip/history/{phone_number}")
-async def get_transaction_history(phone_number: str):
+@router.get("/history/{phone_number}")
+async def get_transaction_history(
+    phone_number: str,
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    transaction_service: TransactionService = Depends(get_transaction_service)
+):
     """
-    Get transaction history for a phone number.
+    Get transaction history for a phone number, newest first.
+    Pass the returned ``next_cursor`` back as ``cursor`` to get the next page.
+    Supports ``If-None-Match`` revalidation like the status route.
     """
     try:
-        transactions = await transaction_service.get_transactions_by_phone(phone_number)
-        return {
+        if cursor is not None:
+            try:
+                float(cursor)
+            except ValueError:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Invalid history cursor"
+                )
+        
+        transactions, next_cursor = await transaction_service.get_transaction_page(
+            phone_number,
+            limit=limit,
+            cursor=cursor
+        )
+        return etag_response(request, {
             "phone_number": phone_number,
-            "transactions": transactions
-        }
+            "transactions": transactions,
+            "next_cursor": next_cursor
+        })
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -0,0 +1,88 @@
+from typing import Dict, Any, Optional, List
+import redis
+from datetime import date, datetime, timedelta
+from ..core.config import settings
+from ..core.lazy import LazyService
+
+# One hash per initiation day, maintained by TransactionService in the same
+# atomic step as the change it counts:
+#   initiated, amount_initiated          on create
+#   completed, failed, amount_completed  on the first move to a settled status
+#   latency_le_<seconds>, latency_sum, latency_count
+#                                        initiation-to-completion latency
+TIP_ROLLUP_PREFIX = "analytics:tips:"
+LATENCY_BUCKETS = (5, 10, 30, 60, 120, 300, 600, 1800)  # Seconds; anything slower counts as "inf"
+
+def tip_rollup_key(day: str) -> str:
+    """Rollup key for an ISO date (``YYYY-MM-DD``)."""
+    return f"{TIP_ROLLUP_PREFIX}{day}"
+
+class AnalyticsService:
+    """Answers tip analytics from the daily rollups, without scanning transactions."""
+
+    def __init__(self):
+        self.redis_client = redis.from_url(settings.REDIS_URL)
+
+    async def tip_summary(self, days: int = 7, end: Optional[date] = None) -> Dict[str, Any]:
+        """Per-day and total counts, amounts and completion latency for the ``days`` ending on ``end``."""
+        end = end or datetime.now().date()
+        dates = [(end - timedelta(days=offset)).isoformat() for offset in range(days - 1, -1, -1)]
+        pipe = self.redis_client.pipeline(transaction=False)
+        for day in dates:
+            pipe.hgetall(tip_rollup_key(day))
+        rollups = [{key.decode(): float(value) for key, value in raw.items()} for raw in pipe.execute()]
+
+        totals: Dict[str, float] = {}
+        for rollup in rollups:
+            for key, value in rollup.items():
+                totals[key] = totals.get(key, 0.0) + value
+
+        return {
+            "days": [{"date": day, **self._counts(rollup)} for day, rollup in zip(dates, rollups)],
+            "totals": {**self._counts(totals), "latency": self._latency(totals)}
+        }
+
+    def _counts(self, rollup: Dict[str, float]) -> Dict[str, Any]:
+        initiated = int(rollup.get("initiated", 0))
+        completed = int(rollup.get("completed", 0))
+        failed = int(rollup.get("failed", 0))
+        return {
+            "initiated": initiated,
+            "completed": completed,
+            "failed": failed,
+            "pending": max(initiated - completed - failed, 0),
+            "amount_initiated": rollup.get("amount_initiated", 0.0),
+            "amount_completed": rollup.get("amount_completed", 0.0),
+            "success_rate": round(completed / (completed + failed), 4) if completed + failed else None
+        }
+
+    def _latency(self, rollup: Dict[str, float]) -> Dict[str, Any]:
+        """Cumulative histogram, mean and bucket-bound percentiles of completion latency."""
+        count = int(rollup.get("latency_count", 0))
+        buckets: List[Any] = list(LATENCY_BUCKETS) + ["inf"]
+        cumulative = {}
+        running = 0
+        for bound in buckets:
+            running += int(rollup.get(f"latency_le_{bound}", 0))
+            cumulative[str(bound)] = running
+
+        def percentile(quantile: float) -> Optional[float]:
+            # Upper bound of the first bucket reaching the quantile
+            for bound in LATENCY_BUCKETS:
+                if count and cumulative[str(bound)] >= quantile * count:
+                    return float(bound)
+            return None
+
+        return {
+            "count": count,
+            "mean_s": round(rollup.get("latency_sum", 0.0) / count, 3) if count else None,
+            "p50_s": percentile(0.5),
+            "p95_s": percentile(0.95),
+            "buckets": cumulative
+        }
+
+analytics_service: LazyService[AnalyticsService] = LazyService(AnalyticsService)
+
+def get_analytics_service() -> AnalyticsService:
+    """FastAPI dependency returning the shared AnalyticsService."""
+    return analytics_service.get()
@@ -0,0 +1,37 @@
+from datetime import timedelta
+from ..core.config import settings
+from ..core.lazy import LazyService
+from ..core.workers import PeriodicWorker
+from .transactions import transaction_service
+
+class ArchiveService(PeriodicWorker):
+    """Moves settled transactions out of Redis into the on-disk archive.
+
+    Transactions that completed or failed more than ``hot_window`` ago are
+    appended to ``transaction_service.archive`` in batches and then deleted
+    from Redis, so Redis only holds recent and pending tips while history
+    stays queryable.
+    """
+
+    error_message = "Error archiving transactions"
+
+    def __init__(self):
+        super().__init__()
+        self.interval = 60.0  # Seconds between queue polls
+        self.batch_size = 500
+        self.hot_window = timedelta(hours=settings.ARCHIVE_AFTER_HOURS)
+        self.lease = timedelta(minutes=5)  # Time a claimed batch has before others may retry it
+
+    async def archive_due(self) -> int:
+        """Archive one batch of settled transactions. Returns the batch size."""
+        return await transaction_service.archive_settled(self.batch_size, self.hot_window, self.lease)
+
+    async def tick(self) -> float:
+        processed = await self.archive_due()
+        return 0 if processed >= self.batch_size else self.interval
+
+    @property
+    def error_delay(self) -> float:
+        return self.interval
+
+archive_service: LazyService[ArchiveService] = LazyService(ArchiveService)
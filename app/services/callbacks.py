@@ -0,0 +1,213 @@
+from typing import Dict, Any, List, Tuple
+import redis
+import json
+import os
+import socket
+from datetime import datetime, timedelta
+from ..core.config import settings
+from ..core.lazy import LazyService
+from ..core.workers import PeriodicWorker
+from .transactions import transaction_service
+
+class CallbackService(PeriodicWorker):
+    """Queues M-Pesa callbacks on a Redis Stream and applies them in batches.
+
+    The callback route only appends the raw payload and acknowledges
+    Safaricom. A consumer-group worker then reads batches, drops repeated
+    callbacks for the same CheckoutRequestID, applies the status updates in
+    one pipeline and moves payloads that keep failing to a dead-letter
+    stream.
+    """
+
+    error_message = "Error processing M-Pesa callbacks"
+
+    def __init__(self):
+        super().__init__()
+        self.redis_client = redis.from_url(settings.REDIS_URL)
+        self.stream = "mpesa:callbacks"
+        self.dead_letter_stream = "mpesa:callbacks:dead"
+        self.group = "callback-workers"
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = 50
+        self.max_deliveries = 5
+        self.retry_idle = timedelta(seconds=30)  # Reclaim unacknowledged entries after this long
+        self.dedupe_ttl = timedelta(days=1)
+        self.poll_interval = 0.5
+        self.max_stream_length = 100_000
+        self._group_ready = False
+
+    async def enqueue(self, payload: Dict[str, Any]) -> str:
+        """Append a raw callback payload to the stream."""
+        entry_id = self.redis_client.xadd(
+            self.stream,
+            {"payload": json.dumps(payload)},
+            maxlen=self.max_stream_length,
+            approximate=True
+        )
+        return entry_id.decode()
+
+    async def process_batch(self) -> int:
+        """Process one batch of new and retried callbacks. Returns the entry count."""
+        self._ensure_group()
+
+        entries = self._read_entries()
+        if not entries:
+            return 0
+
+        ack_ids: List[bytes] = []
+        seen_now: List[str] = []
+        pending: List[Tuple[bytes, Dict[bytes, bytes], str, Dict[str, Any]]] = []
+
+        # Parse, dropping malformed payloads straight to the dead-letter stream
+        for entry_id, fields in entries:
+            try:
+                checkout_request_id, updates = parse_callback(json.loads(fields[b"payload"]))
+            except (KeyError, TypeError, ValueError) as e:
+                self._dead_letter(entry_id, fields, f"Invalid callback payload: {str(e)}")
+                ack_ids.append(entry_id)
+                continue
+            pending.append((entry_id, fields, checkout_request_id, updates))
+
+        # Drop callbacks already applied, or repeated within this batch
+        checkout_ids = [checkout_request_id for _, _, checkout_request_id, _ in pending]
+        already_seen = self.redis_client.mget([self._seen_key(c) for c in checkout_ids]) if checkout_ids else []
+        batch_seen = set()
+        fresh = []
+        for (entry_id, fields, checkout_request_id, updates), seen in zip(pending, already_seen):
+            if seen or checkout_request_id in batch_seen:
+                ack_ids.append(entry_id)
+                continue
+            batch_seen.add(checkout_request_id)
+            fresh.append((entry_id, fields, checkout_request_id, updates))
+
+        # Resolve transactions and apply all updates in one pipeline
+        transaction_ids = await transaction_service.get_transaction_ids_by_checkout(
+            [checkout_request_id for _, _, checkout_request_id, _ in fresh]
+        )
+        resolved = [
+            (item, transaction_id)
+            for item, transaction_id in zip(fresh, transaction_ids)
+            if transaction_id
+        ]
+        results = await transaction_service.update_transactions(
+            [(transaction_id, updates) for (_, _, _, updates), transaction_id in resolved]
+        )
+        applied = {
+            item[0]: result
+            for (item, _), result in zip(resolved, results)
+        }
+
+        for entry_id, fields, checkout_request_id, _ in fresh:
+            result = applied.get(entry_id)
+            if isinstance(result, dict):
+                ack_ids.append(entry_id)
+                seen_now.append(checkout_request_id)
+            elif isinstance(result, Exception):
+                self._retry_or_dead_letter(entry_id, fields, f"Error applying callback: {str(result)}", ack_ids)
+            else:
+                self._retry_or_dead_letter(entry_id, fields, "Transaction not found for callback", ack_ids)
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for checkout_request_id in seen_now:
+            pipe.setex(self._seen_key(checkout_request_id), self.dedupe_ttl, 1)
+        if ack_ids:
+            pipe.xack(self.stream, self.group, *ack_ids)
+            pipe.hdel(self._retries_key(), *ack_ids)
+        pipe.execute()
+
+        return len(entries)
+
+    async def tick(self) -> float:
+        processed = await self.process_batch()
+        return 0 if processed >= self.batch_size else self.poll_interval
+
+    @property
+    def error_delay(self) -> float:
+        return self.poll_interval
+
+    def _read_entries(self) -> List[Tuple[bytes, Dict[bytes, bytes]]]:
+        """Reclaim stale unacknowledged entries, then read new ones."""
+        _, entries, *_ = self.redis_client.xautoclaim(
+            self.stream,
+            self.group,
+            self.consumer,
+            min_idle_time=int(self.retry_idle.total_seconds() * 1000),
+            start_id="0-0",
+            count=self.batch_size
+        )
+        entries = [(entry_id, fields) for entry_id, fields in entries if fields]
+
+        remaining = self.batch_size - len(entries)
+        if remaining > 0:
+            response = self.redis_client.xreadgroup(
+                self.group,
+                self.consumer,
+                {self.stream: ">"},
+                count=remaining
+            )
+            for _, stream_entries in response:
+                entries.extend(stream_entries)
+        return entries
+
+    def _retry_or_dead_letter(self, entry_id: bytes, fields: Dict[bytes, bytes], error: str, ack_ids: List[bytes]) -> None:
+        """Leave an entry pending for a retry, or dead-letter it after too many attempts."""
+        attempts = self.redis_client.hincrby(self._retries_key(), entry_id, 1)
+        if attempts >= self.max_deliveries:
+            self._dead_letter(entry_id, fields, error)
+            ack_ids.append(entry_id)
+
+    def _dead_letter(self, entry_id: bytes, fields: Dict[bytes, bytes], error: str) -> None:
+        self.redis_client.xadd(
+            self.dead_letter_stream,
+            {
+                "payload": fields.get(b"payload", b""),
+                "source_id": entry_id,
+                "error": error,
+                "failed_at": datetime.now().isoformat()
+            },
+            maxlen=self.max_stream_length,
+            approximate=True
+        )
+
+    def _ensure_group(self) -> None:
+        if self._group_ready:
+            return
+        try:
+            self.redis_client.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    def _seen_key(self, checkout_request_id: str) -> str:
+        return f"mpesa:callback:seen:{checkout_request_id}"
+
+    def _retries_key(self) -> str:
+        return f"{self.stream}:retries"
+
+def parse_callback(payload: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """Turn an STK callback payload into its CheckoutRequestID and transaction updates."""
+    result = payload["Body"]["stkCallback"]
+    checkout_request_id = result.get("CheckoutRequestID")
+    if not checkout_request_id:
+        raise ValueError("Missing CheckoutRequestID")
+
+    if result.get("ResultCode") == 0:
+        updates = {
+            "status": "completed",
+            "mpesa_response": result,
+            "completed_at": datetime.now().isoformat()
+        }
+    else:
+        updates = {
+            "status": "failed",
+            "error": result.get("ResultDesc", "Payment failed"),
+            "failed_at": datetime.now().isoformat()
+        }
+    return checkout_request_id, updates
+
+callback_service: LazyService[CallbackService] = LazyService(CallbackService)
+
+def get_callback_service() -> CallbackService:
+    """FastAPI dependency returning the shared CallbackService."""
+    return callback_service.get()
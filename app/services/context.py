@@ -0,0 +1,174 @@
+from typing import Dict, Any, Optional, List, Tuple
+import re
+from ..core.config import settings
+from .sessions import SessionService
+
+# Rough characters-per-token ratio for English prompts; good enough to keep
+# the context block at a stable size without pulling in a tokenizer.
+CHARS_PER_TOKEN = 4
+
+# Plain numbers (no currency, no "k") below this are more likely ages,
+# sizes or counts than prices, and are not taken as a budget
+MIN_UNMARKED_BUDGET = 100
+
+# An amount followed by a unit ("5 years", "43 inch", "8 gb") is not a price
+_AMOUNT = (
+    r"(kes|ksh|usd|\$)?\s*(\d[\d,]*(?:\.\d+)?)\s*(k)?\b"
+    r"(?!\s*(?:years?|yrs?|months?|weeks?|days?|hours?|inch(?:es)?|in|ft|cm|mm|m|kg|g|grams?|lbs?"
+    r"|mah|gb|tb|mb|hz|w|watts?|people|persons?|kids?|children|pcs|pieces)\b)"
+)
+_BUDGET_PATTERN = re.compile(
+    r"(?:under|below|less than|budget(?: of| is)?|max(?:imum)?(?: of)?|up to)\s*" + _AMOUNT,
+    re.IGNORECASE
+)
+_AMOUNT_PATTERN = re.compile(_AMOUNT, re.IGNORECASE)
+
+class ConversationContextManager:
+    """Keeps a bounded, structured conversation state per session.
+
+    The state holds the constraints extracted so far, a rolling summary of
+    evicted turns and the most recent turns verbatim. Rendering it always
+    fits within ``token_budget`` so prompt size stays flat however long the
+    conversation runs.
+    """
+
+    def __init__(self):
+        self.max_turns = settings.CONTEXT_MAX_TURNS
+        self.token_budget = settings.CONTEXT_TOKEN_BUDGET
+        self.max_constraints = 10
+        self.max_field_chars = 200
+
+    def new_state(self) -> Dict[str, Any]:
+        """Return an empty conversation state."""
+        return {"constraints": {}, "summary": "", "turns": []}
+
+    async def load(self, session_service: SessionService, session_id: str) -> Dict[str, Any]:
+        """Load the conversation state stored for a session."""
+        session = await session_service.get_session(session_id)
+        if not session or not session.get("context"):
+            return self.new_state()
+        return session["context"]
+
+    async def save(self, session_service: SessionService, session_id: str, state: Dict[str, Any]) -> None:
+        """Persist the conversation state on the session."""
+        await session_service.save_session(session_id, {"context": state})
+
+    def merge_client_context(self, state: Dict[str, Any], client_context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Fold a client-supplied context dict into the state as constraints.
+
+        Only scalar values are kept, and keys and values are clipped, so an
+        arbitrary client payload cannot inflate the prompt.
+        """
+        if not client_context:
+            return state
+
+        constraints = state["constraints"]
+        for key, value in client_context.items():
+            if isinstance(value, (dict, list)) or value is None:
+                continue
+            if key not in constraints and len(constraints) >= self.max_constraints:
+                break
+            constraints[str(key)[:40]] = str(value)[:self.max_field_chars]
+        return state
+
+    def record_turn(self, state: Dict[str, Any], query: str, analysis: str) -> Dict[str, Any]:
+        """Append a turn, update extracted constraints and compact the state."""
+        budget = self._extract_budget(query)
+        if budget:
+            state["constraints"]["budget"] = budget
+
+        state["turns"].append({
+            "query": query[:self.max_field_chars],
+            "analysis": analysis[:self.max_field_chars * 2]
+        })
+        self._compact(state)
+        return state
+
+    def render(self, state: Optional[Dict[str, Any]]) -> str:
+        """Render the state as a prompt block that fits the token budget."""
+        if not state:
+            return ""
+        if "turns" not in state:
+            # Plain client context from callers that don't track sessions
+            state = self.merge_client_context(self.new_state(), state)
+
+        # Compact a copy: client context merged since the last turn may not fit yet
+        state = {**state, "constraints": dict(state["constraints"]), "turns": list(state["turns"])}
+        self._compact(state)
+        return self._render_parts(state)
+
+    def _render_parts(self, state: Dict[str, Any]) -> str:
+        parts: List[str] = []
+        if state["constraints"]:
+            constraints = "; ".join(f"{k}: {v}" for k, v in state["constraints"].items())
+            parts.append(f"Known constraints: {constraints}")
+        if state["summary"]:
+            parts.append(f"Earlier in the conversation: {state['summary']}")
+        for turn in state["turns"]:
+            parts.append(f"User: {turn['query']}\nAssistant notes: {turn['analysis']}")
+        return "\n".join(parts)
+
+    def _compact(self, state: Dict[str, Any]) -> None:
+        """Evict the oldest turns into the summary until the state fits.
+
+        If the constraints and summary alone are over budget, the oldest
+        summary entries and then the oldest constraints are dropped too, so
+        what renders is always whole entries.
+        """
+        max_chars = self.token_budget * CHARS_PER_TOKEN
+        while state["turns"] and (
+            len(state["turns"]) > self.max_turns
+            or len(self._render_parts(state)) > max_chars
+        ):
+            evicted = state["turns"].pop(0)
+            state["summary"] = self._summarize(state["summary"], evicted)
+        while state["summary"] and len(self._render_parts(state)) > max_chars:
+            parts = state["summary"].split(" | ", 1)
+            state["summary"] = parts[1] if len(parts) > 1 else ""
+        while state["constraints"] and len(self._render_parts(state)) > max_chars:
+            del state["constraints"][next(iter(state["constraints"]))]
+
+    def _summarize(self, summary: str, turn: Dict[str, str]) -> str:
+        """Fold an evicted turn into the rolling summary, keeping it bounded."""
+        snippet = turn["query"].strip().rstrip("?.!")[:80]
+        summary = f"{summary} | asked about {snippet}" if summary else f"asked about {snippet}"
+        # Keep roughly a quarter of the budget for the summary, dropping the oldest part
+        max_chars = self.token_budget * CHARS_PER_TOKEN // 4
+        if len(summary) > max_chars:
+            summary = summary[-max_chars:].split(" | ", 1)[-1]
+        return summary
+
+    def budget(self, state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """The budget constraint as a ``{"max": amount, "currency": code}`` search filter."""
+        text = state["constraints"].get("budget")
+        parsed = self._parse_amount(_AMOUNT_PATTERN.search(text)) if text else None
+        if not parsed:
+            return None
+        currency, amount = parsed
+        return {"max": amount, "currency": currency}
+
+    def _extract_budget(self, query: str) -> Optional[str]:
+        """Pull a budget constraint such as 'under KES 15,000' out of a query."""
+        parsed = self._parse_amount(_BUDGET_PATTERN.search(query))
+        if not parsed:
+            return None
+        currency, amount = parsed
+        return f"{currency} {amount:.0f}"
+
+    def _parse_amount(self, match: Optional[re.Match]) -> Optional[Tuple[str, float]]:
+        """``(currency, amount)`` of a matched amount, or None if it isn't a plausible price."""
+        if not match:
+            return None
+        currency, amount, thousands = match.groups()
+        try:
+            amount = float(amount.replace(",", ""))
+        except ValueError:
+            return None
+        if thousands:
+            amount *= 1000
+        elif not currency and amount < MIN_UNMARKED_BUDGET:
+            return None
+        currency = "USD" if currency and currency.lower() in ("usd", "$") else "KES"
+        return currency, amount
+
+context_manager = ConversationContextManager()
@@ -0,0 +1,81 @@
+from typing import Dict, Optional
+import httpx
+import asyncio
+import time
+from ..core.metrics import DARAJA_REQUEST_SECONDS
+
+# Per-operation timeouts. STK push waits on Safaricom's backend, so it gets
+# the longest read timeout; connecting should always be quick.
+OPERATION_TIMEOUTS: Dict[str, httpx.Timeout] = {
+    "oauth": httpx.Timeout(5.0, connect=3.0),
+    "stk_push": httpx.Timeout(15.0, connect=3.0),
+    "transaction_status": httpx.Timeout(10.0, connect=3.0),
+}
+
+# Operations that are safe to resend after the request may have reached
+# Daraja. Others are only retried when the connection was never made.
+IDEMPOTENT_OPERATIONS = {"oauth", "transaction_status"}
+
+class DarajaClient:
+    """Long-lived, pooled HTTP client for the Safaricom Daraja API.
+
+    Reusing one ``httpx.AsyncClient`` keeps TLS connections to Safaricom warm
+    instead of paying a handshake on every payment call.
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.max_retries = 2
+        self.retry_backoff = 0.2
+        self.limits = httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self) -> None:
+        """Open the connection pool."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=self.limits,
+                timeout=OPERATION_TIMEOUTS["stk_push"]
+            )
+
+    async def close(self) -> None:
+        """Close the connection pool."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def request(self, operation: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request for a Daraja operation, retrying where it is safe."""
+        await self.start()
+        idempotent = operation in IDEMPOTENT_OPERATIONS
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = await self._client.request(
+                    method, url, timeout=OPERATION_TIMEOUTS[operation], **kwargs
+                )
+                response.raise_for_status()
+            except Exception as e:
+                DARAJA_REQUEST_SECONDS.labels(operation, type(e).__name__).observe(time.perf_counter() - started)
+                if attempt >= self.max_retries or not self._is_retryable(e, idempotent):
+                    raise
+                attempt += 1
+                await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+                continue
+
+            DARAJA_REQUEST_SECONDS.labels(operation, "ok").observe(time.perf_counter() - started)
+            return response
+
+    def _is_retryable(self, error: Exception, idempotent: bool) -> bool:
+        """Whether a failed request can be sent again without side effects."""
+        if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+            # The request never left this process
+            return True
+        if not idempotent:
+            return False
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code >= 500
+        return isinstance(error, httpx.TransportError)
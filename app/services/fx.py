@@ -0,0 +1,112 @@
+from typing import Dict, Optional
+import json
+import logging
+import os
+import time
+import httpx
+import redis
+from ..core.config import settings
+from ..core.lazy import LazyService
+from ..core.workers import PeriodicWorker
+
+logger = logging.getLogger(__name__)
+
+def parse_rates(text: str) -> Dict[str, float]:
+    """Parse ``"USD=1,KES=129.5"`` into a rate table."""
+    rates = {}
+    for pair in filter(None, (part.strip() for part in text.split(","))):
+        currency, _, rate = pair.partition("=")
+        rates[currency.strip().upper()] = float(rate)
+    return rates
+
+class FxService(PeriodicWorker):
+    """Currency conversion from a locally held rate table.
+
+    Rates are units of each currency per US dollar. Every worker keeps the
+    table in memory, so conversions never wait on the network. When
+    ``FX_RATES_URL`` is set, one worker at a time fetches fresh rates every
+    ``FX_REFRESH_HOURS`` and shares them through Redis; other workers pick
+    them up within ``reload_interval``. Until then, or if the source is
+    down, the static ``FX_RATES`` are used.
+    """
+
+    error_message = "Error refreshing FX rates"
+    error_delay = 300.0
+
+    def __init__(self):
+        super().__init__()
+        self.redis_client = redis.from_url(settings.REDIS_URL)
+        self.rates_key = "fx:rates"
+        self.refresh_lock_key = "fx:rates:refresh_lock"
+        self.source_url = settings.FX_RATES_URL
+        self.refresh_interval = settings.FX_REFRESH_HOURS * 3600
+        self.reload_interval = 60.0  # Seconds between checks for rates refreshed by another worker
+        self.rates = parse_rates(settings.FX_RATES)
+        self.updated_at = 0.0  # When the shared rates were fetched; 0 for the static table
+        self._checked_at = float("-inf")
+
+    def table(self) -> Dict[str, float]:
+        """The current rate table, picking up shared rates at most once per ``reload_interval``."""
+        now = time.monotonic()
+        if now - self._checked_at >= self.reload_interval:
+            self._checked_at = now
+            try:
+                self._load_shared_rates()
+            except redis.RedisError as e:
+                logger.warning("Could not load shared FX rates", extra={"error": repr(e)})
+        return self.rates
+
+    def rate(self, source: str, target: str) -> Optional[float]:
+        """Multiplier converting ``source`` amounts to ``target``, or None if either is unknown."""
+        if source == target:
+            return 1.0
+        rates = self.table()
+        if source not in rates or target not in rates:
+            return None
+        return rates[target] / rates[source]
+
+    def convert(self, amount: float, source: str, target: str) -> Optional[float]:
+        rate = self.rate(source, target)
+        return None if rate is None else amount * rate
+
+    async def refresh(self) -> bool:
+        """Fetch rates from ``FX_RATES_URL`` and share them, unless another worker is already doing so."""
+        if not self.redis_client.set(self.refresh_lock_key, os.getpid(), nx=True, ex=60):
+            return False
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            response = await client.get(self.source_url)
+            response.raise_for_status()
+            data = response.json()
+
+        # Sources quote against their own base; rebase to units per USD
+        rates = {currency.upper(): float(rate) for currency, rate in data["rates"].items()}
+        rates.setdefault(data.get("base", "USD").upper(), 1.0)
+        usd = rates["USD"]
+        rates = {currency: rate / usd for currency, rate in rates.items()}
+
+        self.rates = rates
+        self.updated_at = time.time()
+        self.redis_client.set(self.rates_key, json.dumps({"rates": rates, "updated_at": self.updated_at}))
+        return True
+
+    async def tick(self) -> float:
+        """Refresh the shared rates once they are older than ``refresh_interval``."""
+        self._load_shared_rates()
+        delay = self.updated_at + self.refresh_interval - time.time()
+        if delay <= 0:
+            await self.refresh()
+            delay = self.refresh_interval
+        return delay
+
+    def _load_shared_rates(self) -> bool:
+        """Load the rates shared in Redis into the local table."""
+        data = self.redis_client.get(self.rates_key)
+        if not data:
+            return False
+
+        shared = json.loads(data)
+        self.rates = shared["rates"]
+        self.updated_at = shared["updated_at"]
+        return True
+
+fx_service: LazyService[FxService] = LazyService(FxService)
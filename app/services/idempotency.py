@@ -0,0 +1,87 @@
+from typing import Dict, Any, Optional
+import redis
+import asyncio
+import hashlib
+import json
+import time
+from datetime import timedelta
+from ..core.config import settings
+from ..core.lazy import LazyService
+
+class IdempotencyConflict(Exception):
+    """An idempotency key was reused for a different request."""
+
+class IdempotencyInProgress(Exception):
+    """The original request for an idempotency key is still running."""
+
+class IdempotencyService:
+    """Short-lived records that let a retried request replay the first response.
+
+    The first request for a key claims it with ``SET NX``; replays get the
+    stored response back, and duplicates that arrive while the first is
+    still running wait for its result.
+    """
+
+    def __init__(self):
+        self.redis_client = redis.from_url(settings.REDIS_URL)
+        self.record_ttl = timedelta(minutes=30)
+        self.lease = timedelta(seconds=60)  # Claim lifetime if the owner dies mid-request
+        self.wait_timeout = 30.0
+        self.poll_interval = 0.1
+
+    def fingerprint(self, payload: Dict[str, Any]) -> str:
+        """Hash a request payload so key reuse with a different body is detected."""
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    async def begin(self, scope: str, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Claim a key, or return the stored response of an earlier request.
+
+        Returns ``None`` when the caller owns the key and should run the
+        request, then call ``complete`` with its outcome.
+        """
+        record_key = self._record_key(scope, key)
+        claimed = self.redis_client.set(
+            record_key,
+            json.dumps({"state": "in_progress", "fingerprint": fingerprint}),
+            nx=True,
+            ex=self.lease
+        )
+        if claimed:
+            return None
+
+        deadline = time.time() + self.wait_timeout
+        while True:
+            record_data = self.redis_client.get(record_key)
+            if not record_data:
+                # The owner died and its claim expired; run the request ourselves
+                return await self.begin(scope, key, fingerprint)
+
+            record = json.loads(record_data)
+            if record["fingerprint"] != fingerprint:
+                raise IdempotencyConflict("Idempotency key was already used for a different request")
+            if record["state"] == "done":
+                return record["response"]
+            if time.time() >= deadline:
+                raise IdempotencyInProgress("Original request is still being processed")
+            await asyncio.sleep(self.poll_interval)
+
+    async def complete(self, scope: str, key: str, fingerprint: str, status_code: int, body: Dict[str, Any]) -> None:
+        """Store the final response for a key."""
+        self.redis_client.setex(
+            self._record_key(scope, key),
+            self.record_ttl,
+            json.dumps({
+                "state": "done",
+                "fingerprint": fingerprint,
+                "response": {"status_code": status_code, "body": body}
+            })
+        )
+
+    def _record_key(self, scope: str, key: str) -> str:
+        return f"idempotency:{scope}:{key}"
+
+idempotency_service: LazyService[IdempotencyService] = LazyService(IdempotencyService)
+
+def get_idempotency_service() -> IdempotencyService:
+    """FastAPI dependency returning the shared IdempotencyService."""
+    return idempotency_service.get()
@@ -1,25 +1,88 @@
 from typing import Dict, Any, Optional, Tuple
-import httpx
+import redis
+import asyncio
+import os
+import random
 from ..core.config import settings
+from ..core.lazy import LazyService
+from ..core.workers import PeriodicWorker
 import json
 import hashlib
 import time
 from datetime import datetime, timedelta
 import base64
 import re
+import uuid
 from .transactions import transaction_service
+from .daraja import DarajaClient, OPERATION_TIMEOUTS
+
+# Deletes the refresh lock only if it still holds our token, so a refresher
+# that outlived its lock can't remove the next holder's
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+class TokenRefresher(PeriodicWorker):
+    """Refreshes the shared Daraja token shortly before it expires."""
+
+    error_message = "Error refreshing M-Pesa access token"
+    error_delay = 30.0
+
+    def __init__(self, service: "MPesaService"):
+        super().__init__()
+        self.service = service
+        self._jitter: Optional[float] = None
+
+    async def tick(self) -> float:
+        service = self.service
+        if self._jitter is None:
+            # Spread workers out so the one that wins the lock usually refreshes alone
+            self._jitter = random.uniform(0, service.token_refresh_margin / 4)
+        service._load_shared_token()
+        refresh_at = service._token_expiry - service.token_refresh_margin - self._jitter
+        if refresh_at > time.time():
+            return refresh_at - time.time()
+
+        async with service._token_lock:
+            # Another worker may have refreshed while we slept
+            service._load_shared_token()
+            if time.time() >= service._token_expiry - service.token_refresh_margin - self._jitter:
+                await service._refresh_access_token()
+        self._jitter = None
+        return 0
 
 class MPesaService:
     def __init__(self):
         self.consumer_key = settings.MPESA_CONSUMER_KEY
         self.consumer_secret = settings.MPESA_CONSUMER_SECRET
         self.environment = settings.MPESA_ENV
-        self.base_url = "https://sandbox.safaricom.co.ke" if self.environment == "sandbox" else "https://api.safaricom.co.ke"
+        self.base_url = settings.MPESA_BASE_URL or (
+            "https://sandbox.safaricom.co.ke" if self.environment == "sandbox" else "https://api.safaricom.co.ke"
+        )
+        self.daraja = DarajaClient(self.base_url)
+        self.redis_client = redis.from_url(settings.REDIS_URL)
         self._access_token = None
-        self._token_expiry = None
+        self._token_expiry = 0.0
+        self._token_lock = asyncio.Lock()
+        self.token_refresher = TokenRefresher(self)
+        self.token_key = f"mpesa:access_token:{self.environment}"
+        self.token_lock_key = f"{self.token_key}:refresh_lock"
+        self.token_refresh_margin = 300  # Refresh tokens five minutes before they expire
+        # Outlast the slowest OAuth fetch (every attempt timing out, plus the
+        # backoff between them) with a margin, so the lock can't lapse mid-fetch
+        oauth_timeout = OPERATION_TIMEOUTS["oauth"]
+        slowest_fetch = (self.daraja.max_retries + 1) * (oauth_timeout.connect + oauth_timeout.read) + sum(
+            self.daraja.retry_backoff * 2 ** retry for retry in range(self.daraja.max_retries)
+        )
+        self.token_lock_timeout = slowest_fetch + 5.0
+        self._release_lock_script = self.redis_client.register_script(RELEASE_LOCK_SCRIPT)
         self.shortcode = "174379"  # Sandbox shortcode
         self.passkey = "bfb279f9aa9bdbcf158e97dd71a467cd2e0c893059b10f78e6b72ada1ed2c919"  # Sandbox passkey
         self.max_attempts = 3
+        self.reconcile_after = timedelta(minutes=2)  # Check status if no callback by then
 
     def validate_phone_number(self, phone_number: str) -> Tuple[bool, str]:
         """Validate phone number format."""
@@ -60,28 +123,85 @@ class MPesaService:
         return True, str(amount)
 
     async def get_access_token(self) -> str:
-        """Get M-Pesa access token."""
-        if self._access_token and self._token_expiry and datetime.now() < self._token_expiry:
+        """Get M-Pesa access token.
+
+        Tokens are shared by all workers through Redis and refreshed ahead of
+        expiry by the background refresher, so in steady state this never
+        calls the OAuth endpoint.
+        """
+        now = time.time()
+        if self._access_token and now < self._token_expiry - self.token_refresh_margin:
             return self._access_token
 
+        # Near expiry: pick up a token another worker may have refreshed
+        if self._load_shared_token() and time.time() < self._token_expiry:
+            return self._access_token
+
+        # No usable token anywhere: fetch one, once per process
+        async with self._token_lock:
+            if self._load_shared_token() and time.time() < self._token_expiry:
+                return self._access_token
+            return await self._refresh_access_token()
+
+    async def _refresh_access_token(self) -> str:
+        """Fetch a new token if this worker wins the refresh lock, else wait for the winner."""
+        lock_token = f"{os.getpid()}:{uuid.uuid4().hex}"
+        lock_acquired = self.redis_client.set(
+            self.token_lock_key, lock_token, nx=True, px=int(self.token_lock_timeout * 1000)
+        )
+        if not lock_acquired:
+            deadline = time.time() + self.token_lock_timeout
+            previous_expiry = self._token_expiry
+            while time.time() < deadline:
+                await asyncio.sleep(0.1)
+                if self._load_shared_token() and self._token_expiry != previous_expiry:
+                    return self._access_token
+            # The elected refresher didn't deliver; fetch our own rather than fail
+
         try:
-            auth_url = f"{self.base_url}/oauth/v1/generate?grant_type=client_credentials"
-            auth = (self.consumer_key, self.consumer_secret)
+            token, expires_in = await self._fetch_access_token()
+            self._access_token = token
+            self._token_expiry = time.time() + expires_in
+            self.redis_client.setex(
+                self.token_key,
+                int(expires_in),
+                json.dumps({"access_token": token, "expires_at": self._token_expiry})
+            )
+            return token
+        finally:
+            if lock_acquired:
+                self._release_lock_script(keys=[self.token_lock_key], args=[lock_token], client=self.redis_client)
+
+    def _load_shared_token(self) -> bool:
+        """Load the token shared in Redis into the local cache."""
+        token_data = self.redis_client.get(self.token_key)
+        if not token_data:
+            return False
+
+        token = json.loads(token_data)
+        self._access_token = token["access_token"]
+        self._token_expiry = token["expires_at"]
+        return True
+
+    async def _fetch_access_token(self) -> Tuple[str, float]:
+        """Request a new token from the Daraja OAuth endpoint."""
+        try:
+            response = await self.daraja.request(
+                "oauth",
+                "GET",
+                "/oauth/v1/generate",
+                params={"grant_type": "client_credentials"},
+                auth=(self.consumer_key, self.consumer_secret)
+            )
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(auth_url, auth=auth)
-                response.raise_for_status()
-                
-                data = response.json()
-                self._access_token = data["access_token"]
-                self._token_expiry = datetime.now() + timedelta(seconds=data["expires_in"])
-                
-                return self._access_token
+            data = response.json()
+            return data["access_token"], float(data["expires_in"])
         except Exception as e:
             raise Exception(f"Failed to get access token: {str(e)}")
 
     async def initiate_stk_push(self, phone_number: str, amount: float) -> Dict[str, Any]:
         """Initiate STK push for payment."""
+        transaction = None
         try:
             # Validate inputs
             phone_valid, phone_message = self.validate_phone_number(phone_number)
@@ -117,7 +237,7 @@ class MPesaService:
                 "PartyA": formatted_phone,
                 "PartyB": self.shortcode,
                 "PhoneNumber": formatted_phone,
-                "CallBackURL": f"{settings.BASE_URL}/api/v1/tip/callback",
+                "CallBackURL": f"{settings.BASE_URL}{settings.API_V1_STR}/tip/callback",
                 "AccountReference": transaction["id"],
                 "TransactionDesc": "Payment for AI-TRS Tip"
             }
@@ -128,52 +248,53 @@ class MPesaService:
                 "Content-Type": "application/json"
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/mpesa/stkpush/v1/processrequest",
-                    json=payload,
-                    headers=headers
+            response = await self.daraja.request(
+                "stk_push",
+                "POST",
+                "/mpesa/stkpush/v1/processrequest",
+                json=payload,
+                headers=headers
+            )
+            
+            result = response.json()
+            
+            # Check if STK push was successful
+            if result.get("ResponseCode") == "0":
+                # Update transaction with STK push details and index it for the callback
+                await transaction_service.attach_checkout_request(
+                    transaction["id"],
+                    result["CheckoutRequestID"],
+                    {
+                        "status": "pending",
+                        "stk_push_response": result
+                    },
+                    reconcile_after=self.reconcile_after
                 )
-                response.raise_for_status()
-                
-                result = response.json()
                 
-                # Check if STK push was successful
-                if result.get("ResponseCode") == "0":
-                    # Update transaction with STK push details
-                    await transaction_service.update_transaction(
-                        transaction["id"],
-                        {
-                            "stk_push_id": result["CheckoutRequestID"],
-                            "status": "pending",
-                            "stk_push_response": result
-                        }
-                    )
-                    
-                    return {
-                        "success": True,
-                        "message": "Please check your phone to complete the payment",
-                        "transaction_id": transaction["id"],
-                        "stk_push_id": result["CheckoutRequestID"],
-                        "status": "pending"
-                    }
-                else:
-                    # Update transaction with error
-                    await transaction_service.update_transaction(
-                        transaction["id"],
-                        {
-                            "status": "failed",
-                            "error": result.get("ResponseDescription", "Failed to initiate payment")
-                        }
-                    )
-                    
-                    return {
-                        "success": False,
-                        "message": result.get("ResponseDescription", "Failed to initiate payment"),
-                        "transaction_id": transaction["id"],
-                        "status": "failed"
+                return {
+                    "success": True,
+                    "message": "Please check your phone to complete the payment",
+                    "transaction_id": transaction["id"],
+                    "stk_push_id": result["CheckoutRequestID"],
+                    "status": "pending"
+                }
+            else:
+                # Update transaction with error
+                await transaction_service.update_transaction(
+                    transaction["id"],
+                    {
+                        "status": "failed",
+                        "error": result.get("ResponseDescription", "Failed to initiate payment")
                     }
+                )
                 
+                return {
+                    "success": False,
+                    "message": result.get("ResponseDescription", "Failed to initiate payment"),
+                    "transaction_id": transaction["id"],
+                    "status": "failed"
+                }
+            
         except ValueError as e:
             # Handle validation errors
             return {
@@ -205,6 +326,7 @@ class MPesaService:
 
     async def verify_transaction(self, transaction_id: str) -> Dict[str, Any]:
         """Verify transaction status."""
+        transaction = None
         try:
             # Get transaction details
             transaction = await transaction_service.get_transaction(transaction_id)
@@ -234,54 +356,54 @@ class MPesaService:
                 "Content-Type": "application/json"
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/mpesa/transactionstatus/v1/query",
-                    params={"TransactionID": transaction_id},
-                    headers=headers
-                )
-                response.raise_for_status()
-                
-                result = response.json()
-                
-                # Update transaction status
-                if result.get("ResultCode") == 0:
-                    await transaction_service.update_transaction(
-                        transaction_id,
-                        {
-                            "status": "completed",
-                            "mpesa_response": result
-                        }
-                    )
-                    return {
-                        "success": True,
-                        "message": "Transaction completed successfully",
+            response = await self.daraja.request(
+                "transaction_status",
+                "GET",
+                "/mpesa/transactionstatus/v1/query",
+                params={"TransactionID": transaction_id},
+                headers=headers
+            )
+            
+            result = response.json()
+            
+            # Update transaction status
+            if result.get("ResultCode") == 0:
+                await transaction_service.update_transaction(
+                    transaction_id,
+                    {
                         "status": "completed",
-                        "transaction": transaction
+                        "mpesa_response": result
                     }
-                else:
-                    await transaction_service.update_transaction(
-                        transaction_id,
-                        {
-                            "status": "failed",
-                            "error": result.get("ResultDesc", "Transaction failed")
-                        }
-                    )
-                    return {
-                        "success": False,
-                        "message": result.get("ResultDesc", "Transaction failed"),
+                )
+                return {
+                    "success": True,
+                    "message": "Transaction completed successfully",
+                    "status": "completed",
+                    "transaction": transaction
+                }
+            else:
+                await transaction_service.update_transaction(
+                    transaction_id,
+                    {
                         "status": "failed",
-                        "transaction": transaction
+                        "error": result.get("ResultDesc", "Transaction failed")
                     }
-                
+                )
+                return {
+                    "success": False,
+                    "message": result.get("ResultDesc", "Transaction failed"),
+                    "status": "failed",
+                    "transaction": transaction
+                }
+            
         except Exception as e:
             error_message = f"Error verifying transaction: {str(e)}"
             if transaction:
+                # Keep the status: a failed status query says nothing about the payment
                 await transaction_service.update_transaction(
                     transaction_id,
                     {
-                        "status": "error",
-                        "error": error_message
+                        "last_error": error_message
                     }
                 )
             return {
@@ -290,4 +412,8 @@ class MPesaService:
                 "status": "error"
             }
 
-mpesa_service = MPesaService() 
\ No newline at end of file
+mpesa_service: LazyService[MPesaService] = LazyService(MPesaService)
+
+def get_mpesa_service() -> MPesaService:
+    """FastAPI dependency returning the shared MPesaService."""
+    return mpesa_service.get()
@@ -1,19 +1,59 @@
-from typing import List, Dict, Any, Optional
-import openai
-from langdetect import detect
+from typing import List, Dict, Any, Optional, AsyncIterator
 from ..core.config import settings
+from ..core.lazy import LazyService
+from ..core.metrics import LLM_CALLS_IN_FLIGHT, SEMANTIC_CACHE_REQUESTS
+from ..core.timing import timed_stage
 from ..models.schemas import QueryType, Product
+from .context import context_manager
+from .semantic_cache import SemanticCache, embed
 
 class NLPService:
     def __init__(self):
-        openai.api_key = settings.OPENAI_API_KEY
         self.model = settings.OPENAI_MODEL
+        self._client = None
+        # Recent first-turn analyses, reused for paraphrased queries
+        self.semantic_cache: Optional[SemanticCache] = None
+        if settings.SEMANTIC_CACHE_ENABLED:
+            self.semantic_cache = SemanticCache(
+                capacity=settings.SEMANTIC_CACHE_SIZE,
+                threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+                ttl=settings.SEMANTIC_CACHE_TTL
+            )
+
+    @property
+    def client(self):
+        """OpenAI client, created on first use; the SDK is the slowest import in the app."""
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=settings.OPENAI_BASE_URL or None
+            )
+        return self._client
 
     async def process_query(self, query: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Process user query and return structured response."""
+        """Process user query and return structured response.
+
+        Without conversation context, an analysis of a recent query similar
+        enough to this one is reused instead of calling the model.
+        """
         try:
+            context_prompt = context_manager.render(context)
+            vector = None
+            if self.semantic_cache is not None and not context_prompt:
+                with timed_stage("semantic_cache"):
+                    vector = embed(query)
+                    cached = self.semantic_cache.lookup(vector)
+                if cached:
+                    SEMANTIC_CACHE_REQUESTS.labels("hit").inc()
+                    result, _ = cached
+                    return {**result, "query_type": self._determine_query_type(query, result["analysis"])}
+                SEMANTIC_CACHE_REQUESTS.labels("miss").inc()
+
             # Detect language
-            language = detect(query)
+            from langdetect import detect
+            with timed_stage("language_detection"):
+                language = detect(query)
             
             # Prepare system message
             system_message = {
@@ -34,22 +74,24 @@ class NLPService:
                 "content": query
             }
             
-            # Add context if available
+            # Add bounded conversation context if available
             messages = [system_message]
-            if context:
+            if context_prompt:
                 messages.append({
                     "role": "system",
-                    "content": f"Previous context: {context}"
+                    "content": f"Previous context:\n{context_prompt}"
                 })
             messages.append(user_message)
             
             # Call OpenAI API
-            response = await openai.ChatCompletion.acreate(
-                model=self.model,
-                messages=messages,
-                temperature=0.7,
-                max_tokens=500
-            )
+            with LLM_CALLS_IN_FLIGHT.track_inprogress(), \
+                    timed_stage("llm_analysis"):
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=500
+                )
             
             # Parse response
             analysis = response.choices[0].message.content
@@ -57,12 +99,15 @@ class NLPService:
             # Determine query type
             query_type = self._determine_query_type(query, analysis)
             
-            return {
+            result = {
                 "analysis": analysis,
                 "language": language,
                 "query_type": query_type,
                 "needs_clarification": self._needs_clarification(analysis)
             }
+            if vector is not None:
+                self.semantic_cache.add(vector, result)
+            return result
             
         except Exception as e:
             raise Exception(f"Error processing query: {str(e)}")
@@ -89,20 +134,49 @@ class NLPService:
         ]
         return any(indicator in analysis.lower() for indicator in clarification_indicators)
 
+    def _clarification_messages(self, analysis: str) -> List[Dict[str, str]]:
+        """Build the prompt used to ask for a clarification question."""
+        return [
+            {"role": "system", "content": "Generate a single, clear question to clarify the user's needs."},
+            {"role": "user", "content": f"Based on this analysis: {analysis}"}
+        ]
+
     async def generate_clarification_question(self, analysis: str) -> str:
         """Generate a clarification question based on the analysis."""
         try:
-            response = await openai.ChatCompletion.acreate(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "Generate a single, clear question to clarify the user's needs."},
-                    {"role": "user", "content": f"Based on this analysis: {analysis}"}
-                ],
-                temperature=0.7,
-                max_tokens=100
-            )
+            with LLM_CALLS_IN_FLIGHT.track_inprogress(), \
+                    timed_stage("llm_clarification"):
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=self._clarification_messages(analysis),
+                    temperature=0.7,
+                    max_tokens=100
+                )
             return response.choices[0].message.content.strip()
         except Exception as e:
             raise Exception(f"Error generating clarification: {str(e)}")
 
-nlp_service = NLPService() 
\ No newline at end of file
+    async def stream_clarification_question(self, analysis: str) -> AsyncIterator[str]:
+        """Stream a clarification question token by token as the model produces it."""
+        try:
+            with LLM_CALLS_IN_FLIGHT.track_inprogress(), \
+                    timed_stage("llm_clarification"):
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=self._clarification_messages(analysis),
+                    temperature=0.7,
+                    max_tokens=100,
+                    stream=True
+                )
+                async for chunk in response:
+                    token = chunk.choices[0].delta.content if chunk.choices else None
+                    if token:
+                        yield token
+        except Exception as e:
+            raise Exception(f"Error streaming clarification: {str(e)}")
+
+nlp_service: LazyService[NLPService] = LazyService(NLPService)
+
+def get_nlp_service() -> NLPService:
+    """FastAPI dependency returning the shared NLPService."""
+    return nlp_service.get()
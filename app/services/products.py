@@ -1,197 +1,548 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, TYPE_CHECKING
 import httpx
 import redis
-from bs4 import BeautifulSoup
 from ..core.config import settings
+from ..core.lazy import LazyService
+from ..core.logs import ErrorAggregator
+from ..core.metrics import (
+    VENDOR_SEARCH_SECONDS,
+    VENDOR_ERRORS,
+    PRODUCT_CACHE_REQUESTS,
+    VENDOR_SEARCHES_IN_FLIGHT
+)
+from ..core.rate_limit import mark_cache_served
+from ..core.timing import timed_stage, record_stage
 from ..models.schemas import Product, ProductSpec, Price
+from .fx import fx_service
 import json
 import asyncio
+import logging
+import time
 from datetime import timedelta
 import re
-from urllib.parse import quote_plus
+from urllib.parse import quote_plus, urlsplit
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+# Currency each vendor quotes prices (and takes price filters) in
+VENDOR_CURRENCIES = {"jumia": "KES", "amazon": "USD", "ebay": "USD"}
+
+# Items that fail to parse, counted per vendor and selector and logged once per interval
+parse_errors = ErrorAggregator(
+    logger,
+    "Vendor items failed to parse",
+    ("vendor", "reason"),
+    settings.PARSE_ERROR_LOG_INTERVAL
+)
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace so trivially different queries share a search."""
+    return " ".join(query.lower().split())
+
+def _parse_html(html: str) -> "BeautifulSoup":
+    """Parse a results page; bs4 is imported on the first search, not at startup."""
+    from bs4 import BeautifulSoup
+    with timed_stage("html_parse"):
+        return BeautifulSoup(html, 'html.parser')
+
+class MissingElement(Exception):
+    """A selector matched nothing, usually because the vendor changed its markup."""
+
+    def __init__(self, selector: str):
+        super().__init__(f"No element matches {selector!r}")
+        self.selector = selector
+
+def _select(item: "BeautifulSoup", selector: str) -> "BeautifulSoup":
+    element = item.select_one(selector)
+    if element is None:
+        raise MissingElement(selector)
+    return element
+
+# Product's field limits, applied when scraping so top-N validation can't fail on them
+NAME_MAX_LENGTH = Product.model_fields["name"].metadata[0].max_length
+DESCRIPTION_MAX_LENGTH = Product.model_fields["description"].metadata[0].max_length
+
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+def _is_http_url(url: Any) -> bool:
+    if not isinstance(url, str):
+        return False
+    parts = urlsplit(url)
+    return parts.scheme in ("http", "https") and bool(parts.hostname)
+
+class Candidate:
+    """A scraped product, kept unvalidated through dedup and ranking.
+
+    Only the candidates a caller actually returns are turned into validated
+    ``Product`` models, see ``ProductService.search_products``.
+    """
+    __slots__ = ("name", "description", "specs", "image_url", "price", "currency", "vendor_url", "confidence_score")
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        specs: Tuple[Tuple[str, str], ...],
+        image_url: str,
+        price: float,
+        currency: str,
+        vendor_url: str,
+        confidence_score: float
+    ):
+        self.name = name
+        self.description = description
+        self.specs = specs
+        self.image_url = image_url
+        self.price = price
+        self.currency = currency
+        self.vendor_url = vendor_url
+        self.confidence_score = confidence_score
+
+    @classmethod
+    def scraped(
+        cls,
+        name: str,
+        description: str,
+        specs: List[Tuple[str, str]],
+        image_url: Any,
+        price: float,
+        currency: str,
+        vendor_url: Any,
+        confidence_score: float
+    ) -> Optional["Candidate"]:
+        """Repair what a ``Product`` would reject; None if it can't be repaired."""
+        if not name or not _is_http_url(image_url) or not _is_http_url(vendor_url):
+            return None
+        return cls(
+            _truncate(name, NAME_MAX_LENGTH),
+            _truncate(description, DESCRIPTION_MAX_LENGTH),
+            tuple(specs),
+            image_url,
+            price,
+            currency,
+            vendor_url,
+            min(max(confidence_score, 0.0), 1.0)
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Candidate":
+        """Read a cached entry; these were repaired before they were cached."""
+        return cls(
+            data["name"],
+            data["description"],
+            tuple((spec["key"], spec["value"]) for spec in data["specs"]),
+            data["image_url"],
+            data["price"]["value"],
+            data["price"]["currency"],
+            data["vendor_url"],
+            data["confidence_score"]
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The same shape as ``Product.model_dump(mode="json")``."""
+        return {
+            "name": self.name,
+            "description": self.description,
+            "specs": [{"key": key, "value": value} for key, value in self.specs],
+            "image_url": self.image_url,
+            "price": {"value": self.price, "currency": self.currency},
+            "vendor_url": self.vendor_url,
+            "confidence_score": self.confidence_score
+        }
+
+    def to_product(self) -> Product:
+        return Product(
+            name=self.name,
+            description=self.description,
+            specs=[ProductSpec(key=key, value=value) for key, value in self.specs],
+            image_url=self.image_url,
+            price=Price(value=self.price, currency=self.currency),
+            vendor_url=self.vendor_url,
+            confidence_score=self.confidence_score
+        )
 
 class ProductService:
     def __init__(self):
         self.redis_client = redis.from_url(settings.REDIS_URL)
         self.cache_ttl = timedelta(hours=1)
+        self.batch_concurrency = 5  # Distinct searches fetched at once by search_products_batch
+        self.currency = settings.PRICE_CURRENCY  # Every candidate's price is converted to this
+        self.fx = fx_service
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
 
-    async def search_products(self, query: str, filters: Optional[Dict[str, Any]] = None) -> List[Product]:
-        """Search for products across multiple sources."""
+    async def search_products(
+        self,
+        query: str,
+        filters: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None
+    ) -> List[Product]:
+        """Search for products across multiple sources, best first.
+
+        Every candidate is cached, but only the first ``limit`` (all if None)
+        within ``filters["budget"]`` are built into ``Product`` models.
+        """
         # Try to get from cache first
-        cache_key = f"products:{query}:{json.dumps(filters or {})}"
-        cached_result = self.redis_client.get(cache_key)
+        cache_key = self._cache_key(query, filters)
+        with timed_stage("cache_get"):
+            cached_result = self.redis_client.get(cache_key)
         if cached_result:
-            return json.loads(cached_result)
+            PRODUCT_CACHE_REQUESTS.labels("hit").inc()
+            mark_cache_served()
+            return self._build_products(self._within_budget(self._decode_products(cached_result), filters), limit)
+        PRODUCT_CACHE_REQUESTS.labels("miss").inc()
+
+        candidates = await self._fetch_products(normalize_query(query), filters)
+
+        # Cache results
+        payload = self._encode_products(candidates)
+        with timed_stage("cache_set"):
+            self.redis_client.setex(cache_key, self.cache_ttl, payload)
 
+        return self._build_products(self._within_budget(candidates, filters), limit)
+
+    async def search_products_batch(
+        self,
+        searches: List[Tuple[str, Optional[Dict[str, Any]]]],
+        limit: Optional[int] = None
+    ) -> List[List[Product]]:
+        """Run several ``(query, filters)`` searches, sharing work across them.
+
+        Searches with the same cache key are looked up, fetched and built
+        into products once. All cache reads go in one MGET and all writes in
+        one pipeline. Results are returned in input order.
+        """
+        keys = [self._cache_key(query, filters) for query, filters in searches]
+        distinct: Dict[str, Tuple[str, Optional[Dict[str, Any]]]] = {}
+        for key, search in zip(keys, searches):
+            distinct.setdefault(key, search)
+
+        with timed_stage("cache_get"):
+            cached_results = self.redis_client.mget(list(distinct))
+
+        found: Dict[str, List[Candidate]] = {}
+        misses = []
+        for key, cached_result in zip(distinct, cached_results):
+            if cached_result:
+                PRODUCT_CACHE_REQUESTS.labels("hit").inc()
+                found[key] = self._decode_products(cached_result)
+            else:
+                PRODUCT_CACHE_REQUESTS.labels("miss").inc()
+                misses.append(key)
+
+        # Bound outbound scrapes: each search hits every vendor
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+
+        async def fetch(key: str) -> List[Candidate]:
+            query, filters = distinct[key]
+            async with semaphore:
+                return await self._fetch_products(normalize_query(query), filters)
+
+        fetched = await asyncio.gather(*(fetch(key) for key in misses))
+        if misses:
+            payloads = [self._encode_products(candidates) for candidates in fetched]
+            with timed_stage("cache_set"):
+                pipe = self.redis_client.pipeline(transaction=False)
+                for key, payload in zip(misses, payloads):
+                    pipe.setex(key, self.cache_ttl, payload)
+                pipe.execute()
+            found.update(zip(misses, fetched))
+
+        products = {
+            key: self._build_products(self._within_budget(candidates, distinct[key][1]), limit)
+            for key, candidates in found.items()
+        }
+        # Copies, so callers can sort and slice their own list
+        return [list(products[key]) for key in keys]
+
+    def _cache_key(self, query: str, filters: Optional[Dict[str, Any]]) -> str:
+        return f"products:{normalize_query(query)}:{json.dumps(filters or {}, sort_keys=True)}"
+
+    def _encode_products(self, candidates: List[Candidate]) -> str:
+        with timed_stage("serialization"):
+            return json.dumps([candidate.to_dict() for candidate in candidates])
+
+    def _decode_products(self, payload: bytes) -> List[Candidate]:
+        with timed_stage("serialization"):
+            return [Candidate.from_dict(candidate) for candidate in json.loads(payload)]
+
+    def _normalize_prices(self, candidates: List[Candidate]) -> List[Candidate]:
+        """Convert candidate prices to ``self.currency`` in place.
+
+        Rates are looked up once per currency present, then applied in a
+        single pass. Candidates in a currency without a rate keep their own.
+        """
+        with timed_stage("price_normalization"):
+            rates = {
+                currency: self.fx.rate(currency, self.currency)
+                for currency in {candidate.currency for candidate in candidates} - {self.currency}
+            }
+            for candidate in candidates:
+                rate = rates.get(candidate.currency)
+                if rate is not None:
+                    candidate.price = round(candidate.price * rate, 2)
+                    candidate.currency = self.currency
+        return candidates
+
+    def _within_budget(self, candidates: List[Candidate], filters: Optional[Dict[str, Any]]) -> List[Candidate]:
+        """Drop candidates priced over ``filters["budget"]``, before ranking picks the top ones.
+
+        Candidates in a currency that can't be compared with the budget are kept.
+        """
+        budget = (filters or {}).get("budget")
+        if not budget:
+            return candidates
+        with timed_stage("budget_filter"):
+            ceilings = {
+                currency: self.fx.convert(budget["max"], budget["currency"], currency)
+                for currency in {candidate.currency for candidate in candidates}
+            }
+            return [
+                candidate for candidate in candidates
+                if ceilings[candidate.currency] is None or candidate.price <= ceilings[candidate.currency]
+            ]
+
+    def _budget_ceiling(self, filters: Optional[Dict[str, Any]], vendor: str) -> Optional[float]:
+        """The budget in ``vendor``'s currency, for vendors' own price filters."""
+        budget = (filters or {}).get("budget")
+        if not budget:
+            return None
+        return self.fx.convert(budget["max"], budget["currency"], VENDOR_CURRENCIES[vendor])
+
+    def _build_products(self, candidates: List[Candidate], limit: Optional[int] = None) -> List[Product]:
+        """Validate the first ``limit`` candidates into products, skipping any that still fail."""
+        products = []
+        with timed_stage("validation"):
+            for candidate in candidates:
+                if limit is not None and len(products) >= limit:
+                    break
+                try:
+                    products.append(candidate.to_product())
+                except ValueError as e:
+                    logger.warning("Error building product", extra={"vendor_url": candidate.vendor_url, "error": str(e)})
+        return products
+
+    async def _fetch_products(self, query: str, filters: Optional[Dict[str, Any]] = None) -> List[Candidate]:
+        """Search every vendor concurrently and merge the results, best first."""
         # Search across multiple sources concurrently
         tasks = [
-            self._search_jumia(query, filters),
-            self._search_amazon(query, filters),
-            self._search_ebay(query, filters)
+            self._timed_search("jumia", self._search_jumia(query, filters)),
+            self._timed_search("amazon", self._search_amazon(query, filters)),
+            self._timed_search("ebay", self._search_ebay(query, filters))
         ]
         
         results = await asyncio.gather(*tasks, return_exceptions=True)
-        
+        return self._normalize_prices(self._merge_results(results))
+
+    def _merge_results(self, results: List[Any]) -> List[Candidate]:
+        """Combine per-vendor results, dropping duplicates and failures, best first."""
         # Combine results and remove duplicates
-        products = []
+        candidates = []
         seen_urls = set()
         
         for result in results:
             if isinstance(result, list):
-                for product in result:
-                    if product.vendor_url not in seen_urls:
-                        products.append(product)
-                        seen_urls.add(product.vendor_url)
+                for candidate in result:
+                    if candidate.vendor_url not in seen_urls:
+                        candidates.append(candidate)
+                        seen_urls.add(candidate.vendor_url)
 
         # Sort by confidence score
-        products.sort(key=lambda x: x.confidence_score, reverse=True)
-        
-        # Cache results
-        self.redis_client.setex(
-            cache_key,
-            self.cache_ttl,
-            json.dumps(products)
-        )
+        candidates.sort(key=lambda x: x.confidence_score, reverse=True)
+        return candidates
 
-        return products
+    async def _timed_search(self, vendor: str, search) -> List[Candidate]:
+        """Await one vendor search, recording its latency and concurrency."""
+        started = time.perf_counter()
+        try:
+            with VENDOR_SEARCHES_IN_FLIGHT.labels(vendor).track_inprogress():
+                return await search
+        finally:
+            elapsed = time.perf_counter() - started
+            VENDOR_SEARCH_SECONDS.labels(vendor).observe(elapsed)
+            record_stage(f"search_{vendor}", elapsed)
 
-    async def _search_jumia(self, query: str, filters: Optional[Dict[str, Any]] = None) -> List[Product]:
+    async def _search_jumia(self, query: str, filters: Optional[Dict[str, Any]] = None) -> List[Candidate]:
         """Search products on Jumia."""
         try:
             # Construct search URL
-            search_url = f"https://www.jumia.co.ke/catalog/?q={quote_plus(query)}"
+            search_url = f"{settings.JUMIA_BASE_URL}/catalog/?q={quote_plus(query)}"
             if filters:
-                search_url += "&" + "&".join(f"{k}={v}" for k, v in filters.items())
+                params = {k: v for k, v in filters.items() if k != "budget"}
+                if params:
+                    search_url += "&" + "&".join(f"{k}={v}" for k, v in params.items())
+            ceiling = self._budget_ceiling(filters, "jumia")
+            if ceiling is not None:
+                search_url += f"&price=0-{int(ceiling)}"
 
             async with httpx.AsyncClient() as client:
                 response = await client.get(search_url, headers=self.headers)
                 response.raise_for_status()
-                
-                soup = BeautifulSoup(response.text, 'html.parser')
-                products = []
-
-                for item in soup.select('article.prd'):
-                    try:
-                        name = item.select_one('h3.name').text.strip()
-                        price_text = item.select_one('div.prc').text.strip()
-                        price_value = float(re.sub(r'[^\d.]', '', price_text))
-                        
-                        product = Product(
-                            name=name,
-                            description=item.select_one('div.desc').text.strip(),
-                            specs=self._extract_specs(item),
-                            image_url=item.select_one('img.img')['data-src'],
-                            price=Price(value=price_value, currency="KES"),
-                            vendor_url=item.select_one('a.core')['href'],
-                            confidence_score=self._calculate_confidence_score(item, query)
-                        )
-                        products.append(product)
-                    except Exception as e:
-                        print(f"Error parsing Jumia product: {str(e)}")
-                        continue
-
-                return products
+                return self._parse_jumia(response.text, query)
 
         except Exception as e:
-            print(f"Error searching Jumia: {str(e)}")
+            VENDOR_ERRORS.labels("jumia", type(e).__name__).inc()
+            logger.warning("Vendor search failed", extra={"vendor": "jumia", "error": repr(e)})
             return []
 
-    async def _search_amazon(self, query: str, filters: Optional[Dict[str, Any]] = None) -> List[Product]:
+    def _parse_jumia(self, html: str, query: str) -> List[Candidate]:
+        """Parse a Jumia results page into candidates."""
+        soup = _parse_html(html)
+        candidates = []
+
+        for item in soup.select('article.prd'):
+            try:
+                name = _select(item, 'h3.name').text.strip()
+                price_text = _select(item, 'div.prc').text.strip()
+                price_value = float(re.sub(r'[^\d.]', '', price_text))
+                
+                candidate = Candidate.scraped(
+                    name=name,
+                    description=_select(item, 'div.desc').text.strip(),
+                    specs=self._extract_specs(item),
+                    image_url=_select(item, 'img.img').get('data-src'),
+                    price=price_value,
+                    currency=VENDOR_CURRENCIES["jumia"],
+                    vendor_url=_select(item, 'a.core').get('href'),
+                    confidence_score=self._calculate_confidence_score(item, query)
+                )
+                if candidate is None:
+                    VENDOR_ERRORS.labels("jumia", "InvalidProduct").inc()
+                    parse_errors.record("jumia", "invalid_product")
+                    continue
+                candidates.append(candidate)
+            except Exception as e:
+                VENDOR_ERRORS.labels("jumia", type(e).__name__).inc()
+                parse_errors.record("jumia", getattr(e, "selector", type(e).__name__))
+                continue
+
+        return candidates
+
+    async def _search_amazon(self, query: str, filters: Optional[Dict[str, Any]] = None) -> List[Candidate]:
         """Search products on Amazon."""
         try:
             # Construct search URL
-            search_url = f"https://www.amazon.com/s?k={quote_plus(query)}"
+            search_url = f"{settings.AMAZON_BASE_URL}/s?k={quote_plus(query)}"
+            ceiling = self._budget_ceiling(filters, "amazon")
+            if ceiling is not None:
+                # Price refinement, in cents
+                search_url += f"&rh=p_36%3A-{int(ceiling * 100)}"
             
             async with httpx.AsyncClient() as client:
                 response = await client.get(search_url, headers=self.headers)
                 response.raise_for_status()
-                
-                soup = BeautifulSoup(response.text, 'html.parser')
-                products = []
-
-                for item in soup.select('div[data-component-type="s-search-result"]'):
-                    try:
-                        name = item.select_one('h2 span').text.strip()
-                        price_text = item.select_one('span.a-price-whole').text.strip()
-                        price_value = float(re.sub(r'[^\d.]', '', price_text))
-                        
-                        product = Product(
-                            name=name,
-                            description=item.select_one('div.a-color-secondary').text.strip(),
-                            specs=self._extract_amazon_specs(item),
-                            image_url=item.select_one('img.s-image')['src'],
-                            price=Price(value=price_value, currency="USD"),
-                            vendor_url=f"https://www.amazon.com{item.select_one('a.a-link-normal')['href']}",
-                            confidence_score=self._calculate_confidence_score(item, query)
-                        )
-                        products.append(product)
-                    except Exception as e:
-                        print(f"Error parsing Amazon product: {str(e)}")
-                        continue
-
-                return products
+                return self._parse_amazon(response.text, query)
 
         except Exception as e:
-            print(f"Error searching Amazon: {str(e)}")
+            VENDOR_ERRORS.labels("amazon", type(e).__name__).inc()
+            logger.warning("Vendor search failed", extra={"vendor": "amazon", "error": repr(e)})
             return []
 
-    async def _search_ebay(self, query: str, filters: Optional[Dict[str, Any]] = None) -> List[Product]:
+    def _parse_amazon(self, html: str, query: str) -> List[Candidate]:
+        """Parse an Amazon results page into candidates."""
+        soup = _parse_html(html)
+        candidates = []
+
+        for item in soup.select('div[data-component-type="s-search-result"]'):
+            try:
+                name = _select(item, 'h2 span').text.strip()
+                price_text = _select(item, 'span.a-price-whole').text.strip()
+                price_value = float(re.sub(r'[^\d.]', '', price_text))
+                
+                candidate = Candidate.scraped(
+                    name=name,
+                    description=_select(item, 'div.a-color-secondary').text.strip(),
+                    specs=self._extract_amazon_specs(item),
+                    image_url=_select(item, 'img.s-image').get('src'),
+                    price=price_value,
+                    currency=VENDOR_CURRENCIES["amazon"],
+                    vendor_url=f"https://www.amazon.com{_select(item, 'a.a-link-normal')['href']}",
+                    confidence_score=self._calculate_confidence_score(item, query)
+                )
+                if candidate is None:
+                    VENDOR_ERRORS.labels("amazon", "InvalidProduct").inc()
+                    parse_errors.record("amazon", "invalid_product")
+                    continue
+                candidates.append(candidate)
+            except Exception as e:
+                VENDOR_ERRORS.labels("amazon", type(e).__name__).inc()
+                parse_errors.record("amazon", getattr(e, "selector", type(e).__name__))
+                continue
+
+        return candidates
+
+    async def _search_ebay(self, query: str, filters: Optional[Dict[str, Any]] = None) -> List[Candidate]:
         """Search products on eBay."""
         try:
             # Construct search URL
-            search_url = f"https://www.ebay.com/sch/i.html?_nkw={quote_plus(query)}"
+            search_url = f"{settings.EBAY_BASE_URL}/sch/i.html?_nkw={quote_plus(query)}"
+            ceiling = self._budget_ceiling(filters, "ebay")
+            if ceiling is not None:
+                search_url += f"&_udhi={int(ceiling)}"
             
             async with httpx.AsyncClient() as client:
                 response = await client.get(search_url, headers=self.headers)
                 response.raise_for_status()
-                
-                soup = BeautifulSoup(response.text, 'html.parser')
-                products = []
-
-                for item in soup.select('div.s-item__info'):
-                    try:
-                        name = item.select_one('div.s-item__title').text.strip()
-                        price_text = item.select_one('span.s-item__price').text.strip()
-                        price_value = float(re.sub(r'[^\d.]', '', price_text))
-                        
-                        product = Product(
-                            name=name,
-                            description=item.select_one('div.s-item__subtitle').text.strip(),
-                            specs=self._extract_ebay_specs(item),
-                            image_url=item.select_one('img.s-item__image-img')['src'],
-                            price=Price(value=price_value, currency="USD"),
-                            vendor_url=item.select_one('a.s-item__link')['href'],
-                            confidence_score=self._calculate_confidence_score(item, query)
-                        )
-                        products.append(product)
-                    except Exception as e:
-                        print(f"Error parsing eBay product: {str(e)}")
-                        continue
-
-                return products
+                return self._parse_ebay(response.text, query)
 
         except Exception as e:
-            print(f"Error searching eBay: {str(e)}")
+            VENDOR_ERRORS.labels("ebay", type(e).__name__).inc()
+            logger.warning("Vendor search failed", extra={"vendor": "ebay", "error": repr(e)})
             return []
 
-    def _extract_specs(self, item: BeautifulSoup) -> List[ProductSpec]:
+    def _parse_ebay(self, html: str, query: str) -> List[Candidate]:
+        """Parse an eBay results page into candidates."""
+        soup = _parse_html(html)
+        candidates = []
+
+        for item in soup.select('div.s-item__info'):
+            try:
+                name = _select(item, 'div.s-item__title').text.strip()
+                price_text = _select(item, 'span.s-item__price').text.strip()
+                price_value = float(re.sub(r'[^\d.]', '', price_text))
+                
+                candidate = Candidate.scraped(
+                    name=name,
+                    description=_select(item, 'div.s-item__subtitle').text.strip(),
+                    specs=self._extract_ebay_specs(item),
+                    image_url=_select(item, 'img.s-item__image-img').get('src'),
+                    price=price_value,
+                    currency=VENDOR_CURRENCIES["ebay"],
+                    vendor_url=_select(item, 'a.s-item__link').get('href'),
+                    confidence_score=self._calculate_confidence_score(item, query)
+                )
+                if candidate is None:
+                    VENDOR_ERRORS.labels("ebay", "InvalidProduct").inc()
+                    parse_errors.record("ebay", "invalid_product")
+                    continue
+                candidates.append(candidate)
+            except Exception as e:
+                VENDOR_ERRORS.labels("ebay", type(e).__name__).inc()
+                parse_errors.record("ebay", getattr(e, "selector", type(e).__name__))
+                continue
+
+        return candidates
+
+    def _extract_specs(self, item: "BeautifulSoup") -> List[Tuple[str, str]]:
         """Extract product specifications from HTML."""
         specs = []
         try:
             specs_element = item.select_one('div.specs')
             if specs_element:
                 for spec in specs_element.select('div.spec'):
-                    key = spec.select_one('div.key').text.strip()
-                    value = spec.select_one('div.value').text.strip()
-                    specs.append(ProductSpec(key=key, value=value))
+                    key = _select(spec, 'div.key').text.strip()
+                    value = _select(spec, 'div.value').text.strip()
+                    specs.append((key, value))
         except Exception as e:
-            print(f"Error extracting specs: {str(e)}")
+            parse_errors.record("jumia", f"specs: {getattr(e, 'selector', type(e).__name__)}")
         return specs
 
-    def _extract_amazon_specs(self, item: BeautifulSoup) -> List[ProductSpec]:
+    def _extract_amazon_specs(self, item: "BeautifulSoup") -> List[Tuple[str, str]]:
         """Extract specifications from Amazon product."""
         specs = []
         try:
@@ -201,26 +552,27 @@ class ProductService:
                     text = spec.text.strip()
                     if ':' in text:
                         key, value = text.split(':', 1)
-                        specs.append(ProductSpec(key=key.strip(), value=value.strip()))
+                        specs.append((key.strip(), value.strip()))
         except Exception as e:
-            print(f"Error extracting Amazon specs: {str(e)}")
+            parse_errors.record("amazon", f"specs: {getattr(e, 'selector', type(e).__name__)}")
         return specs
 
-    def _extract_ebay_specs(self, item: BeautifulSoup) -> List[ProductSpec]:
+    def _extract_ebay_specs(self, item: "BeautifulSoup") -> List[Tuple[str, str]]:
         """Extract specifications from eBay product."""
         specs = []
         try:
             specs_element = item.select_one('div.s-item__details')
             if specs_element:
                 for spec in specs_element.select('div.s-item__detail'):
-                    key = spec.select_one('span.s-item__label').text.strip()
-                    value = spec.select_one('span.s-item__value').text.strip()
-                    specs.append(ProductSpec(key=key, value=value))
+                    key = _select(spec, 'span.s-item__label').text.strip()
+                    value = _select(spec, 'span.s-item__value').text.strip()
+                    specs.append((key, value))
         except Exception as e:
-            print(f"Error extracting eBay specs: {str(e)}")
+            parse_errors.record("ebay", f"specs: {getattr(e, 'selector', type(e).__name__)}")
         return specs
 
-    def _calculate_confidence_score(self, item: BeautifulSoup, query: str) -> float:
+    @timed_stage("scoring")
+    def _calculate_confidence_score(self, item: "BeautifulSoup", query: str) -> float:
         """Calculate confidence score based on product relevance."""
         try:
             # Get product text
@@ -244,8 +596,8 @@ class ProductService:
             # Normalize score between 0 and 1
             return min(max(base_score, 0.0), 1.0)
             
-        except Exception as e:
-            print(f"Error calculating confidence score: {str(e)}")
+        except Exception:
+            logger.debug("Error calculating confidence score", exc_info=True)
             return 0.5
 
     async def get_product_details(self, product_id: str) -> Optional[Product]:
@@ -259,4 +611,8 @@ class ProductService:
         # This would typically involve making a request to the product's detail page
         return None
 
-product_service = ProductService() 
\ No newline at end of file
+product_service: LazyService[ProductService] = LazyService(ProductService)
+
+def get_product_service() -> ProductService:
+    """FastAPI dependency returning the shared ProductService."""
+    return product_service.get()
@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, timedelta
+from ..core.lazy import LazyService
+from ..core.workers import PeriodicWorker
+from .mpesa import mpesa_service
+from .transactions import transaction_service
+
+class ReconciliationService(PeriodicWorker):
+    """Settles pending tips whose M-Pesa callback never arrived.
+
+    Successful STK pushes are queued with a first check time. The worker
+    claims due transactions in batches and verifies them with Daraja at a
+    bounded request rate. Unsettled ones are re-queued with exponential
+    backoff until ``mpesa_service.max_attempts`` is reached, after which
+    the transaction is marked failed.
+    """
+
+    error_message = "Error reconciling transactions"
+
+    def __init__(self):
+        super().__init__()
+        self.interval = 15.0  # Seconds between queue polls
+        self.batch_size = 20
+        self.max_requests_per_second = 5.0
+        self.backoff_base = timedelta(minutes=1)
+        self.backoff_max = timedelta(hours=1)
+        self.lease = timedelta(minutes=5)  # Time a claimed batch has before others may retry it
+
+    async def reconcile_due(self) -> int:
+        """Verify one batch of due transactions. Returns the batch size."""
+        transaction_ids = await transaction_service.claim_due_reconciliations(self.batch_size, self.lease)
+
+        tasks = []
+        for transaction_id in transaction_ids:
+            tasks.append(asyncio.create_task(self._reconcile(transaction_id)))
+            # Spread requests out to stay under the Daraja rate budget
+            await asyncio.sleep(1 / self.max_requests_per_second)
+        await asyncio.gather(*tasks)
+
+        return len(transaction_ids)
+
+    async def tick(self) -> float:
+        processed = await self.reconcile_due()
+        return 0 if processed >= self.batch_size else self.interval
+
+    @property
+    def error_delay(self) -> float:
+        return self.interval
+
+    async def _reconcile(self, transaction_id: str) -> None:
+        """Verify one transaction and settle or re-queue it."""
+        try:
+            result = await mpesa_service.verify_transaction(transaction_id)
+        except Exception as e:
+            result = {"status": "error", "message": str(e)}
+
+        status = result["status"]
+        if status in ("completed", "failed", "not_found"):
+            # Settled transactions are dropped from the queue by the update itself
+            await transaction_service.clear_reconciliation(transaction_id)
+        elif status == "max_attempts_exceeded":
+            await transaction_service.update_transaction(
+                transaction_id,
+                {
+                    "status": "failed",
+                    "error": "Payment could not be confirmed",
+                    "failed_at": datetime.now().isoformat()
+                }
+            )
+            await transaction_service.clear_reconciliation(transaction_id)
+        else:
+            transaction = await transaction_service.get_transaction(transaction_id)
+            attempts = transaction["attempts"] if transaction else 0
+            delay = min(self.backoff_base * 2 ** attempts, self.backoff_max)
+            await transaction_service.schedule_reconciliation(transaction_id, delay)
+
+reconciliation_service: LazyService[ReconciliationService] = LazyService(ReconciliationService)
@@ -0,0 +1,156 @@
+"""Near-duplicate cache for query analyses.
+
+Queries are embedded locally with a hashing vectorizer: text is normalized,
+common synonyms are mapped to one word ("mum", "mama" -> "mother"; "cheap",
+"affordable" -> "cheap"), stopwords are dropped, common suffixes are
+stripped, and word unigrams and bigrams are hashed into a sparse,
+L2-normalized vector. Tokens with digits (budgets, sizes, storage) weigh
+double so "under 20k" and "under 50k" stay apart.
+
+``SemanticCache`` keeps the most recently used analyses in memory with an
+inverted index from features to entries, so a lookup only scores entries
+that share a feature with the query. The threshold is tuned offline with
+``python -m benchmarks.semantic_cache_eval``.
+"""
+from typing import Dict, Any, Optional, List, Set, Tuple
+from collections import OrderedDict
+import math
+import re
+import threading
+import time
+import zlib
+
+DIMENSIONS = 1 << 18
+
+STOPWORDS = frozenset("""
+a an the i me my we our you your it its is are am be was for to of in on at by with and or
+need want looking look find get buy some something any that this which who please can could would
+should will just really very good nice new one thing stuff
+""".split())
+
+SYNONYMS = {
+    "mum": "mother", "mom": "mother", "mama": "mother", "mummy": "mother", "mommy": "mother",
+    "dad": "father", "papa": "father", "daddy": "father",
+    "bro": "brother", "sis": "sister",
+    "affordable": "cheap", "inexpensive": "cheap", "budget": "cheap", "low-cost": "cheap", "bei nafuu": "cheap",
+    "smartphone": "phone", "mobile": "phone", "cellphone": "phone", "handset": "phone", "simu": "phone",
+    "notebook": "laptop", "refrigerator": "fridge", "present": "gift", "earphones": "earbuds", "headphones": "headset",
+    "television": "tv", "telly": "tv",
+    "pic": "photo", "pics": "photo", "photos": "photo", "pictures": "photo", "picture": "photo",
+    "below": "under", "less than": "under", "max": "under", "within": "under",
+    "long battery life": "battery", "battery life": "battery", "long lasting battery": "battery",
+    "long lasting": "battery", "big battery": "battery",
+    "kid": "child", "kids": "child", "children": "child", "son": "child", "daughter": "child",
+    "great": "best", "top": "best"
+}
+_MULTIWORD = sorted((phrase for phrase in SYNONYMS if " " in phrase), key=len, reverse=True)
+_TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9\-]*")
+_SUFFIXES = ("ation", "ing", "ers", "er", "ed", "es", "s")
+
+def _stem(token: str) -> str:
+    """Strip one common suffix from longer words ("cancelling", "cancellation" -> "cancell")."""
+    if len(token) > 4 and not token[0].isdigit():
+        for suffix in _SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+                return token[:-len(suffix)]
+    return token
+
+def tokenize(query: str) -> List[str]:
+    """Normalized, synonym-mapped content words of a query."""
+    text = " ".join(query.lower().split())
+    for phrase in _MULTIWORD:
+        text = text.replace(phrase, SYNONYMS[phrase])
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text):
+        token = SYNONYMS.get(token, token)
+        if token not in STOPWORDS:
+            tokens.append(_stem(token))
+    return tokens
+
+def embed(query: str) -> Dict[int, float]:
+    """Sparse, L2-normalized hashing-vectorizer embedding of a query."""
+    tokens = tokenize(query)
+    features = [(token, 2.0 if any(char.isdigit() for char in token) else 1.0) for token in tokens]
+    features += [(f"{first} {second}", 0.5) for first, second in zip(tokens, tokens[1:])]
+    vector: Dict[int, float] = {}
+    for feature, weight in features:
+        # crc32 rather than hash(): stable across processes and runs
+        index = zlib.crc32(feature.encode()) % DIMENSIONS
+        vector[index] = vector.get(index, 0.0) + weight
+    norm = math.sqrt(sum(value * value for value in vector.values()))
+    return {index: value / norm for index, value in vector.items()} if norm else {}
+
+def cosine(first: Dict[int, float], second: Dict[int, float]) -> float:
+    """Cosine similarity of two normalized sparse vectors."""
+    if len(first) > len(second):
+        first, second = second, first
+    return sum(value * second.get(index, 0.0) for index, value in first.items())
+
+class SemanticCache:
+    """Bounded LRU of analyses, looked up by embedding similarity."""
+
+    def __init__(self, capacity: int = 2048, threshold: float = 0.85, ttl: float = 3600.0):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, Tuple[Dict[int, float], Dict[str, Any], float]]" = OrderedDict()
+        self._postings: Dict[int, Set[int]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, vector: Dict[int, float]) -> Optional[Tuple[Dict[str, Any], float]]:
+        """The most similar fresh entry at or above the threshold, with its similarity."""
+        if not vector:
+            return None
+        with self._lock:
+            candidates = set()
+            for index in vector:
+                candidates.update(self._postings.get(index, ()))
+
+            best_id, best_similarity = None, self.threshold
+            expired = []
+            now = time.monotonic()
+            for entry_id in candidates:
+                entry_vector, _, stored_at = self._entries[entry_id]
+                if now - stored_at > self.ttl:
+                    expired.append(entry_id)
+                    continue
+                similarity = cosine(vector, entry_vector)
+                if similarity >= best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+            for entry_id in expired:
+                self._remove(entry_id)
+
+            if best_id is None:
+                return None
+            self._entries.move_to_end(best_id)
+            return self._entries[best_id][1], best_similarity
+
+    def add(self, vector: Dict[int, float], result: Dict[str, Any]) -> None:
+        if not vector:
+            return
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (vector, result, time.monotonic())
+            for index in vector:
+                self._postings.setdefault(index, set()).add(entry_id)
+            while len(self._entries) > self.capacity:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._postings.clear()
+
+    def _remove(self, entry_id: int) -> None:
+        vector, _, _ = self._entries.pop(entry_id)
+        for index in vector:
+            postings = self._postings.get(index)
+            if postings is not None:
+                postings.discard(entry_id)
+                if not postings:
+                    del self._postings[index]
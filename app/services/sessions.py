@@ -0,0 +1,52 @@
+from typing import Dict, Any, Optional
+import redis
+from datetime import datetime, timedelta
+import json
+from ..core.config import settings
+from ..core.lazy import LazyService
+
+class SessionService:
+    def __init__(self):
+        self.redis_client = redis.from_url(settings.REDIS_URL)
+        self.session_ttl = timedelta(hours=24)  # Keep sessions for a day
+
+    async def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get session details."""
+        session_data = self.redis_client.get(f"session:{session_id}")
+        if not session_data:
+            return None
+
+        return json.loads(session_data)
+
+    async def save_session(self, session_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
+        """Create or update a session record."""
+        session = await self.get_session(session_id) or {
+            "id": session_id,
+            "created_at": datetime.now().isoformat()
+        }
+        session.update(updates)
+        session["updated_at"] = datetime.now().isoformat()
+
+        # Store session
+        self.redis_client.setex(
+            f"session:{session_id}",
+            self.session_ttl,
+            json.dumps(session)
+        )
+
+        return session
+
+    async def create_sessions(self, sessions: Dict[str, Dict[str, Any]]) -> None:
+        """Store several new sessions in one round trip."""
+        now = datetime.now().isoformat()
+        pipe = self.redis_client.pipeline(transaction=False)
+        for session_id, fields in sessions.items():
+            session = {"id": session_id, "created_at": now, **fields, "updated_at": now}
+            pipe.setex(f"session:{session_id}", self.session_ttl, json.dumps(session))
+        pipe.execute()
+
+session_service: LazyService[SessionService] = LazyService(SessionService)
+
+def get_session_service() -> SessionService:
+    """FastAPI dependency returning the shared SessionService."""
+    return session_service.get()
@@ -1,18 +1,143 @@
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, Union
 import redis
+import os
+import time
 from datetime import datetime, timedelta
 import json
+import asyncio
+from ..core.archive import SegmentArchive
 from ..core.config import settings
+from ..core.lazy import LazyService
+from .analytics import LATENCY_BUCKETS, TIP_ROLLUP_PREFIX, tip_rollup_key
+
+# Merges a JSON object of updates into a stored transaction, bumps its
+# attempt counter, refreshes its TTL and that of its phone index, all in one
+# atomic step. A completed transaction keeps its status so a late verification
+# can't undo a callback, and settled transactions leave the reconciliation
+# queue and, when archiving is on, join the archive queue, scored by when
+# they first settled. The first move to a settled status (or failed ->
+# completed) is counted in the day's analytics rollup, with the latency since
+# creation taken from the phone index score. Note that cjson encodes empty
+# lists as {}.
+#
+# The phone index and rollup keys depend on the stored transaction's phone
+# number and creation date, so the script builds them from ARGV prefixes
+# rather than taking them in KEYS. That needs a single Redis node (or a
+# primary with replicas): Redis Cluster would reject the undeclared keys, and
+# an ACL user limited by key patterns must be allowed ``transactions:phone:*``
+# and ``analytics:tips:*`` as well as the declared keys.
+#
+# KEYS[1]  transaction key, KEYS[2] reconciliation queue, KEYS[3] archive queue
+# ARGV[1]  JSON updates, ARGV[2] attempts increment, ARGV[3] updated_at,
+# ARGV[4]  TTL in seconds, ARGV[5] phone index key prefix, ARGV[6] now (epoch seconds),
+# ARGV[7]  rollup key prefix, ARGV[8] JSON latency bucket bounds, ARGV[9] rollup TTL,
+# ARGV[10] 1 to queue settled transactions for archiving, 0 to keep them in Redis
+UPDATE_TRANSACTION_SCRIPT = """
+local raw = redis.call('GET', KEYS[1])
+if not raw then
+    return false
+end
+
+local transaction = cjson.decode(raw)
+local updates = cjson.decode(ARGV[1])
+local status = transaction['status']
+for key, value in pairs(updates) do
+    transaction[key] = value
+end
+if status == 'completed' then
+    transaction['status'] = status
+end
+
+local increment = tonumber(ARGV[2])
+if increment ~= 0 then
+    transaction['attempts'] = (tonumber(transaction['attempts']) or 0) + increment
+end
+transaction['updated_at'] = ARGV[3]
+
+local encoded = cjson.encode(transaction)
+redis.call('SET', KEYS[1], encoded, 'EX', ARGV[4])
+redis.call('EXPIRE', ARGV[5] .. transaction['phone_number'], ARGV[4])
+local settled = transaction['status'] == 'completed' or transaction['status'] == 'failed'
+if settled then
+    redis.call('ZREM', KEYS[2], transaction['id'])
+    if ARGV[10] == '1' then
+        redis.call('ZADD', KEYS[3], 'NX', ARGV[6], transaction['id'])
+    end
+end
+
+if settled and transaction['status'] ~= status then
+    local rollup = ARGV[7] .. string.sub(transaction['created_at'], 1, 10)
+    if status == 'failed' then
+        redis.call('HINCRBY', rollup, 'failed', -1)
+    end
+    redis.call('HINCRBY', rollup, transaction['status'], 1)
+    if transaction['status'] == 'completed' then
+        redis.call('HINCRBYFLOAT', rollup, 'amount_completed', tostring(transaction['amount']))
+        local created = redis.call('ZSCORE', ARGV[5] .. transaction['phone_number'], transaction['id'])
+        if created then
+            local latency = tonumber(ARGV[6]) - tonumber(created)
+            local bucket = 'latency_le_inf'
+            for _, bound in ipairs(cjson.decode(ARGV[8])) do
+                if latency <= bound then
+                    bucket = 'latency_le_' .. bound
+                    break
+                end
+            end
+            redis.call('HINCRBY', rollup, bucket, 1)
+            redis.call('HINCRBY', rollup, 'latency_count', 1)
+            redis.call('HINCRBYFLOAT', rollup, 'latency_sum', tostring(latency))
+        end
+    end
+    redis.call('EXPIRE', rollup, ARGV[9])
+end
+return encoded
+"""
+
+# Atomically takes up to ARGV[3] transactions due by ARGV[1] off a work
+# queue (reconciliation or archive) by pushing their next turn out to
+# ARGV[2], so two workers never process the same transaction at once.
+#
+# KEYS[1]  queue
+CLAIM_DUE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[3])
+for _, transaction_id in ipairs(due) do
+    redis.call('ZADD', KEYS[1], ARGV[2], transaction_id)
+end
+return due
+"""
+
+_CROCKFORD_BASE32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+def generate_transaction_id() -> str:
+    """Generate a ULID-style transaction ID.
+
+    48 bits of millisecond timestamp followed by 80 random bits, encoded as
+    26 Crockford base32 characters, so IDs sort by creation time and don't
+    collide when several tips arrive in the same second.
+    """
+    value = (int(time.time() * 1000) << 80) | int.from_bytes(os.urandom(10), "big")
+    chars = []
+    for _ in range(26):
+        value, index = divmod(value, 32)
+        chars.append(_CROCKFORD_BASE32[index])
+    return f"TXN_{''.join(reversed(chars))}"
 
 class TransactionService:
     def __init__(self):
         self.redis_client = redis.from_url(settings.REDIS_URL)
         self.transaction_ttl = timedelta(days=7)  # Keep transactions for 7 days
+        self.reconciliation_key = "transactions:reconcile"
+        self.archive_key = "transactions:archive"  # Settled transactions by settle time
+        self.rollup_ttl = timedelta(days=settings.ANALYTICS_RETENTION_DAYS)
+        # Settled transactions past the hot window live here instead of Redis
+        self.archive = SegmentArchive(settings.ARCHIVE_DIR) if settings.ARCHIVE_DIR else None
+        self._update_script = self.redis_client.register_script(UPDATE_TRANSACTION_SCRIPT)
+        self._claim_due_script = self.redis_client.register_script(CLAIM_DUE_SCRIPT)
 
     async def create_transaction(self, phone_number: str, amount: float) -> Dict[str, Any]:
         """Create a new transaction record."""
         transaction = {
-            "id": f"TXN_{datetime.now().strftime('%Y%m%d%H%M%S')}",
+            "id": generate_transaction_id(),
             "phone_number": phone_number,
             "amount": amount,
             "status": "pending",
@@ -22,37 +147,173 @@ class TransactionService:
             "last_error": None
         }
         
-        # Store transaction
-        self.redis_client.setex(
+        # Store transaction and index it under the phone number
+        pipe = self.redis_client.pipeline()
+        pipe.setex(
             f"transaction:{transaction['id']}",
             self.transaction_ttl,
             json.dumps(transaction)
         )
+        self._index_transaction(pipe, transaction["phone_number"], transaction["id"], time.time())
+        rollup_key = tip_rollup_key(transaction["created_at"][:10])
+        pipe.hincrby(rollup_key, "initiated", 1)
+        pipe.hincrbyfloat(rollup_key, "amount_initiated", amount)
+        pipe.expire(rollup_key, self.rollup_ttl)
+        pipe.execute()
         
         return transaction
 
     async def update_transaction(self, transaction_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update transaction status and details."""
-        transaction_data = self.redis_client.get(f"transaction:{transaction_id}")
-        if not transaction_data:
-            return None
-            
-        transaction = json.loads(transaction_data)
-        transaction.update(updates)
-        transaction["updated_at"] = datetime.now().isoformat()
-        
-        # Store updated transaction
-        self.redis_client.setex(
-            f"transaction:{transaction_id}",
+        return self._apply_update(transaction_id, updates)
+
+    async def attach_checkout_request(
+        self,
+        transaction_id: str,
+        checkout_request_id: str,
+        updates: Dict[str, Any],
+        reconcile_after: Optional[timedelta] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Record a successful STK push and index its CheckoutRequestID.
+
+        With ``reconcile_after`` the transaction is also queued for a status
+        check in case its callback never arrives.
+        """
+        pipe = self.redis_client.pipeline()
+        pipe.setex(
+            self._checkout_index_key(checkout_request_id),
             self.transaction_ttl,
-            json.dumps(transaction)
+            transaction_id
         )
-        
-        return transaction
+        if reconcile_after is not None:
+            pipe.zadd(self.reconciliation_key, {transaction_id: time.time() + reconcile_after.total_seconds()})
+        self._apply_update(
+            transaction_id,
+            {**updates, "stk_push_id": checkout_request_id},
+            client=pipe
+        )
+        result = pipe.execute()[-1]
+        if not result:
+            return None
+
+        return json.loads(result)
+
+    async def get_transaction_id_by_checkout(self, checkout_request_id: str) -> Optional[str]:
+        """Resolve an M-Pesa CheckoutRequestID to our transaction ID."""
+        transaction_id = self.redis_client.get(self._checkout_index_key(checkout_request_id))
+        if not transaction_id:
+            return None
+
+        return transaction_id.decode()
+
+    async def get_transaction_ids_by_checkout(self, checkout_request_ids: List[str]) -> List[Optional[str]]:
+        """Resolve several CheckoutRequestIDs in one round trip."""
+        if not checkout_request_ids:
+            return []
+
+        transaction_ids = self.redis_client.mget(
+            [self._checkout_index_key(checkout_request_id) for checkout_request_id in checkout_request_ids]
+        )
+        return [transaction_id.decode() if transaction_id else None for transaction_id in transaction_ids]
+
+    async def update_transactions(
+        self,
+        updates: List[Tuple[str, Dict[str, Any]]]
+    ) -> List[Union[Dict[str, Any], None, Exception]]:
+        """Apply a batch of transaction updates in one pipelined round trip.
+
+        Each result is the updated transaction, ``None`` if it no longer
+        exists, or the exception raised for that update.
+        """
+        if not updates:
+            return []
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for transaction_id, transaction_updates in updates:
+            self._apply_update(transaction_id, transaction_updates, client=pipe)
+
+        results = []
+        for result in pipe.execute(raise_on_error=False):
+            if isinstance(result, Exception) or not result:
+                results.append(result or None)
+            else:
+                results.append(json.loads(result))
+        return results
+
+    async def claim_due_reconciliations(self, limit: int, lease: timedelta) -> List[str]:
+        """Take transactions due for a status check, holding them for ``lease``."""
+        now = time.time()
+        transaction_ids = self._claim_due_script(
+            keys=[self.reconciliation_key],
+            args=[now, now + lease.total_seconds(), limit],
+            client=self.redis_client
+        )
+        return [transaction_id.decode() for transaction_id in transaction_ids]
+
+    async def archive_settled(self, limit: int, hot_window: timedelta, lease: timedelta) -> int:
+        """Move up to ``limit`` transactions settled before ``hot_window`` ago to the archive.
+
+        Records are appended and fsynced before they are deleted from Redis;
+        a batch that fails part way is retried after ``lease`` and the archive
+        index drops the duplicates. Returns the number of transactions claimed.
+        """
+        if not self.archive:
+            return 0
+
+        settled_before = time.time() - hot_window.total_seconds()
+        transaction_ids = [
+            transaction_id.decode()
+            for transaction_id in self._claim_due_script(
+                keys=[self.archive_key],
+                args=[settled_before, settled_before + lease.total_seconds(), limit],
+                client=self.redis_client
+            )
+        ]
+        if not transaction_ids:
+            return 0
+
+        records = self.redis_client.mget([f"transaction:{transaction_id}" for transaction_id in transaction_ids])
+        transactions = [json.loads(record) for record in records if record]
+        pipe = self.redis_client.pipeline(transaction=False)
+        for transaction in transactions:
+            pipe.zscore(self._phone_index_key(transaction["phone_number"]), transaction["id"])
+        scores = pipe.execute()
+
+        archived = [
+            (
+                transaction["phone_number"],
+                score if score is not None else datetime.fromisoformat(transaction["created_at"]).timestamp(),
+                transaction["id"],
+                json.dumps(transaction).encode()
+            )
+            for transaction, score in zip(transactions, scores)
+        ]
+        await asyncio.to_thread(self.archive.append, archived)
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for transaction in transactions:
+            pipe.delete(f"transaction:{transaction['id']}")
+            pipe.zrem(self._phone_index_key(transaction["phone_number"]), transaction["id"])
+            if transaction.get("stk_push_id"):
+                pipe.delete(self._checkout_index_key(transaction["stk_push_id"]))
+        # Expired ones leave the queue too
+        pipe.zrem(self.archive_key, *transaction_ids)
+        pipe.execute()
+        return len(transaction_ids)
+
+    async def schedule_reconciliation(self, transaction_id: str, delay: timedelta) -> None:
+        """Queue (or re-queue) a transaction for a status check after ``delay``."""
+        self.redis_client.zadd(self.reconciliation_key, {transaction_id: time.time() + delay.total_seconds()})
+
+    async def clear_reconciliation(self, transaction_id: str) -> None:
+        """Remove a transaction from the reconciliation queue."""
+        self.redis_client.zrem(self.reconciliation_key, transaction_id)
 
     async def get_transaction(self, transaction_id: str) -> Optional[Dict[str, Any]]:
-        """Get transaction details."""
+        """Get transaction details, from the archive once it has left Redis."""
         transaction_data = self.redis_client.get(f"transaction:{transaction_id}")
+        if not transaction_data and self.archive:
+            transaction_data = await asyncio.to_thread(self._read_archived, transaction_id)
         if not transaction_data:
             return None
             
@@ -61,33 +322,128 @@ class TransactionService:
     async def get_transactions_by_phone(self, phone_number: str) -> List[Dict[str, Any]]:
         """Get all transactions for a phone number."""
         transactions = []
-        for key in self.redis_client.scan_iter("transaction:*"):
-            transaction_data = self.redis_client.get(key)
-            if transaction_data:
-                transaction = json.loads(transaction_data)
-                if transaction["phone_number"] == phone_number:
-                    transactions.append(transaction)
-        
-        return sorted(transactions, key=lambda x: x["created_at"], reverse=True)
+        cursor = None
+        while True:
+            page, cursor = await self.get_transaction_page(phone_number, limit=100, cursor=cursor)
+            transactions.extend(page)
+            if not cursor:
+                return transactions
+
+    async def get_transaction_page(
+        self,
+        phone_number: str,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get one page of a phone number's transactions, newest first.
+
+        Recent transactions come from Redis and archived ones from the
+        archive, merged by creation time. ``cursor`` is the value returned as
+        the next cursor by the previous page; ``None`` starts from the newest
+        transaction.
+        """
+        index_key = self._phone_index_key(phone_number)
+        max_score = f"({cursor}" if cursor else "+inf"
+        entries = self.redis_client.zrevrangebyscore(
+            index_key, max_score, "-inf", start=0, num=limit + 1, withscores=True
+        )
+        merged = {transaction_id.decode(): (score, None) for transaction_id, score in entries}
+        if self.archive:
+            before = float(cursor) if cursor else None
+            for entry in await asyncio.to_thread(self.archive.entries, phone_number, before, limit + 1):
+                # A transaction being archived can briefly be in both; Redis wins
+                merged.setdefault(entry.id, (entry.score, entry))
+        ordered = sorted(merged.items(), key=lambda item: item[1][0], reverse=True)
+        page_entries = ordered[:limit]
+        if not page_entries:
+            return [], None
+
+        hot_ids = [transaction_id for transaction_id, (_, entry) in page_entries if entry is None]
+        records = {}
+        if hot_ids:
+            records = dict(zip(hot_ids, self.redis_client.mget([f"transaction:{transaction_id}" for transaction_id in hot_ids])))
+        archived = [entry for _, (_, entry) in page_entries if entry is not None]
+        if archived:
+            payloads = await asyncio.to_thread(lambda: [self.archive.read(entry) for entry in archived])
+            records.update(zip((entry.id for entry in archived), payloads))
+
+        transactions = []
+        expired = []
+        for transaction_id, _ in page_entries:
+            record = records[transaction_id]
+            if record:
+                transactions.append(json.loads(record))
+            else:
+                expired.append(transaction_id)
+
+        # Drop index entries whose transactions have reached their TTL
+        if expired:
+            self.redis_client.zrem(index_key, *expired)
+
+        next_cursor = repr(page_entries[-1][1][0]) if len(ordered) > limit else None
+        return transactions, next_cursor
+
+    def _read_archived(self, transaction_id: str) -> Optional[bytes]:
+        """An archived transaction's record, or None. Blocking; run it off the event loop."""
+        entry = self.archive.find(transaction_id)
+        return self.archive.read(entry) if entry else None
+
+    def _checkout_index_key(self, checkout_request_id: str) -> str:
+        return f"transactions:checkout:{checkout_request_id}"
+
+    def _phone_index_key(self, phone_number: str) -> str:
+        return f"transactions:phone:{phone_number}"
+
+    def _index_transaction(self, pipe, phone_number: str, transaction_id: str, created: float) -> None:
+        """Queue index writes for a transaction on a pipeline."""
+        index_key = self._phone_index_key(phone_number)
+        pipe.zadd(index_key, {transaction_id: created})
+        # Expired entries are pruned lazily on read; this bounds the rest for
+        # phones that never query their history
+        pipe.zremrangebyscore(index_key, "-inf", created - self.transaction_ttl.total_seconds() * 2)
+        pipe.expire(index_key, self.transaction_ttl)
 
     async def increment_attempts(self, transaction_id: str, error: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """Increment transaction attempts and update error message."""
-        transaction_data = self.redis_client.get(f"transaction:{transaction_id}")
-        if not transaction_data:
-            return None
-            
-        transaction = json.loads(transaction_data)
-        transaction["attempts"] += 1
-        transaction["last_error"] = error
-        transaction["updated_at"] = datetime.now().isoformat()
-        
-        # Store updated transaction
-        self.redis_client.setex(
-            f"transaction:{transaction_id}",
-            self.transaction_ttl,
-            json.dumps(transaction)
+        return self._apply_update(transaction_id, {"last_error": error}, increment_attempts=1)
+
+    def _apply_update(
+        self,
+        transaction_id: str,
+        updates: Dict[str, Any],
+        increment_attempts: int = 0,
+        client: Optional[redis.client.Pipeline] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Merge updates into a transaction atomically in a single round trip.
+
+        When ``client`` is a pipeline the script is only queued on it and the
+        caller reads the result from ``execute()``.
+        """
+        result = self._update_script(
+            keys=[f"transaction:{transaction_id}", self.reconciliation_key, self.archive_key],
+            args=[
+                json.dumps(updates),
+                increment_attempts,
+                datetime.now().isoformat(),
+                int(self.transaction_ttl.total_seconds()),
+                self._phone_index_key(""),
+                time.time(),
+                TIP_ROLLUP_PREFIX,
+                json.dumps(LATENCY_BUCKETS),
+                int(self.rollup_ttl.total_seconds()),
+                1 if self.archive else 0  # Nothing drains the queue without an archive
+            ],
+            client=client or self.redis_client
         )
-        
-        return transaction
+        if client is not None:
+            return None
+        if not result:
+            return None
+
+        return json.loads(result)
+
+transaction_service: LazyService[TransactionService] = LazyService(TransactionService)
 
-transaction_service = TransactionService() 
\ No newline at end of file
+def get_transaction_service() -> TransactionService:
+    """FastAPI dependency returning the shared TransactionService."""
+    return transaction_service.get()
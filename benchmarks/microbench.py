@@ -0,0 +1,242 @@
+"""Microbenchmarks for the recommendation hot paths, with regression tracking.
+
+Runs on the recorded vendor pages in ``loadtest/fixtures``, so no network
+or Redis is needed::
+
+    python -m benchmarks.microbench                          # run and print
+    python -m benchmarks.microbench --compare benchmarks/baseline.json
+    python -m benchmarks.microbench --save-baseline          # after an intended change
+    python -m benchmarks.microbench compare base.json head.json
+
+Each result is the best per-call time over several repeats, which is the
+least noisy statistic for CPU-bound code. Comparisons fail when any
+benchmark is slower than its baseline by more than ``--threshold``.
+Baselines are machine-specific: compare runs from the same host.
+"""
+from typing import Callable, Dict, Any, List, Optional
+import argparse
+import json
+import platform
+import sys
+import timeit
+from pathlib import Path
+from loadtest.report import git_revision
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent / "loadtest" / "fixtures"
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+DEFAULT_THRESHOLD = 0.2
+
+QUERIES = [
+    "I need a cheap phone with a good camera",
+    "best laptop for university under 70k",
+    "wireless earbuds with noise cancellation",
+    "smart tv 43 inch vs 50 inch",
+    "samsung or tecno which is better",
+    "simu poa ya bei nafuu",
+]
+
+# name -> factory doing the setup and returning the callable to time
+BENCHMARKS: Dict[str, Callable[[], Callable[[], Any]]] = {}
+
+def benchmark(name: str):
+    def register(factory):
+        BENCHMARKS[name] = factory
+        return factory
+    return register
+
+def _service():
+    from app.services.products import ProductService
+    return ProductService()
+
+def _page(vendor: str) -> str:
+    return (FIXTURES_DIR / f"{vendor}.html").read_text()
+
+def _candidates(count: int) -> List[Any]:
+    """``count`` distinct candidates built from the recorded Jumia page."""
+    from app.services.products import Candidate
+    parsed = [candidate.to_dict() for candidate in _service()._parse_jumia(_page("jumia"), "phone")]
+    return [
+        Candidate.from_dict({
+            **parsed[i % len(parsed)],
+            "vendor_url": f"{parsed[i % len(parsed)]['vendor_url']}?offer={i}",
+            "confidence_score": (i * 37 % 100) / 100
+        })
+        for i in range(count)
+    ]
+
+for _vendor in ("jumia", "amazon", "ebay"):
+    def _parse_factory(vendor=_vendor):
+        service, page = _service(), _page(vendor)
+        parse = getattr(service, f"_parse_{vendor}")
+        return lambda: parse(page, "phone with good camera")
+    benchmark(f"parse_{_vendor}")(_parse_factory)
+
+for _count in (10, 100, 1000):
+    def _score_factory(count=_count):
+        from app.services.products import _parse_html
+        service = _service()
+        items = _parse_html(_page("jumia")).select("article.prd")
+        items = [items[i % len(items)] for i in range(count)]
+        return lambda: [service._calculate_confidence_score(item, "phone with good camera") for item in items]
+    benchmark(f"score_{_count}")(_score_factory)
+
+for _count in (10, 100, 1000):
+    def _rank_factory(count=_count):
+        # Three vendor lists where a fifth of the candidates are duplicates, plus a failed vendor
+        service, products = _service(), _candidates(count)
+        duplicates = products[: count // 5]
+        results = [products[0::3] + duplicates, products[1::3], products[2::3], TimeoutError()]
+        return lambda: service._merge_results(results)
+    benchmark(f"dedup_rank_{_count}")(_rank_factory)
+
+@benchmark("cache_encode_100")
+def _cache_encode():
+    service, products = _service(), _candidates(100)
+    return lambda: service._encode_products(products)
+
+@benchmark("cache_decode_100")
+def _cache_decode():
+    service = _service()
+    payload = service._encode_products(_candidates(100)).encode()
+    return lambda: service._decode_products(payload)
+
+@benchmark("build_top_5")
+def _build_top():
+    service, candidates = _service(), _candidates(1000)
+    return lambda: service._build_products(candidates, 5)
+
+@benchmark("normalize_budget_1000")
+def _normalize_budget():
+    # A third of the candidates priced in dollars, as from Amazon and eBay, at fixed rates
+    from app.services.fx import FxService
+    fx = FxService()
+    fx.rates = {"USD": 1.0, "KES": 130.0}
+    fx.reload_interval, fx._checked_at = float("inf"), 0.0  # Never reload from Redis
+    service, candidates = _service(), _candidates(1000)
+    service.fx = fx
+    for candidate in candidates[::3]:
+        candidate.price, candidate.currency = round(candidate.price / 130, 2), "USD"
+    prices = [(candidate.price, candidate.currency) for candidate in candidates]
+    filters = {"budget": {"max": 20000, "currency": "KES"}}
+
+    def normalize_and_filter():
+        # Normalizing converts in place; restore the vendor prices first
+        for candidate, (price, currency) in zip(candidates, prices):
+            candidate.price, candidate.currency = price, currency
+        return service._within_budget(service._normalize_prices(candidates), filters)
+    return normalize_and_filter
+
+@benchmark("product_validate_100")
+def _product_validate():
+    from app.models.schemas import Product
+    data = [candidate.to_dict() for candidate in _candidates(100)]
+    return lambda: [Product.model_validate(item) for item in data]
+
+@benchmark("product_serialize_100")
+def _product_serialize():
+    products = [candidate.to_product() for candidate in _candidates(100)]
+    return lambda: [product.model_dump(mode="json") for product in products]
+
+@benchmark("semantic_lookup_2048")
+def _semantic_lookup():
+    # A full cache of query variants, looked up with an unseen phrasing
+    from app.services.semantic_cache import SemanticCache, embed
+    cache = SemanticCache(capacity=2048)
+    for i in range(2048):
+        cache.add(embed(f"{QUERIES[i % len(QUERIES)]} {i}"), {})
+    return lambda: cache.lookup(embed("affordable smartphone with a nice camera"))
+
+@benchmark("query_type")
+def _query_type():
+    from app.services.nlp import NLPService
+    service = NLPService()
+    return lambda: [service._determine_query_type(query, "") for query in QUERIES]
+
+def measure(fn: Callable[[], Any], repeat: int = 5, quick: bool = False) -> float:
+    """Best seconds per call over ``repeat`` runs of an auto-sized loop."""
+    timer = timeit.Timer(fn)
+    if quick:
+        return min(timer.repeat(repeat=1, number=1))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+def run(names: Optional[List[str]] = None, quick: bool = False) -> Dict[str, Any]:
+    results = {}
+    for name, factory in BENCHMARKS.items():
+        if names and not any(pattern in name for pattern in names):
+            continue
+        results[name] = measure(factory(), quick=quick)
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results
+    }
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Benchmarks present in both runs, with their relative change and whether it regressed."""
+    rows = []
+    for name, seconds in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        change = (seconds - base) / base
+        rows.append({"name": name, "baseline": base, "current": seconds, "change": change, "regressed": change > threshold})
+    return rows
+
+def _print_results(report: Dict[str, Any]) -> None:
+    for name, seconds in report["results"].items():
+        print(f"{name:<24} {seconds * 1e6:>12.1f} us")
+
+def _print_comparison(rows: List[Dict[str, Any]], threshold: float) -> bool:
+    regressed = False
+    for row in rows:
+        flag = "  REGRESSED" if row["regressed"] else ""
+        print(f"{row['name']:<24} {row['baseline'] * 1e6:>10.1f} -> {row['current'] * 1e6:>10.1f} us "
+              f"({row['change']:+.1%}){flag}")
+        regressed = regressed or row["regressed"]
+    if regressed:
+        print(f"Regression over {threshold:.0%} threshold", file=sys.stderr)
+    return regressed
+
+def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] == "compare":
+        parser = argparse.ArgumentParser(prog="benchmarks.microbench compare", description="Compare two benchmark runs.")
+        parser.add_argument("baseline")
+        parser.add_argument("current")
+        parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+        args = parser.parse_args(sys.argv[2:])
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        sys.exit(1 if _print_comparison(compare(baseline, current, args.threshold), args.threshold) else 0)
+
+    parser = argparse.ArgumentParser(description="Run the hot-path microbenchmarks.")
+    parser.add_argument("--filter", nargs="*", help="Only run benchmarks whose name contains one of these")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare against a saved run and fail on regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown, e.g. 0.2 for 20%%")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Write results to {BASELINE_PATH.name}")
+    args = parser.parse_args()
+
+    report = run(args.filter)
+    _print_results(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    if args.save_baseline:
+        # The baseline is committed after it is written, so it can't name its own revision
+        with open(BASELINE_PATH, "w") as f:
+            json.dump({key: value for key, value in report.items() if key != "revision"}, f, indent=2)
+            f.write("\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print()
+        sys.exit(1 if _print_comparison(compare(baseline, report, args.threshold), args.threshold) else 0)
+
+if __name__ == "__main__":
+    main()
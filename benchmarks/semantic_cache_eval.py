@@ -0,0 +1,110 @@
+"""Offline evaluation of the near-duplicate query cache.
+
+Uses the labelled query groups in ``benchmarks/paraphrases.json``: queries in
+one group share an intent, queries in different groups must get different
+analyses (several groups differ only in a budget or a size)::
+
+    python -m benchmarks.semantic_cache_eval
+    python -m benchmarks.semantic_cache_eval --threshold 0.85 --requests 5000
+
+For each threshold it reports, over all query pairs, the share of same-group
+pairs that would hit (recall) and of different-group pairs that would hit
+(false hits, i.e. a wrong analysis served). It then replays seeded traffic
+drawn from the groups through ``SemanticCache`` at the chosen threshold and
+reports the hit rate and wrong-hit rate. Exits 1 if the false-hit rate at
+the chosen threshold exceeds ``--max-false-hit-rate``.
+"""
+from typing import Dict, Any, List, Tuple
+import argparse
+import itertools
+import json
+import random
+import sys
+from pathlib import Path
+from app.core.config import settings
+from app.services.semantic_cache import SemanticCache, embed, cosine
+
+PARAPHRASES_PATH = Path(__file__).resolve().parent / "paraphrases.json"
+THRESHOLDS = (0.7, 0.75, 0.8, 0.85, 0.9, 0.95, 1.0)
+
+def load_groups(path: Path = PARAPHRASES_PATH) -> List[List[str]]:
+    with open(path) as f:
+        return json.load(f)["groups"]
+
+def pair_similarities(groups: List[List[str]]) -> List[Tuple[float, bool, str, str]]:
+    """``(similarity, same_group, first, second)`` for every pair of labelled queries."""
+    labelled = [(query, embed(query), label) for label, group in enumerate(groups) for query in group]
+    return [
+        (cosine(first_vector, second_vector), first_label == second_label, first, second)
+        for (first, first_vector, first_label), (second, second_vector, second_label)
+        in itertools.combinations(labelled, 2)
+    ]
+
+def sweep(pairs: List[Tuple[float, bool, str, str]], thresholds=THRESHOLDS) -> List[Dict[str, Any]]:
+    """Recall and false-hit rate of each threshold over the labelled pairs."""
+    same = [similarity for similarity, is_same, _, _ in pairs if is_same]
+    different = [similarity for similarity, is_same, _, _ in pairs if not is_same]
+    return [
+        {
+            "threshold": threshold,
+            "recall": sum(similarity >= threshold for similarity in same) / len(same),
+            "false_hit_rate": sum(similarity >= threshold for similarity in different) / len(different)
+        }
+        for threshold in thresholds
+    ]
+
+def replay(groups: List[List[str]], threshold: float, requests: int, capacity: int, seed: int = 0) -> Dict[str, Any]:
+    """Serve seeded traffic through a cache and count hits and wrong hits.
+
+    Intents are drawn with a skewed (Zipf-like) popularity and a random
+    phrasing within the intent, which is roughly how repeated shopper
+    queries arrive.
+    """
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, len(groups) + 1)]
+    cache = SemanticCache(capacity=capacity, threshold=threshold, ttl=float("inf"))
+    hits = wrong = 0
+    for label in rng.choices(range(len(groups)), weights=weights, k=requests):
+        vector = embed(rng.choice(groups[label]))
+        cached = cache.lookup(vector)
+        if cached:
+            hits += 1
+            wrong += cached[0]["label"] != label
+        else:
+            cache.add(vector, {"label": label})
+    return {"requests": requests, "hit_rate": hits / requests, "wrong_hit_rate": wrong / requests}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Evaluate the semantic query cache against labelled paraphrases.")
+    parser.add_argument("--paraphrases", default=str(PARAPHRASES_PATH))
+    parser.add_argument("--threshold", type=float, default=settings.SEMANTIC_CACHE_THRESHOLD)
+    parser.add_argument("--requests", type=int, default=2000, help="Queries to replay through the cache")
+    parser.add_argument("--capacity", type=int, default=settings.SEMANTIC_CACHE_SIZE)
+    parser.add_argument("--max-false-hit-rate", type=float, default=0.01)
+    parser.add_argument("--show-errors", action="store_true", help="List different-intent pairs that would hit")
+    args = parser.parse_args()
+
+    groups = load_groups(Path(args.paraphrases))
+    pairs = pair_similarities(groups)
+    print(f"{'threshold':>9} {'recall':>8} {'false hits':>11}")
+    for row in sweep(pairs, sorted(set(THRESHOLDS) | {args.threshold})):
+        marker = "  <- configured" if row["threshold"] == args.threshold else ""
+        print(f"{row['threshold']:>9.2f} {row['recall']:>8.1%} {row['false_hit_rate']:>11.2%}{marker}")
+
+    if args.show_errors:
+        for similarity, _, first, second in sorted(
+            (pair for pair in pairs if not pair[1] and pair[0] >= args.threshold), reverse=True
+        ):
+            print(f"  {similarity:.3f}  {first!r} ~ {second!r}")
+
+    result = replay(groups, args.threshold, args.requests, args.capacity)
+    print(f"\nReplay of {result['requests']} queries at {args.threshold:.2f}: "
+          f"hit rate {result['hit_rate']:.1%}, wrong hits {result['wrong_hit_rate']:.2%}")
+
+    false_hit_rate = sweep(pairs, [args.threshold])[0]["false_hit_rate"]
+    if false_hit_rate > args.max_false_hit_rate:
+        print(f"False-hit rate {false_hit_rate:.2%} exceeds {args.max_false_hit_rate:.2%}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -53,6 +53,7 @@ api.interceptors.response.use(
 // API endpoints
 export const endpoints = {
   recommend: '/recommend',
+  stream: '/recommend/stream',
   clarify: '/clarify',
   tip: {
     initiate: '/tip/initiate',
@@ -105,6 +106,13 @@ export interface TipResponse {
   message: string;
 }
 
+export interface StreamHandlers {
+  onToken?: (token: string) => void;
+  onDone?: (data: { clarification: string; session_id: string; query_type: RecommendationResponse['query_type'] }) => void;
+  onResult?: (data: RecommendationResponse) => void;
+  onError?: (error: string) => void;
+}
+
 // API functions
 export const apiService = {
   // Get product recommendations
@@ -113,6 +121,54 @@ export const apiService = {
     return response.data;
   },
 
+  // Stream recommendations; clarification questions arrive token by token
+  streamRecommendations: async (data: RecommendationRequest, handlers: StreamHandlers) => {
+    const response = await fetch(`${API_BASE_URL}${endpoints.stream}`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+      body: JSON.stringify(data),
+    });
+    if (!response.ok || !response.body) {
+      handlers.onError?.(`Request failed with status ${response.status}`);
+      return;
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary !== -1) {
+        const message = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf('\n\n');
+
+        const event = message.match(/^event: (.*)$/m)?.[1];
+        const payload = message.match(/^data: (.*)$/m)?.[1];
+        if (!event || !payload) continue;
+        const parsed = JSON.parse(payload);
+        switch (event) {
+          case 'token':
+            handlers.onToken?.(parsed.token);
+            break;
+          case 'done':
+            handlers.onDone?.(parsed);
+            break;
+          case 'result':
+            handlers.onResult?.(parsed);
+            break;
+          case 'error':
+            handlers.onError?.(parsed.error);
+            break;
+        }
+      }
+    }
+  },
+
   // Handle clarification
   clarifyRecommendation: async (data: RecommendationRequest, sessionId: string) => {
     const response = await api.post<RecommendationResponse>(
@@ -123,9 +179,11 @@ export const apiService = {
     return response.data;
   },
 
-  // Initiate M-Pesa tip
-  initiateTip: async (data: TipRequest) => {
-    const response = await api.post<TipResponse>(endpoints.tip.initiate, data);
+  // Initiate M-Pesa tip; reuse the same idempotency key when retrying
+  initiateTip: async (data: TipRequest, idempotencyKey: string = crypto.randomUUID()) => {
+    const response = await api.post<TipResponse>(endpoints.tip.initiate, data, {
+      headers: { 'Idempotency-Key': idempotencyKey },
+    });
     return response.data;
   },
 };
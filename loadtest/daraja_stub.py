@@ -0,0 +1,148 @@
+"""Local stand-in for the Safaricom Daraja API.
+
+Serves the OAuth, STK push and transaction-status endpoints used by
+``MPesaService`` with a ``loadtest.network`` latency and error profile, and delivers
+STK callbacks back to the payload's ``CallBackURL`` asynchronously, the way
+Safaricom does once the customer answers the prompt.
+
+Run it and point the API at it::
+
+    python -m loadtest.daraja_stub --port 9000 --latency-ms 150 --callback-delay 2
+    MPESA_BASE_URL=http://localhost:9000 MPESA_CONSUMER_KEY=stub uvicorn app.main:app
+"""
+from typing import Dict, Any, Optional
+from dataclasses import dataclass
+import argparse
+import asyncio
+import logging
+import random
+import uuid
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from loadtest.network import NetworkProfile, simulate_network, add_profile_arguments, profile_from_args
+
+logger = logging.getLogger(__name__)
+
+# Body of Daraja's answer when it is overloaded
+BUSY_ERROR = {"errorCode": "500.003.02", "errorMessage": "System is busy. Please try again in few minutes."}
+
+@dataclass
+class StubConfig:
+    callback_delay: float = 1.0  # Seconds until the callback is sent
+    callback_success_rate: float = 1.0  # Share of callbacks reporting a completed payment
+    callback_drop_rate: float = 0.0  # Share of callbacks never sent, to exercise reconciliation
+
+def create_app(
+    config: Optional[StubConfig] = None,
+    callback_transport: Optional[httpx.AsyncBaseTransport] = None,
+    profile: Optional[NetworkProfile] = None,
+    seed: int = 42
+) -> FastAPI:
+    """Build the stand-in app.
+
+    ``callback_transport`` lets tests deliver callbacks in-process, e.g. with
+    ``httpx.ASGITransport`` wrapping the API app.
+    """
+    config = config or StubConfig()
+    rng = random.Random(seed)
+    app = FastAPI(title="Daraja stand-in")
+    app.state.config = config
+    app.state.profile = profile or NetworkProfile()
+    app.state.outcomes: Dict[str, Dict[str, Any]] = {}  # By AccountReference and CheckoutRequestID
+    app.state.callback_tasks = set()
+
+    async def deliver_callback(url: str, body: Dict[str, Any]) -> None:
+        await asyncio.sleep(config.callback_delay)
+        try:
+            async with httpx.AsyncClient(transport=callback_transport, timeout=10.0) as client:
+                await client.post(url, json=body)
+        except httpx.HTTPError as e:
+            logger.warning("Error delivering stub callback to %s: %r", url, e)
+
+    @app.get("/oauth/v1/generate")
+    async def generate_token(grant_type: str):
+        error = await simulate_network(app.state.profile, rng, BUSY_ERROR)
+        if error:
+            return error
+        return {"access_token": uuid.uuid4().hex, "expires_in": "3599"}
+
+    @app.post("/mpesa/stkpush/v1/processrequest")
+    async def stk_push(request: Request):
+        error = await simulate_network(app.state.profile, rng, BUSY_ERROR)
+        if error:
+            return error
+
+        payload = await request.json()
+        checkout_request_id = f"ws_CO_{uuid.uuid4().hex[:20]}"
+        merchant_request_id = uuid.uuid4().hex[:12]
+        succeeded = rng.random() < config.callback_success_rate
+        callback = {
+            "MerchantRequestID": merchant_request_id,
+            "CheckoutRequestID": checkout_request_id,
+            "ResultCode": 0 if succeeded else 1032,
+            "ResultDesc": "The service request is processed successfully." if succeeded else "Request cancelled by user"
+        }
+        if succeeded:
+            callback["CallbackMetadata"] = {"Item": [
+                {"Name": "Amount", "Value": payload["Amount"]},
+                {"Name": "MpesaReceiptNumber", "Value": uuid.uuid4().hex[:10].upper()},
+                {"Name": "PhoneNumber", "Value": int(payload["PhoneNumber"])}
+            ]}
+        app.state.outcomes[payload["AccountReference"]] = callback
+        app.state.outcomes[checkout_request_id] = callback
+
+        if rng.random() >= config.callback_drop_rate:
+            task = asyncio.create_task(
+                deliver_callback(payload["CallBackURL"], {"Body": {"stkCallback": callback}})
+            )
+            app.state.callback_tasks.add(task)
+            task.add_done_callback(app.state.callback_tasks.discard)
+
+        return {
+            "MerchantRequestID": merchant_request_id,
+            "CheckoutRequestID": checkout_request_id,
+            "ResponseCode": "0",
+            "ResponseDescription": "Success. Request accepted for processing",
+            "CustomerMessage": "Success. Request accepted for processing"
+        }
+
+    @app.get("/mpesa/transactionstatus/v1/query")
+    async def transaction_status(TransactionID: str):
+        error = await simulate_network(app.state.profile, rng, BUSY_ERROR)
+        if error:
+            return error
+
+        outcome = app.state.outcomes.get(TransactionID)
+        if not outcome:
+            return JSONResponse(
+                status_code=404,
+                content={"errorCode": "404.001.04", "errorMessage": "Invalid TransactionID"}
+            )
+        return {"ResultCode": outcome["ResultCode"], "ResultDesc": outcome["ResultDesc"]}
+
+    return app
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a local Daraja stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    add_profile_arguments(parser)
+    parser.add_argument("--callback-delay", type=float, default=1.0)
+    parser.add_argument("--callback-success-rate", type=float, default=1.0)
+    parser.add_argument("--callback-drop-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = StubConfig(
+        callback_delay=args.callback_delay,
+        callback_success_rate=args.callback_success_rate,
+        callback_drop_rate=args.callback_drop_rate
+    )
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    app = create_app(config, profile=profile_from_args(args), seed=args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Measure how long a fresh interpreter takes to import the API.
+
+Worker boot, autoscaling and test startup all pay this. Each run imports
+``app.main`` in a new process; the median is checked against a budget::
+
+    python -m loadtest.import_time --runs 7 --budget-ms 1500
+
+Heavy SDKs (OpenAI, BeautifulSoup, langdetect, Sentry) must stay out of
+the import; they load on first use.
+"""
+from typing import Dict, Any, List
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Tracked budget for `import app.main`, median of fresh processes
+IMPORT_BUDGET_MS = 1500.0
+
+DEFERRED_MODULES = ("openai", "bs4", "langdetect", "sentry_sdk")
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+print(json.dumps({"ms": elapsed * 1000, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (DEFERRED_MODULES,)
+
+def measure_once() -> Dict[str, Any]:
+    """Import the app in a fresh interpreter and report the time and deferred modules loaded."""
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def run(runs: int) -> Dict[str, Any]:
+    results: List[Dict[str, Any]] = [measure_once() for _ in range(runs)]
+    timings = [result["ms"] for result in results]
+    return {
+        "runs": runs,
+        "median_ms": round(statistics.median(timings), 1),
+        "min_ms": round(min(timings), 1),
+        "max_ms": round(max(timings), 1),
+        "deferred_modules_loaded": sorted({module for result in results for module in result["loaded"]})
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the API's import time.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    args = parser.parse_args()
+
+    report = run(args.runs)
+    print(json.dumps(report, indent=2))
+    if report["deferred_modules_loaded"]:
+        print(f"Imported at startup: {', '.join(report['deferred_modules_loaded'])}", file=sys.stderr)
+        sys.exit(1)
+    if report["median_ms"] > args.budget_ms:
+        print(f"Median {report['median_ms']}ms exceeds the {args.budget_ms}ms budget", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
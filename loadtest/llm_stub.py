@@ -0,0 +1,125 @@
+"""Local stand-in for the OpenAI chat completions API.
+
+Returns canned analyses and clarification questions in the OpenAI wire
+format, streamed or not, so the NLP path can be load-tested offline::
+
+    python -m loadtest.llm_stub --port 9200 --profile realistic --clarification-rate 0.2
+    OPENAI_BASE_URL=http://localhost:9200/v1 OPENAI_API_KEY=stub uvicorn app.main:app
+
+Whether a query needs clarification is derived from a hash of the query,
+so a given query always takes the same path and runs are reproducible.
+"""
+from typing import Dict, Any, List, Optional
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+import uuid
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from loadtest.network import NetworkProfile, simulate_network, add_profile_arguments, profile_from_args
+
+ANALYSIS_TEMPLATE = (
+    "Product category: consumer electronics. Key requirements: {query}. "
+    "Budget constraints: as stated, otherwise mid-range. Usage context: everyday personal use."
+)
+# Contains one of NLPService's clarification indicators
+UNCLEAR_ANALYSIS_TEMPLATE = (
+    "The request \"{query}\" is unclear: the product category and budget are ambiguous. "
+    "Ask the user to specify what they need."
+)
+CLARIFICATION_QUESTION = "What will you mainly use it for, and what is your maximum budget?"
+
+def needs_clarification(query: str, rate: float) -> bool:
+    digest = hashlib.sha1(query.encode()).digest()
+    return int.from_bytes(digest[:4], "big") / 2**32 < rate
+
+def create_app(
+    profile: Optional[NetworkProfile] = None,
+    clarification_rate: float = 0.2,
+    token_delay_ms: float = 0.0,
+    seed: int = 42
+) -> FastAPI:
+    """Build the stand-in app."""
+    profile = profile or NetworkProfile()
+    rng = random.Random(seed)
+    app = FastAPI(title="OpenAI stand-in")
+    app.state.profile = profile
+    app.state.requests = 0
+
+    def reply_for(messages: List[Dict[str, Any]]) -> str:
+        if "clarify" in messages[0]["content"]:
+            return CLARIFICATION_QUESTION
+        query = messages[-1]["content"]
+        template = UNCLEAR_ANALYSIS_TEMPLATE if needs_clarification(query, clarification_rate) else ANALYSIS_TEMPLATE
+        return template.format(query=query[:200])
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        app.state.requests += 1
+        error = await simulate_network(app.state.profile, rng)
+        if error:
+            return error
+
+        body = await request.json()
+        content = reply_for(body["messages"])
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        if body.get("stream"):
+            return StreamingResponse(
+                _stream(completion_id, created, body["model"], content, token_delay_ms),
+                media_type="text/event-stream"
+            )
+
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(content.split()), "total_tokens": 0}
+        }
+
+    return app
+
+async def _stream(completion_id: str, created: int, model: str, content: str, token_delay_ms: float):
+    def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+        return "data: " + json.dumps({
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }) + "\n\n"
+
+    yield chunk({"role": "assistant", "content": ""})
+    for word in content.split(" "):
+        if token_delay_ms:
+            await asyncio.sleep(token_delay_ms / 1000)
+        yield chunk({"content": word + " "})
+    yield chunk({}, "stop")
+    yield "data: [DONE]\n\n"
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a local OpenAI chat completions stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--clarification-rate", type=float, default=0.2)
+    parser.add_argument("--token-delay-ms", type=float, default=0.0, help="Delay between streamed tokens")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    app = create_app(profile_from_args(args), args.clarification_rate, args.token_delay_ms, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
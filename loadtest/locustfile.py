@@ -0,0 +1,140 @@
+"""Locust scenarios for the API, run against the local stand-ins.
+
+Start the Daraja, vendor and LLM stand-ins and point the API at them (see
+README, "Load Testing"), then::
+
+    locust -f loadtest/locustfile.py --host http://localhost:8000 \\
+      --headless -u 200 -r 20 -t 5m --csv results/<build>
+    python -m loadtest.report results/<build>_stats.csv --output results/<build>.json
+
+The default mix is mostly shoppers, some tippers and a few status pollers.
+Pick a single scenario by naming its class, e.g. ``... ShopperUser``. Query
+and amount choices are seeded (``LOADTEST_SEED``) so runs are comparable.
+"""
+import itertools
+import os
+import random
+import uuid
+from locust import HttpUser, between, events, task
+
+SEED = int(os.getenv("LOADTEST_SEED", "42"))
+
+QUERIES = [
+    "I need a cheap phone with a good camera",
+    "best laptop for university under 70k",
+    "wireless earbuds with noise cancellation",
+    "smart tv 43 inch vs 50 inch",
+    "phone with big battery for my mama",
+    "laptop with 16GB ram for programming",
+    "simu poa ya bei nafuu",
+    "something nice for my brother",
+    "samsung or tecno which is better",
+    "budget android tv",
+]
+FOLLOW_UPS = [
+    "mostly photos and WhatsApp, budget KES 20000",
+    "for school work, under 60k",
+    "gaming and movies",
+]
+
+_user_ids = itertools.count()
+
+@events.init.add_listener
+def seed_random(environment, **kwargs):
+    random.seed(SEED)
+
+def _phone_number(rng: random.Random) -> str:
+    return f"+2547{rng.randint(0, 99_999_999):08d}"
+
+class _SeededUser(HttpUser):
+    abstract = True
+
+    def on_start(self):
+        # One stream per user, so a run's request sequence doesn't depend on scheduling
+        self.rng = random.Random(SEED + next(_user_ids))
+
+class ShopperUser(_SeededUser):
+    """Asks for recommendations and answers clarification questions."""
+    weight = 8
+    wait_time = between(1, 5)
+
+    @task(5)
+    def recommend(self):
+        response = self.client.post(
+            "/api/v1/recommend/",
+            json={"query": self.rng.choice(QUERIES)},
+            name="recommend"
+        )
+        if response.status_code == 200 and response.json().get("clarification"):
+            self.client.post(
+                "/api/v1/recommend/clarify",
+                params={"session_id": response.json()["session_id"]},
+                json={"query": self.rng.choice(FOLLOW_UPS)},
+                name="clarify"
+            )
+
+    @task(1)
+    def batch(self):
+        self.client.post(
+            "/api/v1/recommend/batch",
+            json={"requests": [{"query": query} for query in self.rng.sample(QUERIES, 5)]},
+            name="recommend_batch"
+        )
+
+class TipperUser(_SeededUser):
+    """Sends a tip, then polls its status the way the frontend does."""
+    weight = 1
+    wait_time = between(5, 15)
+
+    @task
+    def tip(self):
+        response = self.client.post(
+            "/api/v1/tip/initiate",
+            json={"phone_number": _phone_number(self.rng), "amount": self.rng.randint(10, 500)},
+            headers={"Idempotency-Key": uuid.UUID(int=self.rng.getrandbits(128)).hex},
+            name="tip_initiate"
+        )
+        if response.status_code != 200:
+            return
+
+        transaction_id = response.json()["transaction_id"]
+        etag = None
+        for _ in range(10):
+            self.wait()
+            headers = {"If-None-Match": etag} if etag else {}
+            with self.client.get(
+                f"/api/v1/tip/status/{transaction_id}",
+                headers=headers,
+                name="tip_status",
+                catch_response=True
+            ) as status:
+                if status.status_code == 304:
+                    status.success()
+                    continue
+                etag = status.headers.get("etag")
+                if status.status_code == 200 and status.json()["status"] in ("completed", "failed"):
+                    return
+
+class StatusPollerUser(_SeededUser):
+    """Reads transaction history pages, e.g. a dashboard refreshing."""
+    weight = 1
+    wait_time = between(2, 5)
+
+    def on_start(self):
+        super().on_start()
+        self.phone_number = _phone_number(self.rng)
+        self.etag = None
+
+    @task
+    def history(self):
+        headers = {"If-None-Match": self.etag} if self.etag else {}
+        with self.client.get(
+            f"/api/v1/tip/history/{self.phone_number}",
+            headers=headers,
+            name="tip_history",
+            catch_response=True
+        ) as response:
+            if response.status_code == 304:
+                response.success()
+            else:
+                self.etag = response.headers.get("etag")
@@ -0,0 +1,59 @@
+"""Latency and error profiles shared by the Daraja, vendor and LLM stand-ins."""
+from typing import Any, Dict, Optional
+from dataclasses import dataclass
+import asyncio
+import random
+from fastapi.responses import JSONResponse
+
+@dataclass
+class NetworkProfile:
+    latency_ms: float = 0.0  # Mean added latency per request
+    latency_jitter_ms: float = 0.0
+    error_rate: float = 0.0  # Share of requests answered with HTTP 500
+    timeout_rate: float = 0.0  # Share of requests that hang for ``timeout_s`` first
+    timeout_s: float = 30.0
+
+# Named profiles for --profile; "realistic" is roughly what production sees
+PROFILES: Dict[str, NetworkProfile] = {
+    "instant": NetworkProfile(),
+    "realistic": NetworkProfile(latency_ms=400, latency_jitter_ms=150, error_rate=0.01),
+    "degraded": NetworkProfile(latency_ms=1500, latency_jitter_ms=800, error_rate=0.1, timeout_rate=0.02),
+}
+
+async def simulate_network(
+    profile: NetworkProfile,
+    rng: random.Random,
+    error_content: Optional[Dict[str, Any]] = None
+) -> Optional[JSONResponse]:
+    """Sleep per the profile; return an error response if this request should fail.
+
+    ``error_content`` is the failed response's body, for stand-ins that mimic
+    a particular API's error format.
+    """
+    if rng.random() < profile.timeout_rate:
+        await asyncio.sleep(profile.timeout_s)
+    elif profile.latency_ms or profile.latency_jitter_ms:
+        delay = rng.gauss(profile.latency_ms, profile.latency_jitter_ms) / 1000
+        await asyncio.sleep(max(delay, 0))
+    if rng.random() < profile.error_rate:
+        return JSONResponse(status_code=500, content=error_content or {"error": "Simulated upstream failure"})
+    return None
+
+def add_profile_arguments(parser) -> None:
+    """Add the --profile and per-field override options to a stand-in's CLI."""
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="instant")
+    parser.add_argument("--latency-ms", type=float)
+    parser.add_argument("--latency-jitter-ms", type=float)
+    parser.add_argument("--error-rate", type=float)
+    parser.add_argument("--timeout-rate", type=float)
+    parser.add_argument("--seed", type=int, default=42, help="Seed for latency and error draws")
+
+def profile_from_args(args) -> NetworkProfile:
+    base = PROFILES[args.profile]
+    return NetworkProfile(
+        latency_ms=base.latency_ms if args.latency_ms is None else args.latency_ms,
+        latency_jitter_ms=base.latency_jitter_ms if args.latency_jitter_ms is None else args.latency_jitter_ms,
+        error_rate=base.error_rate if args.error_rate is None else args.error_rate,
+        timeout_rate=base.timeout_rate if args.timeout_rate is None else args.timeout_rate,
+        timeout_s=base.timeout_s
+    )
@@ -0,0 +1,61 @@
+"""Measure the per-request overhead of the Redis rate limiter.
+
+Times ``RateLimiter.hit`` (one Lua call) against a real Redis and checks the
+p99 against a budget::
+
+    python -m loadtest.rate_limiter_bench --redis-url redis://localhost:6379 --requests 5000
+
+``--fake`` runs against an in-memory fakeredis instead; that only checks the
+script runs, its timings say nothing about production.
+"""
+from typing import Dict, Any
+import argparse
+import json
+import sys
+import time
+import uuid
+from app.core.rate_limit import RateLimiter, RouteLimit
+from loadtest.tip_flow import summarize
+
+def run(limiter: RateLimiter, requests: int, clients: int) -> Dict[str, Any]:
+    """Time ``requests`` limiter checks spread over ``clients`` buckets."""
+    limit = RouteLimit(f"bench-{uuid.uuid4().hex[:8]}", per_minute=1_000_000)
+    client_ids = [f"10.0.{i // 256}.{i % 256}" for i in range(clients)]
+    for client_id in client_ids:  # Warm up connections and the script cache
+        limiter.hit(client_id, limit)
+
+    samples = []
+    for i in range(requests):
+        started = time.perf_counter()
+        limiter.hit(client_ids[i % clients], limit)
+        samples.append(time.perf_counter() - started)
+
+    limiter.redis_client.delete(*(f"ratelimit:{limit.name}:{client_id}" for client_id in client_ids))
+    return summarize("rate_limiter_hit", samples)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the rate limiter's per-request overhead.")
+    parser.add_argument("--redis-url", default="redis://localhost:6379")
+    parser.add_argument("--fake", action="store_true", help="Use an in-memory fakeredis")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--budget-ms", type=float, default=1.0, help="Fail if p99 exceeds this")
+    args = parser.parse_args()
+
+    limiter = RateLimiter()
+    if args.fake:
+        import fakeredis
+        limiter.redis_client = fakeredis.FakeRedis()
+    else:
+        import redis
+        limiter.redis_client = redis.from_url(args.redis_url)
+    limiter._script = limiter.redis_client.register_script(limiter._script.script)
+
+    report = run(limiter, args.requests, args.clients)
+    print(json.dumps(report, indent=2))
+    if not args.fake and report["p99_ms"] > args.budget_ms:
+        print(f"p99 {report['p99_ms']}ms exceeds the {args.budget_ms}ms budget", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
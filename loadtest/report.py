@@ -0,0 +1,118 @@
+"""Turn Locust's ``--csv`` stats into a JSON report, and compare two reports.
+
+::
+
+    python -m loadtest.report results/main_stats.csv --output results/main.json
+    python -m loadtest.report compare results/main.json results/branch.json
+
+The report records the git revision it was produced from, so reports kept
+side by side say which build they measured.
+"""
+from typing import Dict, Any, List, Optional
+import argparse
+import csv
+import json
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+PERCENTILES = {"p50_ms": "50%", "p95_ms": "95%", "p99_ms": "99%"}
+
+def _number(value: str) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None  # Locust writes "N/A" for percentiles of empty endpoints
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def build_report(stats_csv: str) -> Dict[str, Any]:
+    """Summarize a Locust ``*_stats.csv`` file per endpoint and in aggregate."""
+    endpoints: List[Dict[str, Any]] = []
+    aggregate: Dict[str, Any] = {}
+    with open(stats_csv, newline="") as f:
+        for row in csv.DictReader(f):
+            entry = {
+                "name": row["Name"],
+                "method": row["Type"],
+                "requests": int(row["Request Count"]),
+                "failures": int(row["Failure Count"]),
+                "rps": round(float(row["Requests/s"]), 2),
+                "avg_ms": round(float(row["Average Response Time"]), 1),
+                **{key: _number(row[column]) for key, column in PERCENTILES.items()}
+            }
+            entry["failure_rate"] = round(entry["failures"] / entry["requests"], 4) if entry["requests"] else 0.0
+            if row["Name"] == "Aggregated":
+                aggregate = entry
+            else:
+                endpoints.append(entry)
+
+    return {
+        "revision": git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "aggregate": aggregate,
+        "endpoints": sorted(endpoints, key=lambda entry: entry["name"])
+    }
+
+def compare(base: Dict[str, Any], head: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Per-endpoint changes in throughput, p95 and failure rate, head vs base."""
+    base_by_name = {entry["name"]: entry for entry in base["endpoints"]}
+    base_by_name["Aggregated"] = base["aggregate"]
+    rows = []
+    for entry in head["endpoints"] + [head["aggregate"]]:
+        previous = base_by_name.get(entry["name"])
+        if not previous:
+            continue
+        rows.append({
+            "name": entry["name"],
+            "rps": (previous["rps"], entry["rps"]),
+            "p95_ms": (previous["p95_ms"], entry["p95_ms"]),
+            "failure_rate": (previous["failure_rate"], entry["failure_rate"])
+        })
+    return rows
+
+def _change(before: Optional[float], after: Optional[float]) -> str:
+    if before is None or after is None:
+        return f"{before} -> {after}"
+    if not before:
+        return f"{before:g} -> {after:g}"
+    return f"{before:g} -> {after:g} ({(after - before) / before:+.1%})"
+
+def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] == "compare":
+        parser = argparse.ArgumentParser(prog="loadtest.report compare", description="Compare two load-test reports.")
+        parser.add_argument("base")
+        parser.add_argument("head")
+        args = parser.parse_args(sys.argv[2:])
+        with open(args.base) as f:
+            base = json.load(f)
+        with open(args.head) as f:
+            head = json.load(f)
+        print(f"{base.get('revision')} -> {head.get('revision')}")
+        for row in compare(base, head):
+            print(f"{row['name']:<20} rps {_change(*row['rps']):<28} "
+                  f"p95 {_change(*row['p95_ms']):<30} failures {_change(*row['failure_rate'])}")
+        return
+
+    parser = argparse.ArgumentParser(description="Summarize Locust CSV stats as a JSON report.")
+    parser.add_argument("stats_csv", help="The *_stats.csv file written by locust --csv")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = build_report(args.stats_csv)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
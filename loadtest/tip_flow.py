@@ -0,0 +1,122 @@
+"""Tip-flow load scenario: initiate -> callback -> settled status.
+
+Drives the running API (normally pointed at ``loadtest.daraja_stub``) with
+concurrent virtual users. Each one initiates a tip, then polls
+``/tip/status`` until the callback has settled it. Reports throughput and
+latency percentiles for initiation and for end-to-end settlement::
+
+    python -m loadtest.tip_flow --api http://localhost:8000 --tips 500 --concurrency 50
+"""
+from typing import Dict, Any, List, Optional
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+import httpx
+
+SETTLED_STATUSES = {"completed", "failed"}
+
+def percentile(samples: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of a list of samples."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def summarize(name: str, samples: List[float]) -> Dict[str, Any]:
+    return {
+        "name": name,
+        "count": len(samples),
+        "p50_ms": _ms(percentile(samples, 50)),
+        "p95_ms": _ms(percentile(samples, 95)),
+        "p99_ms": _ms(percentile(samples, 99)),
+        "max_ms": _ms(max(samples) if samples else None)
+    }
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+async def run_tip(
+    client: httpx.AsyncClient,
+    results: Dict[str, List[Any]],
+    poll_interval: float,
+    settle_timeout: float
+) -> None:
+    """Run one initiate -> settled tip and record its timings."""
+    phone_number = f"+2547{random.randint(0, 99_999_999):08d}"
+    started = time.perf_counter()
+    response = await client.post(
+        "/api/v1/tip/initiate",
+        json={"phone_number": phone_number, "amount": random.randint(10, 500)},
+        headers={"Idempotency-Key": uuid.uuid4().hex}
+    )
+    results["initiate"].append(time.perf_counter() - started)
+    if response.status_code != 200:
+        results["errors"].append(f"initiate {response.status_code}")
+        return
+
+    transaction_id = response.json()["transaction_id"]
+    deadline = started + settle_timeout
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(poll_interval)
+        status_started = time.perf_counter()
+        status = await client.get(f"/api/v1/tip/status/{transaction_id}")
+        results["status"].append(time.perf_counter() - status_started)
+        if status.status_code == 200 and status.json()["status"] in SETTLED_STATUSES:
+            results["settled"].append(time.perf_counter() - started)
+            return
+    results["errors"].append("settle timeout")
+
+async def run(api: str, tips: int, concurrency: int, poll_interval: float, settle_timeout: float) -> Dict[str, Any]:
+    """Run the scenario and return the report."""
+    results: Dict[str, List[Any]] = {"initiate": [], "status": [], "settled": [], "errors": []}
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=api, limits=limits, timeout=30.0) as client:
+        async def worker() -> None:
+            async with semaphore:
+                try:
+                    await run_tip(client, results, poll_interval, settle_timeout)
+                except httpx.HTTPError as e:
+                    results["errors"].append(type(e).__name__)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(tips)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "tips": tips,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 2),
+        "settled_per_s": round(len(results["settled"]) / elapsed, 2),
+        "errors": len(results["errors"]),
+        "error_kinds": sorted(set(results["errors"])),
+        "latency": [
+            summarize("initiate", results["initiate"]),
+            summarize("status", results["status"]),
+            summarize("initiate_to_settled", results["settled"])
+        ]
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the tip flow.")
+    parser.add_argument("--api", default="http://localhost:8000")
+    parser.add_argument("--tips", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--settle-timeout", type=float, default=60.0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.api, args.tips, args.concurrency, args.poll_interval, args.settle_timeout))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
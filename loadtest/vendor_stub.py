@@ -0,0 +1,64 @@
+"""Local stand-in for the Jumia, Amazon and eBay search pages.
+
+Serves recorded result pages from ``loadtest/fixtures`` on the paths
+``ProductService`` requests, with a configurable latency and error profile::
+
+    python -m loadtest.vendor_stub --port 9100 --profile realistic
+    JUMIA_BASE_URL=http://localhost:9100/jumia AMAZON_BASE_URL=http://localhost:9100/amazon \\
+      EBAY_BASE_URL=http://localhost:9100/ebay uvicorn app.main:app
+"""
+from typing import Dict, Optional
+from pathlib import Path
+import argparse
+import random
+from fastapi import FastAPI
+from fastapi.responses import HTMLResponse
+from loadtest.network import NetworkProfile, simulate_network, add_profile_arguments, profile_from_args
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+VENDOR_PATHS = {
+    "jumia": "/jumia/catalog/",
+    "amazon": "/amazon/s",
+    "ebay": "/ebay/sch/i.html",
+}
+
+def create_app(profile: Optional[NetworkProfile] = None, seed: int = 42) -> FastAPI:
+    """Build the stand-in app. Pages are read once, at startup."""
+    profile = profile or NetworkProfile()
+    rng = random.Random(seed)
+    pages: Dict[str, str] = {
+        vendor: (FIXTURES_DIR / f"{vendor}.html").read_text() for vendor in VENDOR_PATHS
+    }
+    app = FastAPI(title="Vendor stand-in")
+    app.state.profile = profile
+    app.state.requests = {vendor: 0 for vendor in VENDOR_PATHS}
+
+    def add_route(vendor: str, path: str) -> None:
+        async def search():
+            app.state.requests[vendor] += 1
+            error = await simulate_network(app.state.profile, rng)
+            if error:
+                return error
+            return HTMLResponse(pages[vendor])
+
+        app.add_api_route(path, search, methods=["GET"], name=f"search_{vendor}")
+
+    for vendor, path in VENDOR_PATHS.items():
+        add_route(vendor, path)
+
+    return app
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a local vendor search stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(profile_from_args(args), args.seed), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
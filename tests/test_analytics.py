@@ -0,0 +1,62 @@
+import pytest
+import httpx
+import fakeredis
+from app.core.config import settings
+from app.main import app
+from app.services.analytics import AnalyticsService, get_analytics_service
+from app.services.transactions import TransactionService
+
+@pytest.fixture
+def services():
+    """Transaction and analytics services sharing an in-memory Redis."""
+    redis_client = fakeredis.FakeRedis()
+    transactions = TransactionService()
+    transactions.redis_client = redis_client
+    analytics = AnalyticsService()
+    analytics.redis_client = redis_client
+    return transactions, analytics
+
+@pytest.mark.asyncio
+async def test_rollups_follow_status_transitions(services):
+    """Test counters change once per settlement, including a failed tip that later completes."""
+    transactions, analytics = services
+    paid, declined, late, waiting = [
+        await transactions.create_transaction("+254700000010", amount) for amount in (100, 50, 20, 10)
+    ]
+    await transactions.update_transaction(paid["id"], {"status": "completed"})
+    await transactions.update_transaction(paid["id"], {"status": "completed"})  # Duplicate callback
+    await transactions.update_transaction(declined["id"], {"status": "failed"})
+    await transactions.update_transaction(late["id"], {"status": "failed"})
+    await transactions.update_transaction(late["id"], {"status": "completed"})
+    await transactions.increment_attempts(waiting["id"], "timeout")
+
+    summary = await analytics.tip_summary(days=1)
+
+    [today] = summary["days"]
+    assert {key: today[key] for key in ("initiated", "completed", "failed", "pending")} == {
+        "initiated": 4, "completed": 2, "failed": 1, "pending": 1
+    }
+    assert (today["amount_initiated"], today["amount_completed"]) == (180.0, 120.0)
+    assert today["success_rate"] == round(2 / 3, 4)
+    latency = summary["totals"]["latency"]
+    assert latency["count"] == 2
+    assert latency["buckets"]["5"] == latency["buckets"]["inf"] == 2
+    assert latency["p95_s"] == 5.0
+
+@pytest.mark.asyncio
+async def test_analytics_route_requires_admin_key(services, monkeypatch):
+    """Test the analytics route is admin-only and answers from the rollups."""
+    transactions, analytics = services
+    await transactions.create_transaction("+254700000011", 100)
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", "secret")
+    monkeypatch.setitem(app.dependency_overrides, get_analytics_service, lambda: analytics)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        denied = await client.get("/admin/analytics/tips")
+        response = await client.get("/admin/analytics/tips", params={"days": 7}, headers={"X-Admin-Key": "secret"})
+
+    assert denied.status_code == 403
+    body = response.json()
+    assert len(body["days"]) == 7
+    assert body["totals"]["initiated"] == 1
+    assert body["totals"]["success_rate"] is None
@@ -0,0 +1,128 @@
+import pytest
+import fakeredis
+import httpx
+from datetime import timedelta
+from app.core.archive import SegmentArchive
+from app.main import app
+from app.services.transactions import TransactionService, get_transaction_service
+
+PHONE = "+254700000009"
+
+@pytest.fixture
+def service(tmp_path):
+    """Transaction service with an in-memory Redis and an archive in a temp dir."""
+    service = TransactionService()
+    service.redis_client = fakeredis.FakeRedis()
+    service.archive = SegmentArchive(str(tmp_path))
+    return service
+
+@pytest.mark.asyncio
+async def test_settled_transactions_move_to_the_archive(service):
+    """Test settled transactions leave Redis and history still pages through them."""
+    created = [await service.create_transaction(PHONE, 100 + i) for i in range(5)]
+    for transaction in created[:3]:
+        await service.update_transaction(transaction["id"], {"status": "completed"})
+
+    assert await service.archive_settled(100, hot_window=timedelta(0), lease=timedelta(minutes=5)) == 3
+    assert not service.redis_client.exists(f"transaction:{created[0]['id']}")
+    assert service.redis_client.zcard(f"transactions:phone:{PHONE}") == 2
+    assert service.redis_client.zcard("transactions:archive") == 0
+
+    pages, cursor = [], None
+    while True:
+        page, cursor = await service.get_transaction_page(PHONE, limit=2, cursor=cursor)
+        pages.append([t["amount"] for t in page])
+        if not cursor:
+            break
+    assert pages == [[104, 103], [102, 101], [100]]
+    assert [t["status"] for t in (await service.get_transactions_by_phone(PHONE))[2:]] == ["completed"] * 3
+
+@pytest.mark.asyncio
+async def test_archived_transactions_keep_their_status(service, monkeypatch):
+    """Test a tip's status is still served after it has moved to the archive."""
+    transaction = await service.create_transaction(PHONE, 250)
+    await service.update_transaction(transaction["id"], {"status": "completed"})
+    assert await service.archive_settled(100, hot_window=timedelta(0), lease=timedelta(minutes=5)) == 1
+    monkeypatch.setitem(app.dependency_overrides, get_transaction_service, lambda: service)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as api:
+        response = await api.get(f"/api/v1/tip/status/{transaction['id']}")
+        missing = await api.get("/api/v1/tip/status/unknown")
+
+    assert response.status_code == 200
+    assert (response.json()["status"], response.json()["amount"]) == ("completed", 250)
+    assert missing.status_code == 404
+
+@pytest.mark.asyncio
+async def test_recent_settlements_stay_in_redis(service):
+    """Test transactions inside the hot window are not archived yet."""
+    transaction = await service.create_transaction(PHONE, 100)
+    await service.update_transaction(transaction["id"], {"status": "failed"})
+
+    assert await service.archive_settled(100, hot_window=timedelta(hours=24), lease=timedelta(minutes=5)) == 0
+    assert await service.get_transaction(transaction["id"]) is not None
+
+def test_segments_roll_over_and_are_shared_between_readers(tmp_path):
+    """Test records span segments, other instances see them and corruption is caught."""
+    writer = SegmentArchive(str(tmp_path), segment_max_bytes=64)
+    reader = SegmentArchive(str(tmp_path))
+    for i in range(6):
+        writer.append([("alice", float(i), f"id{i}", f"payload-{i}".encode() * 3)])
+
+    # A writer in the middle of an index line
+    with open(reader._shard_path("keys", "alice"), "a") as index:
+        index.write("alice\t9.0\tid9\t3")
+
+    entries = reader.entries("alice", before=5.0, limit=3)
+    assert [entry.id for entry in entries] == ["id4", "id3", "id2"]
+    assert reader.read(entries[0]) == b"payload-4" * 3
+    assert len({entry.segment for entry in reader.entries("alice", limit=10)}) == 3
+
+    with open(tmp_path / "segment-000001.log", "r+b") as data:
+        data.seek(8)
+        data.write(b"X")
+    with pytest.raises(ValueError):
+        SegmentArchive(str(tmp_path)).read(reader.entries("alice", before=1.0)[0])
+
+@pytest.mark.asyncio
+async def test_settlements_are_not_queued_without_an_archive(service):
+    """Test Redis-only deployments don't build up an archive queue nothing drains."""
+    service.archive = None
+    transaction = await service.create_transaction(PHONE, 100)
+    await service.update_transaction(transaction["id"], {"status": "completed"})
+
+    assert (await service.get_transaction(transaction["id"]))["status"] == "completed"
+    assert service.redis_client.zcard("transactions:archive") == 0
+
+@pytest.mark.asyncio
+async def test_retried_batches_do_not_cut_history_short(service):
+    """Test records appended twice by a retried batch are paged once and don't end paging early."""
+    created = [await service.create_transaction(PHONE, 100 + i) for i in range(5)]
+    for transaction in created:
+        await service.update_transaction(transaction["id"], {"status": "completed"})
+    assert await service.archive_settled(100, hot_window=timedelta(0), lease=timedelta(minutes=5)) == 5
+
+    # The append of a retried batch succeeded again before its Redis cleanup
+    retried = [service.archive.find(transaction["id"]) for transaction in created[-2:]]
+    service.archive.append([(PHONE, entry.score, entry.id, service.archive.read(entry)) for entry in retried])
+
+    pages, cursor = [], None
+    while True:
+        page, cursor = await service.get_transaction_page(PHONE, limit=2, cursor=cursor)
+        pages.append([t["amount"] for t in page])
+        if not cursor:
+            break
+    assert pages == [[104, 103], [102, 101], [100]]
+
+def test_readers_keep_only_recent_keys_in_memory(tmp_path):
+    """Test per-key indexes are loaded on demand, capped, and pick up later appends."""
+    archive = SegmentArchive(str(tmp_path), cached_keys=2)
+    archive.append([(f"phone{i}", 1.0, f"id{i}", b"first") for i in range(3)])
+    for i in range(3):
+        assert [entry.id for entry in archive.entries(f"phone{i}")] == [f"id{i}"]
+    assert list(archive._keys) == ["phone1", "phone2"]
+
+    archive.append([("phone2", 2.0, "id2b", b"second")])
+    assert [entry.id for entry in archive.entries("phone2")] == ["id2b", "id2"]
+    assert archive.read(archive.find("id2b")) == b"second"
+    assert archive.find("missing") is None
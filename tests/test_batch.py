@@ -0,0 +1,88 @@
+import pytest
+import fakeredis
+import httpx
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models.schemas import QueryType
+from app.services.nlp import get_nlp_service
+from app.services.products import Candidate, ProductService, get_product_service
+from app.services.sessions import SessionService, get_session_service
+
+class FakeNLP:
+    """Answers like NLPService without calling OpenAI."""
+
+    async def process_query(self, query, context=None):
+        if "fail" in query:
+            raise Exception("model unavailable")
+        return {
+            "analysis": f"User wants: {query}",
+            "language": "en",
+            "query_type": QueryType.FEATURE_BASED,
+            "needs_clarification": "something" in query
+        }
+
+    async def generate_clarification_question(self, analysis):
+        return "What will you use it for?"
+
+@pytest.fixture
+def batch_client(monkeypatch):
+    """API client with fake NLP and vendors, counting vendor fetches."""
+    redis_client = fakeredis.FakeRedis()
+    products = ProductService()
+    products.redis_client = redis_client
+    sessions = SessionService()
+    sessions.redis_client = redis_client
+    fetches = []
+
+    async def jumia(query, filters=None):
+        fetches.append(query)
+        return [Candidate(
+            name=f"{query} deal",
+            description="Best seller",
+            specs=[],
+            image_url="https://example.com/item.jpg",
+            price=15999,
+            currency="KES",
+            vendor_url=f"https://www.jumia.co.ke/{query.replace(' ', '-')}.html",
+            confidence_score=0.8
+        )]
+
+    async def nothing(query, filters=None):
+        return []
+
+    monkeypatch.setattr(products, "_search_jumia", jumia)
+    monkeypatch.setattr(products, "_search_amazon", nothing)
+    monkeypatch.setattr(products, "_search_ebay", nothing)
+    monkeypatch.setitem(app.dependency_overrides, get_nlp_service, FakeNLP)
+    monkeypatch.setitem(app.dependency_overrides, get_product_service, lambda: products)
+    monkeypatch.setitem(app.dependency_overrides, get_session_service, lambda: sessions)
+
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+    return client, fetches, redis_client
+
+@pytest.mark.asyncio
+async def test_batch_shares_vendor_fetches(batch_client):
+    """Test a batch of 50 scrapes once per distinct search and answers in order."""
+    client, fetches, redis_client = batch_client
+    queries = ["phone with good camera", "Phone  with GOOD camera", "laptop with 16GB ram"] * 16
+    queries += ["need something nice", "please fail"]
+
+    response = await client.post("/api/v1/recommend/batch", json={"requests": [{"query": q} for q in queries]})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert len(results) == 50
+    assert sorted(fetches) == ["laptop with 16gb ram", "phone with good camera"]
+    assert results[1]["response"]["products"][0]["name"] == "phone with good camera deal"
+    assert results[48]["response"]["clarification"] == "What will you use it for?"
+    assert results[49]["error"].endswith("model unavailable")
+    assert redis_client.exists(f"session:{results[0]['response']['session_id']}")
+
+    # A second batch is served from the cache
+    await client.post("/api/v1/recommend/batch", json={"requests": [{"query": q} for q in queries[:3]]})
+    assert len(fetches) == 2
+
+def test_batch_size_is_bounded():
+    """Test batches over 50 queries are rejected."""
+    response = TestClient(app).post("/api/v1/recommend/batch", json={"requests": [{"query": "phone"}] * 51})
+    assert response.status_code == 422
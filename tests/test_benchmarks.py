@@ -0,0 +1,19 @@
+from benchmarks.microbench import BENCHMARKS, run, compare
+
+def test_every_benchmark_runs():
+    """Test each benchmark's setup and body run against the fixtures."""
+    report = run(quick=True)
+
+    assert set(report["results"]) == set(BENCHMARKS)
+    assert all(seconds > 0 for seconds in report["results"].values())
+
+def test_compare_flags_regressions_over_threshold():
+    """Test only slowdowns beyond the threshold count as regressions."""
+    baseline = {"results": {"parse_jumia": 1.0, "score_10": 1.0, "query_type": 1.0}}
+    current = {"results": {"parse_jumia": 1.1, "score_10": 1.5, "query_type": 0.5, "cache_encode_100": 9.0}}
+
+    rows = {row["name"]: row for row in compare(baseline, current, threshold=0.2)}
+
+    assert set(rows) == {"parse_jumia", "score_10", "query_type"}
+    assert [name for name, row in rows.items() if row["regressed"]] == ["score_10"]
+    assert rows["query_type"]["change"] == -0.5
@@ -0,0 +1,69 @@
+import pytest
+import fakeredis
+from app.services import callbacks
+from app.services.callbacks import CallbackService
+from app.services.transactions import TransactionService
+
+def _callback(checkout_request_id: str, result_code: int = 0) -> dict:
+    return {
+        "Body": {
+            "stkCallback": {
+                "CheckoutRequestID": checkout_request_id,
+                "ResultCode": result_code,
+                "ResultDesc": "Processed" if result_code == 0 else "Request cancelled by user"
+            }
+        }
+    }
+
+@pytest.fixture
+def services(monkeypatch):
+    """Callback and transaction services sharing an in-memory Redis."""
+    redis_client = fakeredis.FakeRedis()
+    transaction_service = TransactionService()
+    transaction_service.redis_client = redis_client
+    monkeypatch.setattr(callbacks, "transaction_service", transaction_service)
+
+    callback_service = CallbackService()
+    callback_service.redis_client = redis_client
+    callback_service.max_deliveries = 2
+    return callback_service, transaction_service
+
+@pytest.mark.asyncio
+async def test_callbacks_are_applied_in_batches(services):
+    """Test queued callbacks update their transactions once, duplicates included."""
+    callback_service, transaction_service = services
+    paid = await transaction_service.create_transaction("+254700000010", 100)
+    cancelled = await transaction_service.create_transaction("+254700000011", 200)
+    await transaction_service.attach_checkout_request(paid["id"], "ws_CO_paid", {"status": "pending"})
+    await transaction_service.attach_checkout_request(cancelled["id"], "ws_CO_cancelled", {"status": "pending"})
+
+    await callback_service.enqueue(_callback("ws_CO_paid"))
+    await callback_service.enqueue(_callback("ws_CO_paid"))
+    await callback_service.enqueue(_callback("ws_CO_cancelled", result_code=1032))
+
+    assert await callback_service.process_batch() == 3
+    assert (await transaction_service.get_transaction(paid["id"]))["status"] == "completed"
+    assert (await transaction_service.get_transaction(cancelled["id"]))["status"] == "failed"
+    assert callback_service.redis_client.xpending(callback_service.stream, callback_service.group)["pending"] == 0
+
+    # A replay after processing is dropped too
+    await callback_service.enqueue(_callback("ws_CO_paid", result_code=1))
+    assert await callback_service.process_batch() == 1
+    assert (await transaction_service.get_transaction(paid["id"]))["status"] == "completed"
+
+@pytest.mark.asyncio
+async def test_failing_callbacks_are_dead_lettered(services):
+    """Test malformed and unresolvable callbacks end up on the dead-letter stream."""
+    callback_service, _ = services
+    callback_service.retry_idle = callback_service.retry_idle * 0
+
+    await callback_service.enqueue({"unexpected": "payload"})
+    await callback_service.enqueue(_callback("ws_CO_unknown"))
+
+    await callback_service.process_batch()
+    assert callback_service.redis_client.xlen(callback_service.dead_letter_stream) == 1
+
+    # The unknown CheckoutRequestID is retried once more, then dead-lettered
+    await callback_service.process_batch()
+    assert callback_service.redis_client.xlen(callback_service.dead_letter_stream) == 2
+    assert callback_service.redis_client.xpending(callback_service.stream, callback_service.group)["pending"] == 0
@@ -0,0 +1,70 @@
+from app.services.context import ConversationContextManager, CHARS_PER_TOKEN
+
+def test_context_stays_within_budget():
+    """Test rendered context size is bounded however long the conversation runs."""
+    manager = ConversationContextManager()
+    state = manager.new_state()
+    max_chars = manager.token_budget * CHARS_PER_TOKEN
+
+    for i in range(200):
+        manager.record_turn(state, f"Question number {i} about phones " * 5, "analysis " * 100)
+        assert len(state["turns"]) <= manager.max_turns
+        assert len(manager.render(state)) <= max_chars
+
+    assert state["summary"]
+    assert "Question number 199" in manager.render(state)
+
+def test_context_extracts_budget_and_clips_client_context():
+    """Test budget extraction and client context sanitising."""
+    manager = ConversationContextManager()
+    state = manager.new_state()
+
+    manager.merge_client_context(state, {
+        "previous_query": "x" * 10000,
+        "nested": {"ignored": True},
+        **{f"key{i}": i for i in range(50)}
+    })
+    manager.record_turn(state, "I need a phone under KES 15,000", "Phone, budget constrained")
+
+    assert len(state["constraints"]["previous_query"]) == manager.max_field_chars
+    assert "nested" not in state["constraints"]
+    assert len(state["constraints"]) <= manager.max_constraints + 1
+    assert state["constraints"]["budget"] == "KES 15000"
+    assert manager.budget(state) == {"max": 15000, "currency": "KES"}
+
+def test_context_ignores_budget_words_without_an_amount():
+    """Test a budget keyword followed by punctuation is not mistaken for an amount."""
+    manager = ConversationContextManager()
+    state = manager.new_state()
+
+    manager.record_turn(state, "something under, like, cheap", "Unclear")
+    manager.merge_client_context(state, {"budget": ",,,"})
+
+    assert manager.budget(state) is None
+    assert manager._extract_budget("phones below , please") is None
+
+def test_context_render_keeps_whole_entries():
+    """Test an over-budget state renders whole entries rather than a clipped string."""
+    manager = ConversationContextManager()
+    state = manager.new_state()
+    max_chars = manager.token_budget * CHARS_PER_TOKEN
+    manager.merge_client_context(state, {f"key{i}": f"value {i} " * 30 for i in range(10)})
+    manager.record_turn(state, "I need a phone under KES 15,000", "Phone, budget constrained")
+
+    rendered = manager.render(state)
+
+    assert len(rendered) <= max_chars
+    assert rendered.startswith("Known constraints: ")
+    assert rendered.endswith("budget: KES 15000")
+
+def test_context_only_takes_plausible_prices_as_budget():
+    """Test ages, sizes and small bare numbers after "under" are not budgets."""
+    manager = ConversationContextManager()
+
+    assert manager._extract_budget("toy for kids under 5 years old") is None
+    assert manager._extract_budget("tv under 50 inch") is None
+    assert manager._extract_budget("laptop under 16 gb") is None
+    assert manager._extract_budget("gift under 50") is None
+    assert manager._extract_budget("earbuds under $50") == "USD 50"
+    assert manager._extract_budget("phone under 20k") == "KES 20000"
+    assert manager._extract_budget("phone below 15,000 please") == "KES 15000"
@@ -0,0 +1,46 @@
+import pytest
+import fakeredis
+import httpx
+from app.services import fx
+from app.services.fx import FxService, parse_rates
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+def _service(redis_client) -> FxService:
+    service = FxService()
+    service.redis_client = redis_client
+    service.rates = parse_rates("USD=1,KES=130")
+    service.source_url = "https://fx.example.com/latest"
+    return service
+
+def test_converts_through_the_dollar(redis_client):
+    service = _service(redis_client)
+
+    assert service.convert(100, "USD", "KES") == 13000
+    assert service.convert(13000, "KES", "USD") == pytest.approx(100)
+    assert service.rate("KES", "KES") == 1.0
+    assert service.rate("EUR", "KES") is None
+
+@pytest.mark.asyncio
+async def test_refreshed_rates_are_rebased_and_shared(redis_client, monkeypatch):
+    """Test rates quoted against another base become per-USD and reach other workers."""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"base": "EUR", "rates": {"USD": 1.1, "KES": 143.0}})
+
+    client_class = httpx.AsyncClient
+    monkeypatch.setattr(fx.httpx, "AsyncClient", lambda **kwargs: client_class(transport=httpx.MockTransport(handler), **kwargs))
+    refresher, other = _service(redis_client), _service(redis_client)
+
+    assert await refresher.refresh()
+    # The refresh lock keeps a second worker from fetching again
+    assert not await other.refresh()
+
+    assert len(requests) == 1
+    assert refresher.rates == pytest.approx({"USD": 1.0, "KES": 130.0, "EUR": 1 / 1.1})
+    assert other.table() == refresher.rates
+    assert other.updated_at == refresher.updated_at
@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+import fakeredis
+import httpx
+from fastapi.testclient import TestClient
+from app.main import app
+from app.routes import tips
+from app.services.idempotency import IdempotencyService, get_idempotency_service
+from app.services.mpesa import mpesa_service
+
+@pytest.fixture
+def stk_pushes(monkeypatch):
+    """Record STK pushes instead of sending them, with idempotency in memory."""
+    idempotency_service = IdempotencyService()
+    idempotency_service.redis_client = fakeredis.FakeRedis()
+    monkeypatch.setitem(app.dependency_overrides, get_idempotency_service, lambda: idempotency_service)
+
+    pushes = []
+
+    async def initiate_stk_push(phone_number, amount):
+        pushes.append((phone_number, amount))
+        await asyncio.sleep(0.05)
+        return {
+            "success": True,
+            "message": "Please check your phone to complete the payment",
+            "transaction_id": f"TXN_{len(pushes)}",
+            "status": "pending"
+        }
+
+    monkeypatch.setattr(mpesa_service, "initiate_stk_push", initiate_stk_push)
+    return pushes
+
+def test_retried_tip_is_replayed(stk_pushes):
+    """Test a retry with the same Idempotency-Key gets the original response."""
+    client = TestClient(app)
+    request_data = {"phone_number": "+254759325915", "amount": 100}
+    headers = {"Idempotency-Key": "tip-retry-1"}
+
+    first = client.post("/api/v1/tip/initiate", json=request_data, headers=headers)
+    second = client.post("/api/v1/tip/initiate", json=request_data, headers=headers)
+    reused = client.post("/api/v1/tip/initiate", json={**request_data, "amount": 200}, headers=headers)
+
+    assert first.status_code == 200
+    assert second.json() == first.json()
+    assert reused.status_code == 422
+    assert len(stk_pushes) == 1
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_wait_for_first(stk_pushes):
+    """Test duplicates arriving mid-request share the first request's result."""
+    request = tips.TipRequest(phone_number="+254759325915", amount=100)
+
+    idempotency_service = app.dependency_overrides[get_idempotency_service]()
+    responses = await asyncio.gather(*(
+        tips.initiate_tip(
+            request,
+            idempotency_key="tip-concurrent-1",
+            mpesa_service=mpesa_service.get(),
+            idempotency_service=idempotency_service
+        ) for _ in range(5)
+    ))
+
+    assert len(stk_pushes) == 1
+    assert {response.transaction_id for response in responses} == {"TXN_1"}
+
+def test_timed_out_tip_is_not_pushed_again(stk_pushes, monkeypatch):
+    """Test a retry after a 5xx replays the error rather than sending a second push."""
+    async def timed_out_push(phone_number, amount):
+        stk_pushes.append((phone_number, amount))
+        raise httpx.ReadTimeout("STK push timed out")
+
+    monkeypatch.setattr(mpesa_service, "initiate_stk_push", timed_out_push)
+    client = TestClient(app)
+    request_data = {"phone_number": "+254759325915", "amount": 100}
+    headers = {"Idempotency-Key": "tip-timeout-1"}
+
+    first = client.post("/api/v1/tip/initiate", json=request_data, headers=headers)
+    retry = client.post("/api/v1/tip/initiate", json=request_data, headers=headers)
+
+    assert first.status_code == 500
+    assert retry.status_code == 500
+    assert retry.json() == first.json()
+    assert len(stk_pushes) == 1
@@ -0,0 +1,76 @@
+import pytest
+import fakeredis
+import httpx
+from types import SimpleNamespace
+from openai import AsyncOpenAI
+from app.core.config import settings
+from app.services import products
+from app.services.nlp import NLPService
+from loadtest import llm_stub, vendor_stub
+from loadtest.report import build_report, compare
+
+@pytest.fixture
+def product_service(monkeypatch):
+    """Product service scraping the vendor stand-in in-process."""
+    stub = vendor_stub.create_app()
+    transport = httpx.ASGITransport(app=stub)
+    monkeypatch.setattr(products, "httpx", SimpleNamespace(
+        AsyncClient=lambda **kwargs: httpx.AsyncClient(transport=transport, **kwargs)
+    ))
+    for vendor in ("JUMIA", "AMAZON", "EBAY"):
+        monkeypatch.setattr(settings, f"{vendor}_BASE_URL", f"http://vendors.stub/{vendor.lower()}")
+
+    service = products.ProductService()
+    service.redis_client = fakeredis.FakeRedis()
+    return service
+
+@pytest.fixture
+def nlp_service():
+    """NLP service talking to the LLM stand-in in-process."""
+    stub = llm_stub.create_app(clarification_rate=0.0)
+    service = NLPService()
+    service._client = AsyncOpenAI(
+        api_key="stub",
+        base_url="http://llm.stub/v1",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=stub))
+    )
+    return service
+
+@pytest.mark.asyncio
+async def test_recorded_pages_parse(product_service):
+    """Test every recorded vendor page parses into products."""
+    jumia = await product_service._search_jumia("phone")
+    amazon = await product_service._search_amazon("phone")
+    ebay = await product_service._search_ebay("phone")
+
+    assert len(jumia) == len(amazon) == len(ebay) == 8
+    assert jumia[0].currency == "KES"
+    assert str(amazon[0].vendor_url).startswith("https://www.amazon.com/dp/")
+
+@pytest.mark.asyncio
+async def test_llm_stub_speaks_openai(nlp_service):
+    """Test the NLP service runs against the stand-in, streamed and not."""
+    result = await nlp_service.process_query("phone with a big battery")
+    tokens = [token async for token in nlp_service.stream_clarification_question(result["analysis"])]
+
+    assert result["needs_clarification"] is False
+    assert "phone with a big battery" in result["analysis"]
+    assert "".join(tokens).strip() == llm_stub.CLARIFICATION_QUESTION
+
+def test_report_summarizes_and_compares(tmp_path):
+    """Test Locust CSV stats become a report and reports compare per endpoint."""
+    header = "Type,Name,Request Count,Failure Count,Average Response Time,Requests/s,50%,95%,99%\n"
+    base_csv = tmp_path / "base_stats.csv"
+    base_csv.write_text(header + "POST,recommend,1000,10,250.0,50.0,200,600,900\n,Aggregated,1000,10,250.0,50.0,200,600,900\n")
+    head_csv = tmp_path / "head_stats.csv"
+    head_csv.write_text(header + "POST,recommend,1200,0,200.0,60.0,150,450,700\n,Aggregated,1200,0,200.0,60.0,150,450,700\n")
+
+    base, head = build_report(str(base_csv)), build_report(str(head_csv))
+
+    assert base["endpoints"][0] == {
+        "name": "recommend", "method": "POST", "requests": 1000, "failures": 10, "rps": 50.0,
+        "avg_ms": 250.0, "p50_ms": 200.0, "p95_ms": 600.0, "p99_ms": 900.0, "failure_rate": 0.01
+    }
+    rows = compare(base, head)
+    assert rows[0]["p95_ms"] == (600.0, 450.0)
+    assert rows[-1]["name"] == "Aggregated"
@@ -0,0 +1,75 @@
+import io
+import json
+import logging
+import time
+import pytest
+from app.core import logs
+from app.core.logs import ErrorAggregator, setup_logging, stop_logging
+from app.services.products import ProductService, parse_errors
+
+BROKEN_PAGE = """
+<article class="prd">
+  <a class="core" href="https://www.jumia.co.ke/{i}.html">
+    <img class="img" data-src="https://ke.jumia.is/product/{i}.jpg">
+    <h3 class="name">Phone {i}</h3>
+  </a>
+  <div class="desc">Dual SIM</div>
+</article>
+"""
+
+@pytest.fixture
+def log_stream():
+    """Capture app logs as written by the background writer."""
+    stop_logging()
+    stream = io.StringIO()
+    setup_logging("INFO", "json", stream)
+    yield stream
+    stop_logging()
+
+def _lines(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+def test_logs_are_json_lines_with_extra_fields(log_stream):
+    """Test records are written off-thread as JSON, with ``extra`` as fields."""
+    logging.getLogger("app.test").warning("Vendor search failed", extra={"vendor": "jumia"})
+    stop_logging()
+
+    [line] = _lines(log_stream)
+    assert line["message"] == "Vendor search failed"
+    assert line["vendor"] == "jumia"
+    assert line["level"] == "WARNING"
+
+def test_parse_errors_are_logged_once_per_selector(log_stream, monkeypatch):
+    """Test items missing a price are counted, not logged one by one."""
+    monkeypatch.setattr(parse_errors, "interval", 3600)
+    service = ProductService()
+    html = "".join(BROKEN_PAGE.format(i=i) for i in range(20))
+
+    assert service._parse_jumia(html, "phone") == []
+    assert service._parse_jumia(html, "phone") == []
+    assert log_stream.getvalue() == ""
+
+    stop_logging()
+    [line] = _lines(log_stream)
+    assert (line["vendor"], line["reason"], line["count"]) == ("jumia", "div.prc", 40)
+
+def test_lone_burst_is_flushed_without_further_errors(monkeypatch):
+    """Test a burst of errors followed by quiet is logged once its interval passes."""
+    monkeypatch.setattr(logs, "FLUSH_TICK", 0.01)
+    stop_logging()
+    stream = io.StringIO()
+    setup_logging("INFO", "json", stream)
+    aggregator = ErrorAggregator(logging.getLogger("app.test"), "Items failed", ("vendor", "reason"), 0.05)
+    try:
+        for _ in range(5):
+            aggregator.record("ebay", "span.s-item__price")
+
+        deadline = time.monotonic() + 2
+        while not stream.getvalue() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        [line] = _lines(stream)
+        assert (line["vendor"], line["count"]) == ("ebay", 5)
+    finally:
+        stop_logging()
+        logs._aggregators.remove(aggregator)
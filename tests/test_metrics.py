@@ -0,0 +1,64 @@
+import pytest
+import fakeredis
+from prometheus_client import REGISTRY
+from app.core.timing import TimedORJSONResponse
+from app.models.schemas import Product
+from app.services.products import Candidate, product_service
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+@pytest.fixture
+def vendors(monkeypatch):
+    """Vendors answering from memory: Jumia with one product, eBay failing."""
+    monkeypatch.setattr(product_service, "redis_client", fakeredis.FakeRedis())
+
+    async def jumia(query, filters=None):
+        return [Candidate(
+            name="Tecno Spark 20",
+            description="6.6 inch display, 128GB",
+            specs=[],
+            image_url="https://example.com/spark.jpg",
+            price=15999,
+            currency="KES",
+            vendor_url="https://www.jumia.co.ke/spark-20.html",
+            confidence_score=0.8
+        )]
+
+    async def amazon(query, filters=None):
+        return []
+
+    async def ebay(query, filters=None):
+        raise TimeoutError()
+
+    monkeypatch.setattr(product_service, "_search_jumia", jumia)
+    monkeypatch.setattr(product_service, "_search_amazon", amazon)
+    monkeypatch.setattr(product_service, "_search_ebay", ebay)
+
+@pytest.mark.asyncio
+async def test_search_records_stage_and_cache_metrics(vendors):
+    """Test a search records vendor latency, cache misses and hits."""
+    misses = _sample("product_cache_requests_total", result="miss")
+    hits = _sample("product_cache_requests_total", result="hit")
+    jumia_searches = _sample("vendor_search_seconds_count", vendor="jumia")
+    cache_sets = _sample("recommendation_stage_seconds_count", stage="cache_set")
+
+    first = await product_service.search_products("phone under 20k", {"language": "en"})
+    second = await product_service.search_products("phone under 20k", {"language": "en"})
+
+    # Cached products come back as models, not raw dicts
+    assert first == second
+    assert isinstance(second[0], Product)
+    assert _sample("product_cache_requests_total", result="miss") == misses + 1
+    assert _sample("product_cache_requests_total", result="hit") == hits + 1
+    assert _sample("vendor_search_seconds_count", vendor="jumia") == jumia_searches + 1
+    assert _sample("recommendation_stage_seconds_count", stage="cache_set") == cache_sets + 1
+    assert _sample("vendor_searches_in_flight", vendor="jumia") == 0
+
+def test_response_rendering_is_timed():
+    """Test JSON response bodies record their serialization time."""
+    rendered = _sample("response_serialization_seconds_count")
+    response = TimedORJSONResponse({"products": [{"name": "Tecno Spark 20", "price": 15999}]})
+
+    assert response.body == b'{"products":[{"name":"Tecno Spark 20","price":15999}]}'
+    assert _sample("response_serialization_seconds_count") == rendered + 1
@@ -0,0 +1,116 @@
+import asyncio
+import pytest
+import fakeredis
+import httpx
+from app.services.daraja import DarajaClient, OPERATION_TIMEOUTS
+from app.services.mpesa import MPesaService
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+def _service(redis_client, calls):
+    """M-Pesa service whose OAuth fetch is counted instead of sent."""
+    service = MPesaService()
+    service.redis_client = redis_client
+
+    async def fetch():
+        calls.append(service)
+        await asyncio.sleep(0.05)
+        return f"token-{len(calls)}", 3599.0
+
+    service._fetch_access_token = fetch
+    return service
+
+@pytest.mark.asyncio
+async def test_access_token_is_fetched_once_across_workers(redis_client):
+    """Test concurrent requests on two workers share one OAuth fetch."""
+    calls = []
+    first, second = _service(redis_client, calls), _service(redis_client, calls)
+
+    tokens = await asyncio.gather(*(
+        service.get_access_token() for service in [first, second] * 10
+    ))
+
+    assert len(calls) == 1
+    assert set(tokens) == {"token-1"}
+
+@pytest.mark.asyncio
+async def test_slow_refresher_leaves_the_next_lock_alone(redis_client):
+    """Test a refresher whose lock lapsed doesn't delete the lock another worker now holds."""
+    calls = []
+    slow = _service(redis_client, calls)
+    fetch = slow._fetch_access_token
+
+    async def slow_fetch():
+        # The lock lapses mid-fetch and another worker takes it
+        redis_client.set(slow.token_lock_key, "other-worker")
+        return await fetch()
+
+    slow._fetch_access_token = slow_fetch
+    await slow.get_access_token()
+
+    assert redis_client.get(slow.token_lock_key) == b"other-worker"
+    oauth_timeout = OPERATION_TIMEOUTS["oauth"]
+    assert slow.token_lock_timeout > (slow.daraja.max_retries + 1) * (oauth_timeout.connect + oauth_timeout.read)
+
+@pytest.mark.asyncio
+async def test_refresher_renews_token_before_expiry(redis_client):
+    """Test the background refresher replaces a token about to expire."""
+    calls = []
+    service = _service(redis_client, calls)
+    await service.get_access_token()
+    service._token_expiry = service._token_expiry - 3599 + service.token_refresh_margin - 1
+    redis_client.delete(service.token_key)
+
+    service.token_refresher.start()
+    await asyncio.sleep(0.2)
+    await service.token_refresher.stop()
+
+    assert len(calls) == 2
+    assert await service.get_access_token() == "token-2"
+
+def _daraja(handler) -> DarajaClient:
+    """Daraja client whose requests are answered by a local handler."""
+    client = DarajaClient("https://daraja.test")
+    client.retry_backoff = 0
+    client._client = httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(handler))
+    return client
+
+@pytest.mark.asyncio
+async def test_daraja_retries_only_where_safe():
+    """Test status queries are retried on server errors but STK pushes are not."""
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if len(calls) == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"ResultCode": 0})
+
+    client = _daraja(handler)
+    response = await client.request("transaction_status", "GET", "/mpesa/transactionstatus/v1/query")
+    assert response.json() == {"ResultCode": 0}
+    assert len(calls) == 2
+
+    calls.clear()
+    with pytest.raises(httpx.HTTPStatusError):
+        await client.request("stk_push", "POST", "/mpesa/stkpush/v1/processrequest", json={})
+    assert len(calls) == 1
+
+@pytest.mark.asyncio
+async def test_daraja_retries_stk_push_when_connection_fails():
+    """Test an STK push that never reached Daraja is sent again."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200, json={"ResponseCode": "0"})
+
+    client = _daraja(handler)
+    response = await client.request("stk_push", "POST", "/mpesa/stkpush/v1/processrequest", json={})
+
+    assert response.json() == {"ResponseCode": "0"}
+    assert len(calls) == 2
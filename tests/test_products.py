@@ -0,0 +1,144 @@
+import pytest
+import fakeredis
+import httpx
+from app.models.schemas import Product
+from app.routes.recommend import _search_filters
+from app.services.context import context_manager
+from app.services.fx import fx_service
+from app.services.products import Candidate, ProductService, NAME_MAX_LENGTH
+
+ITEM = """
+<article class="prd">
+  <a class="core" href="{href}">
+    <img class="img" data-src="https://ke.jumia.is/product/1.jpg">
+    <h3 class="name">{name}</h3><div class="prc">KSh 9,999</div>
+  </a>
+  <div class="desc">Dual SIM</div>
+</article>
+"""
+
+@pytest.fixture
+def product_service():
+    service = ProductService()
+    service.redis_client = fakeredis.FakeRedis()
+    return service
+
+@pytest.fixture
+def fx_rates(monkeypatch):
+    """Fixed rates of 130 KES to the dollar, never reloaded from Redis."""
+    monkeypatch.setattr(fx_service, "rates", {"USD": 1.0, "KES": 130.0})
+    monkeypatch.setattr(fx_service, "reload_interval", float("inf"))
+    monkeypatch.setattr(fx_service, "_checked_at", 0.0)
+
+def test_scraped_items_are_repaired_or_dropped(product_service):
+    """Test over-long names are truncated and unusable URLs dropped while parsing."""
+    html = (
+        ITEM.format(href="https://www.jumia.co.ke/long.html", name="Phone " * 40)
+        + ITEM.format(href="/relative.html", name="Phone")
+    )
+
+    candidates = product_service._parse_jumia(html, "phone")
+
+    assert len(candidates) == 1
+    assert len(candidates[0].name) == NAME_MAX_LENGTH
+    assert candidates[0].to_product().name == candidates[0].name
+
+@pytest.mark.asyncio
+async def test_search_builds_products_only_for_the_top(product_service, monkeypatch):
+    """Test every candidate is cached but only the top ``limit`` become products."""
+    async def jumia(query, filters=None):
+        return [
+            Candidate(f"Phone {i}", "", (), "https://example.com/p.jpg", 9999, "KES",
+                      f"https://www.jumia.co.ke/{i}.html", i / 100)
+            for i in range(100)
+        ]
+
+    async def nothing(query, filters=None):
+        return []
+
+    built = []
+    to_product = Candidate.to_product
+    monkeypatch.setattr(Candidate, "to_product", lambda self: built.append(self) or to_product(self))
+    monkeypatch.setattr(product_service, "_search_jumia", jumia)
+    monkeypatch.setattr(product_service, "_search_amazon", nothing)
+    monkeypatch.setattr(product_service, "_search_ebay", nothing)
+
+    products = await product_service.search_products("phone", limit=5)
+    cached = await product_service.search_products("phone", limit=5)
+
+    assert [product.name for product in products] == ["Phone 99", "Phone 98", "Phone 97", "Phone 96", "Phone 95"]
+    assert cached == products
+    assert all(isinstance(product, Product) for product in products)
+    assert len(built) == 10
+    assert len(product_service._decode_products(product_service.redis_client.get("products:phone:{}"))) == 100
+
+@pytest.mark.asyncio
+async def test_prices_are_normalized_and_filtered_by_budget(product_service, fx_rates, monkeypatch):
+    """Test vendor prices are converted to one currency and over-budget candidates never ranked."""
+
+    async def jumia(query, filters=None):
+        return [Candidate("Phone A", "", (), "https://example.com/a.jpg", 18000, "KES", "https://www.jumia.co.ke/a.html", 0.5)]
+
+    async def amazon(query, filters=None):
+        return [
+            Candidate("Phone B", "", (), "https://example.com/b.jpg", 120, "USD", "https://www.amazon.com/b", 0.9),
+            Candidate("Phone C", "", (), "https://example.com/c.jpg", 250, "USD", "https://www.amazon.com/c", 0.8)
+        ]
+
+    async def nothing(query, filters=None):
+        return []
+
+    monkeypatch.setattr(product_service, "_search_jumia", jumia)
+    monkeypatch.setattr(product_service, "_search_amazon", amazon)
+    monkeypatch.setattr(product_service, "_search_ebay", nothing)
+
+    products = await product_service.search_products("phone", {"budget": {"max": 20000, "currency": "KES"}})
+
+    assert [(product.name, product.price.value, product.price.currency) for product in products] == [
+        ("Phone B", 15600, "KES"),
+        ("Phone A", 18000, "KES")
+    ]
+
+@pytest.mark.asyncio
+async def test_budget_is_pushed_down_to_vendor_urls(product_service, fx_rates, monkeypatch):
+    """Test each vendor gets the budget as its own price filter, in its own currency."""
+    urls = []
+
+    async def get(self, url, **kwargs):
+        urls.append(url)
+        raise httpx.ConnectError("offline")
+
+    monkeypatch.setattr(httpx.AsyncClient, "get", get)
+    filters = {"language": "en", "budget": {"max": 13000, "currency": "KES"}}
+
+    await product_service._fetch_products("phone", filters)
+
+    jumia, amazon, ebay = sorted(urls, key=lambda url: ("jumia" not in url, "amazon" not in url))
+    assert jumia.endswith("/catalog/?q=phone&language=en&price=0-13000")
+    assert amazon.endswith("/s?k=phone&rh=p_36%3A-10000")
+    assert ebay.endswith("/sch/i.html?_nkw=phone&_udhi=100")
+
+@pytest.mark.asyncio
+async def test_non_price_limits_leave_results_unfiltered(product_service, fx_rates, monkeypatch):
+    """Test an "under N" that isn't a price never becomes a budget filter."""
+    async def jumia(query, filters=None):
+        return [
+            Candidate(f"Toy {i}", "", (), "https://example.com/t.jpg", 1500 * (i + 1), "KES",
+                      f"https://www.jumia.co.ke/toy-{i}.html", i / 10)
+            for i in range(3)
+        ]
+
+    async def nothing(query, filters=None):
+        return []
+
+    monkeypatch.setattr(product_service, "_search_jumia", jumia)
+    monkeypatch.setattr(product_service, "_search_amazon", nothing)
+    monkeypatch.setattr(product_service, "_search_ebay", nothing)
+    context = context_manager.new_state()
+    context_manager.record_turn(context, "toy for kids under 5 years old", "Toy for young children")
+
+    filters = _search_filters({"language": "en", "query_type": "feature_based"}, context)
+    products = await product_service.search_products("toy for kids", filters)
+
+    assert "budget" not in filters
+    assert len(products) == 3
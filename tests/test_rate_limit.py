@@ -0,0 +1,66 @@
+import pytest
+import fakeredis
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.core.rate_limit import RateLimiter, RateLimitMiddleware, mark_cache_served
+
+@pytest.fixture
+def client():
+    """App with the rate limiter over an in-memory Redis."""
+    limiter = RateLimiter()
+    limiter.redis_client = fakeredis.FakeRedis()
+    limiter._script = limiter.redis_client.register_script(limiter._script.script)
+
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+
+    @app.post(f"{settings.API_V1_STR}/tip/initiate")
+    async def initiate():
+        return {"ok": True}
+
+    @app.post(f"{settings.API_V1_STR}/tip/callback")
+    async def callback():
+        return {"ok": True}
+
+    @app.post(f"{settings.API_V1_STR}/recommend/")
+    async def recommend(cached: bool = False, limit: int = 5):
+        if cached:
+            mark_cache_served()
+        return {"ok": True}
+
+    return TestClient(app)
+
+def test_tip_route_is_limited_with_retry_after(client):
+    """Test requests past the per-route limit get 429 with Retry-After."""
+    statuses = [client.post("/api/v1/tip/initiate").status_code for _ in range(settings.RATE_LIMIT_TIP_PER_MINUTE + 1)]
+
+    assert statuses[:-1] == [200] * settings.RATE_LIMIT_TIP_PER_MINUTE
+    assert statuses[-1] == 429
+    rejected = client.post("/api/v1/tip/initiate")
+    assert int(rejected.headers["retry-after"]) >= 1
+    # Callbacks from Safaricom are never limited
+    assert client.post("/api/v1/tip/callback").status_code == 200
+
+def test_cache_served_requests_are_cheaper(client):
+    """Test cache-served recommendations may be sent at four times the rate."""
+    limit = settings.RATE_LIMIT_PER_MINUTE
+    cached = [client.post("/api/v1/recommend/?cached=true").status_code for _ in range(limit * 2)]
+    assert cached.count(429) == 0
+
+    uncached = [client.post("/api/v1/recommend/").status_code for _ in range(limit)]
+    assert 429 in uncached
+
+def test_misses_take_one_script_call_and_failures_are_refunded(client, monkeypatch):
+    """Test an uncached request is a single limiter call, and rejected input costs a cached request."""
+    calls = []
+    original = RateLimiter.hit
+    monkeypatch.setattr(RateLimiter, "hit", lambda self, *args, **kwargs: calls.append(args) or original(self, *args, **kwargs))
+
+    assert client.post("/api/v1/recommend/").status_code == 200
+    assert len(calls) == 1
+
+    limit = settings.RATE_LIMIT_PER_MINUTE
+    invalid = [client.post("/api/v1/recommend/?limit=many").status_code for _ in range(limit * 2)]
+    assert invalid.count(429) == 0
+    assert set(invalid) == {422}
@@ -0,0 +1,68 @@
+import pytest
+import fakeredis
+from datetime import timedelta
+from app.services import reconciliation
+from app.services.reconciliation import ReconciliationService
+from app.services.transactions import TransactionService
+
+@pytest.fixture
+def services(monkeypatch):
+    """Reconciler over an in-memory Redis with a scripted Daraja verifier."""
+    transaction_service = TransactionService()
+    transaction_service.redis_client = fakeredis.FakeRedis()
+    monkeypatch.setattr(reconciliation, "transaction_service", transaction_service)
+
+    outcomes = {}
+
+    async def verify_transaction(transaction_id):
+        transaction = await transaction_service.get_transaction(transaction_id)
+        if transaction["attempts"] >= 3:
+            return {"success": False, "status": "max_attempts_exceeded"}
+        await transaction_service.increment_attempts(transaction_id)
+        status = outcomes.get(transaction_id, "error")
+        if status != "error":
+            await transaction_service.update_transaction(transaction_id, {"status": status})
+        return {"success": status == "completed", "status": status}
+
+    monkeypatch.setattr(reconciliation.mpesa_service, "verify_transaction", verify_transaction)
+
+    reconciler = ReconciliationService()
+    reconciler.max_requests_per_second = 1000
+    return reconciler, transaction_service, outcomes
+
+async def _pending_transaction(transaction_service, checkout_request_id):
+    transaction = await transaction_service.create_transaction("+254700000020", 100)
+    await transaction_service.attach_checkout_request(
+        transaction["id"], checkout_request_id, {"status": "pending"}, reconcile_after=timedelta(0)
+    )
+    return transaction["id"]
+
+@pytest.mark.asyncio
+async def test_reconciler_settles_and_backs_off(services):
+    """Test settled transactions leave the queue and unsettled ones are pushed back."""
+    reconciler, transaction_service, outcomes = services
+    paid = await _pending_transaction(transaction_service, "ws_CO_paid")
+    unknown = await _pending_transaction(transaction_service, "ws_CO_unknown")
+    outcomes[paid] = "completed"
+
+    assert await reconciler.reconcile_due() == 2
+
+    queue = dict(transaction_service.redis_client.zrange(transaction_service.reconciliation_key, 0, -1, withscores=True))
+    assert (await transaction_service.get_transaction(paid))["status"] == "completed"
+    assert paid.encode() not in queue
+    assert unknown.encode() in queue
+    assert await reconciler.reconcile_due() == 0
+
+@pytest.mark.asyncio
+async def test_reconciler_gives_up_after_max_attempts(services):
+    """Test a transaction that never settles is marked failed."""
+    reconciler, transaction_service, _ = services
+    transaction_id = await _pending_transaction(transaction_service, "ws_CO_silent")
+
+    for _ in range(4):
+        await transaction_service.schedule_reconciliation(transaction_id, timedelta(0))
+        await reconciler.reconcile_due()
+
+    transaction = await transaction_service.get_transaction(transaction_id)
+    assert transaction["status"] == "failed"
+    assert transaction_service.redis_client.zcard(transaction_service.reconciliation_key) == 0
@@ -0,0 +1,49 @@
+import pytest
+import fakeredis
+import httpx
+from app.main import app
+from app.services.transactions import TransactionService, get_transaction_service
+
+@pytest.fixture
+def transactions(monkeypatch):
+    """Transaction service backed by an in-memory Redis, wired into the API."""
+    service = TransactionService()
+    service.redis_client = fakeredis.FakeRedis()
+    monkeypatch.setitem(app.dependency_overrides, get_transaction_service, lambda: service)
+    return service
+
+@pytest.fixture
+def api():
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+@pytest.mark.asyncio
+async def test_status_revalidates_with_etag(transactions, api):
+    """Test polling with If-None-Match gets 304 until the status changes."""
+    transaction = await transactions.create_transaction("+254759325915", 100)
+    url = f"/api/v1/tip/status/{transaction['id']}"
+
+    first = await api.get(url)
+    etag = first.headers["etag"]
+    unchanged = await api.get(url, headers={"If-None-Match": etag})
+
+    assert first.status_code == 200
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+
+    await transactions.update_transaction(transaction["id"], {"status": "completed"})
+    changed = await api.get(url, headers={"If-None-Match": etag})
+
+    assert changed.status_code == 200
+    assert changed.json()["status"] == "completed"
+    assert changed.headers["etag"] != etag
+
+@pytest.mark.asyncio
+async def test_large_responses_are_compressed(transactions, api):
+    """Test history pages over the size threshold are gzipped."""
+    for _ in range(20):
+        await transactions.create_transaction("+254759325915", 100)
+
+    response = await api.get("/api/v1/tip/history/+254759325915", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()["transactions"]) == 20
@@ -0,0 +1,75 @@
+import pytest
+from types import SimpleNamespace
+from app.services.nlp import NLPService
+from app.services.semantic_cache import SemanticCache, embed, cosine
+
+class CountingCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(content="Category: phone. Budget: low. Needs a good camera.")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+@pytest.fixture
+def nlp():
+    service = NLPService()
+    service.semantic_cache = SemanticCache(capacity=16, threshold=0.85)
+    completions = CountingCompletions()
+    service._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return service, completions
+
+def test_paraphrases_match_and_near_misses_do_not():
+    """Test that synonyms and word order don't matter but budgets and sizes do."""
+    assert cosine(embed("cheap phone for my mum"), embed("affordable smartphone for my mother")) > 0.99
+    assert cosine(embed("samsung or tecno which is better"), embed("tecno or samsung which is better")) >= 0.85
+    assert cosine(embed("phone under 20k"), embed("phone under 50k")) < 0.5
+    assert cosine(embed("smart tv 43 inch"), embed("smart tv 50 inch")) < 0.5
+
+@pytest.mark.asyncio
+async def test_paraphrased_query_reuses_analysis(nlp):
+    """Test that a paraphrase is answered from the cache without calling the model."""
+    service, completions = nlp
+    first = await service.process_query("I need a cheap phone with a good camera")
+    second = await service.process_query("affordable smartphone with a good camera")
+
+    assert completions.calls == 1
+    assert second["analysis"] == first["analysis"]
+
+    await service.process_query("phone under 20k")
+    assert completions.calls == 2
+
+@pytest.mark.asyncio
+async def test_queries_with_context_bypass_cache(nlp):
+    """Test that follow-up turns always reach the model."""
+    service, completions = nlp
+    context = {"category": "phones", "budget": "20000"}
+    await service.process_query("cheap phone with a good camera")
+    await service.process_query("cheap phone with a good camera", context)
+
+    assert completions.calls == 2
+    assert len(service.semantic_cache) == 1
+
+def test_cache_evicts_least_recently_used():
+    """Test that the cache stays within capacity and keeps recently used entries."""
+    cache = SemanticCache(capacity=2, threshold=0.85)
+    cache.add(embed("phone under 20k"), {"analysis": "a"})
+    cache.add(embed("smart tv 43 inch"), {"analysis": "b"})
+    assert cache.lookup(embed("phone below 20k"))[0] == {"analysis": "a"}
+
+    cache.add(embed("gaming laptop under 150k"), {"analysis": "c"})
+
+    assert len(cache) == 2
+    assert cache.lookup(embed("43 inch smart tv")) is None
+    assert cache.lookup(embed("phone under 20k"))[0] == {"analysis": "a"}
+    # Evicted entries leave no postings behind
+    assert all(cache._postings.values())
+    assert set().union(*cache._postings.values()) == set(cache._entries)
+
+def test_expired_entries_are_not_served():
+    cache = SemanticCache(capacity=4, threshold=0.85, ttl=0)
+    cache.add(embed("phone under 20k"), {"analysis": "a"})
+
+    assert cache.lookup(embed("phone under 20k")) is None
+    assert len(cache) == 0
@@ -0,0 +1,23 @@
+from app.core.lazy import LazyService
+from loadtest.import_time import measure_once
+
+def test_import_defers_heavy_sdks():
+    """Test importing the app loads no OpenAI, bs4, langdetect or Sentry code."""
+    assert measure_once()["loaded"] == []
+
+def test_lazy_service_builds_once_on_first_use():
+    """Test services are built on first attribute access and shared afterwards."""
+    built = []
+
+    class Service:
+        def __init__(self):
+            built.append(self)
+            self.redis_client = "redis"
+
+    service = LazyService(Service)
+    assert not service.is_built
+
+    service.redis_client = "fake"
+    assert service.redis_client == "fake"
+    assert service.get() is built[0]
+    assert len(built) == 1
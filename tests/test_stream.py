@@ -0,0 +1,128 @@
+import json
+import pytest
+import fakeredis
+import httpx
+from types import SimpleNamespace
+from prometheus_client import REGISTRY
+from app.main import app
+from app.services.nlp import NLPService, get_nlp_service
+from app.services.products import Candidate, ProductService, get_product_service
+from app.services.sessions import SessionService, get_session_service
+
+CLARIFICATION = ["What ", "is your ", "budget?"]
+
+class StreamingCompletions:
+    """Chat completions in the openai 1.x shape, streamed when asked."""
+
+    def __init__(self):
+        self.in_flight = []  # The stream endpoint's in-flight gauge, read mid-stream
+
+    async def create(self, messages, stream=False, **kwargs):
+        if stream:
+            return self._stream()
+        query = messages[-1]["content"]
+        analysis = "Unclear what the user needs" if "something" in query else "Category: phone"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=analysis))])
+
+    async def _stream(self):
+        self.in_flight.append(_in_flight())
+        for token in CLARIFICATION:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+        # The final chunk carries no content
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None))])
+
+def _in_flight() -> float:
+    return REGISTRY.get_sample_value("recommendations_in_flight", {"route": "stream_recommendations"}) or 0.0
+
+@pytest.fixture
+def completions():
+    return StreamingCompletions()
+
+@pytest.fixture
+def sessions():
+    sessions = SessionService()
+    sessions.redis_client = fakeredis.FakeRedis()
+    return sessions
+
+@pytest.fixture
+def api(monkeypatch, completions, sessions):
+    """API client with a stubbed model client, stubbed vendors and in-memory Redis."""
+    nlp = NLPService()
+    nlp.semantic_cache = None
+    nlp._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    products = ProductService()
+    products.redis_client = fakeredis.FakeRedis()
+
+    async def jumia(query, filters=None):
+        return [Candidate("Tecno Spark 20", "6.6 inch display", (), "https://example.com/spark.jpg", 15999, "KES",
+                          "https://www.jumia.co.ke/spark-20.html", 0.9)]
+
+    async def nothing(query, filters=None):
+        return []
+
+    monkeypatch.setattr(products, "_search_jumia", jumia)
+    monkeypatch.setattr(products, "_search_amazon", nothing)
+    monkeypatch.setattr(products, "_search_ebay", nothing)
+
+    monkeypatch.setitem(app.dependency_overrides, get_nlp_service, lambda: nlp)
+    monkeypatch.setitem(app.dependency_overrides, get_product_service, lambda: products)
+    monkeypatch.setitem(app.dependency_overrides, get_session_service, lambda: sessions)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+def _events(body: str):
+    """Parse a Server-Sent Events body into ``(event, data)`` pairs."""
+    events = []
+    for message in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in message.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+@pytest.mark.asyncio
+async def test_clarification_is_streamed_token_by_token(api, completions, sessions):
+    """Test token events carry the model's tokens and done carries the saved question."""
+    async with api:
+        response = await api.post("/api/v1/recommend/stream", json={"query": "I need something"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response.text)
+    assert events[:-1] == [("token", {"token": token}) for token in CLARIFICATION]
+    event, done = events[-1]
+    assert event == "done"
+    assert done["clarification"] == "What is your budget?"
+
+    session = await sessions.get_session(done["session_id"])
+    assert session["clarification"] == "What is your budget?"
+    assert session["query"] == "I need something"
+    assert session["context"]["turns"][0]["query"] == "I need something"
+    # The stream counts as in flight while its body is being sent
+    assert completions.in_flight == [1.0]
+    assert _in_flight() == 0
+
+@pytest.mark.asyncio
+async def test_recommendations_arrive_as_one_result_event(api, sessions):
+    """Test a clear query streams a single result event and saves its context."""
+    async with api:
+        response = await api.post("/api/v1/recommend/stream", json={"query": "phone with a good camera"})
+
+    [(event, result)] = _events(response.text)
+    assert event == "result"
+    assert result["clarification"] is None
+    assert [product["name"] for product in result["products"]] == ["Tecno Spark 20"]
+
+    session = await sessions.get_session(result["session_id"])
+    assert session["context"]["turns"][0]["analysis"] == "Category: phone"
+
+@pytest.mark.asyncio
+async def test_clarification_context_goes_through_the_injected_sessions(api, sessions):
+    """Test follow-ups load and save their context with the request's session service."""
+    await sessions.save_session("s1", {"context": {"constraints": {}, "summary": "", "turns": [
+        {"query": "I need something", "analysis": "Unclear what the user needs"}
+    ]}})
+    async with api:
+        response = await api.post("/api/v1/recommend/clarify?session_id=s1", json={"query": "a phone with a good camera"})
+
+    assert response.status_code == 200
+    turns = (await sessions.get_session("s1"))["context"]["turns"]
+    assert [turn["query"] for turn in turns] == ["I need something", "a phone with a good camera"]
@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+import httpx
+from fastapi import FastAPI
+from app.core.config import settings
+from app.core.timing import ServerTimingMiddleware, timed_stage
+from app.core.tracing import AdaptiveTracesSampler
+from app.main import app as api_app
+
+@pytest.mark.asyncio
+async def test_server_timing_lists_stages_from_concurrent_tasks():
+    """Test stages recorded in spawned tasks reach the request's Server-Timing header."""
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware)
+
+    async def search():
+        with timed_stage("html_parse"):
+            await asyncio.sleep(0)
+
+    @app.get("/")
+    async def index():
+        with timed_stage("language_detection"):
+            pass
+        await asyncio.gather(search(), search())
+        return {}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/")
+
+    header = response.headers["server-timing"]
+    assert "language_detection;dur=" in header
+    assert 'html_parse;dur=' in header and 'desc="x2"' in header
+    assert "total;dur=" in header
+
+@pytest.mark.asyncio
+async def test_profile_requires_admin_key(monkeypatch):
+    """Test the profiler is hidden without a key and returns folded stacks with one."""
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", "secret")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api_app), base_url="http://test") as client:
+        denied = await client.post("/admin/profile", params={"seconds": 0.1})
+        response = await client.post(
+            "/admin/profile",
+            params={"seconds": 0.2, "interval_ms": 1},
+            headers={"X-Admin-Key": "secret"}
+        )
+
+    assert denied.status_code == 403
+    assert response.status_code == 200
+    stack, count = response.text.splitlines()[0].rsplit(" ", 1)
+    assert ";" in stack and int(count) > 0
+
+def test_traces_sampler_adapts_to_load():
+    """Test the sample rate drops under load to stay within the trace budget."""
+    sampler = AdaptiveTracesSampler(base_rate=0.5, max_per_second=2)
+
+    assert sampler({"asgi_scope": {"path": "/health"}}) == 0.0
+    assert sampler({"parent_sampled": True}) == 1.0
+    assert sampler.current_rate(2) == 0.5
+    assert sampler.current_rate(100) == pytest.approx(0.02)
@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+import fakeredis
+import httpx
+from app.main import app
+from app.services.callbacks import callback_service
+from app.services.daraja import DarajaClient
+from app.services.idempotency import idempotency_service
+from app.services.mpesa import mpesa_service
+from app.services.reconciliation import reconciliation_service
+from app.services.transactions import transaction_service
+from loadtest.daraja_stub import StubConfig, create_app
+
+@pytest.fixture
+def daraja_stub(monkeypatch):
+    """Run the M-Pesa path against the local Daraja stand-in, all in-process."""
+    redis_client = fakeredis.FakeRedis()
+    for service in (transaction_service, callback_service, idempotency_service, mpesa_service):
+        monkeypatch.setattr(service, "redis_client", redis_client)
+    monkeypatch.setattr(mpesa_service, "_access_token", None)
+    monkeypatch.setattr(mpesa_service, "_token_expiry", 0.0)
+
+    config = StubConfig(callback_delay=0)
+    stub = create_app(config, callback_transport=httpx.ASGITransport(app=app))
+    daraja = DarajaClient("http://daraja.stub")
+    daraja._client = httpx.AsyncClient(base_url=daraja.base_url, transport=httpx.ASGITransport(app=stub))
+    monkeypatch.setattr(mpesa_service, "daraja", daraja)
+    return stub
+
+@pytest.fixture
+def api():
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+async def _initiate(api) -> str:
+    response = await api.post("/api/v1/tip/initiate", json={"phone_number": "+254759325915", "amount": 100})
+    assert response.status_code == 200
+    assert response.json()["status"] == "pending"
+    return response.json()["transaction_id"]
+
+@pytest.mark.asyncio
+async def test_tip_settles_through_callback(daraja_stub, api):
+    """Test initiate -> STK push -> callback -> completed status, offline."""
+    transaction_id = await _initiate(api)
+
+    await asyncio.gather(*daraja_stub.state.callback_tasks)
+    assert await callback_service.process_batch() == 1
+
+    status = await api.get(f"/api/v1/tip/status/{transaction_id}")
+    assert status.json()["status"] == "completed"
+
+@pytest.mark.asyncio
+async def test_tip_settles_through_reconciliation(daraja_stub, api):
+    """Test a tip whose callback is lost is settled by the reconciler."""
+    daraja_stub.state.config.callback_drop_rate = 1.0
+    daraja_stub.state.config.callback_success_rate = 0.0
+    transaction_id = await _initiate(api)
+
+    await reconciliation_service._reconcile(transaction_id)
+
+    status = await api.get(f"/api/v1/tip/status/{transaction_id}")
+    assert status.json()["status"] == "failed"
@@ -0,0 +1,115 @@
+import asyncio
+import pytest
+import time
+import fakeredis
+from concurrent.futures import ThreadPoolExecutor
+from app.services.transactions import TransactionService, generate_transaction_id
+
+class _SlowRedis(fakeredis.FakeRedis):
+    """In-memory Redis with a network-like delay on every command."""
+
+    def execute_command(self, *args, **kwargs):
+        time.sleep(0.001)
+        return super().execute_command(*args, **kwargs)
+
+    def pipeline(self, *args, **kwargs):
+        pipe = super().pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        def slow_execute(*args, **kwargs):
+            time.sleep(0.001)
+            return execute(*args, **kwargs)
+
+        pipe.execute = slow_execute
+        return pipe
+
+@pytest.fixture
+def service():
+    """Transaction service backed by an in-memory Redis."""
+    service = TransactionService()
+    service.redis_client = fakeredis.FakeRedis()
+    return service
+
+@pytest.mark.asyncio
+async def test_history_pagination(service):
+    """Test history pages come from the phone index, newest first."""
+    created = [await service.create_transaction("+254700000001", 100 + i) for i in range(5)]
+    await service.create_transaction("+254700000002", 50)
+
+    first, cursor = await service.get_transaction_page("+254700000001", limit=2)
+    second, cursor = await service.get_transaction_page("+254700000001", limit=2, cursor=cursor)
+    third, cursor = await service.get_transaction_page("+254700000001", limit=2, cursor=cursor)
+
+    assert cursor is None
+    amounts = [t["amount"] for t in first + second + third]
+    assert amounts == [104, 103, 102, 101, 100]
+    assert all(t["phone_number"] == "+254700000001" for t in first + second + third)
+    assert len(created) == 5
+
+@pytest.mark.asyncio
+async def test_history_prunes_expired_transactions(service):
+    """Test index entries are dropped once their transaction expires."""
+    transaction = await service.create_transaction("+254700000003", 100)
+    service.redis_client.delete(f"transaction:{transaction['id']}")
+
+    page, cursor = await service.get_transaction_page("+254700000003")
+
+    assert page == []
+    assert service.redis_client.zcard("transactions:phone:+254700000003") == 0
+
+def test_parallel_updates_are_not_lost(service):
+    """Test concurrent updates to one transaction all land."""
+    service.redis_client = _SlowRedis()
+    transaction = asyncio.run(service.create_transaction("+254700000004", 100))
+    workers = 50
+
+    def worker(i: int):
+        asyncio.run(service.increment_attempts(transaction["id"], error=f"attempt {i}"))
+        asyncio.run(service.update_transaction(transaction["id"], {f"field_{i}": i}))
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(worker, range(workers)))
+
+    stored = asyncio.run(service.get_transaction(transaction["id"]))
+    assert stored["attempts"] == workers
+    assert all(stored[f"field_{i}"] == i for i in range(workers))
+    assert service.redis_client.ttl(f"transaction:{transaction['id']}") > 0
+
+@pytest.mark.asyncio
+async def test_completed_status_is_final(service):
+    """Test a late update cannot move a completed transaction to another status."""
+    transaction = await service.create_transaction("+254700000005", 100)
+    await service.update_transaction(transaction["id"], {"status": "completed"})
+
+    updated = await service.update_transaction(transaction["id"], {"status": "error", "error": "timeout"})
+
+    assert updated["status"] == "completed"
+    assert updated["error"] == "timeout"
+
+def test_transaction_ids_are_unique_and_sortable():
+    """Test IDs generated in the same second neither collide nor lose ordering."""
+    ids = []
+    for _ in range(1000):
+        ids.append(generate_transaction_id())
+        time.sleep(0.00001)
+
+    assert len(set(ids)) == len(ids)
+    assert ids[0] < ids[-1]
+    assert all(len(transaction_id) == 30 for transaction_id in ids)
+
+@pytest.mark.asyncio
+async def test_checkout_request_lookup(service):
+    """Test a CheckoutRequestID resolves to its transaction after the STK push."""
+    transaction = await service.create_transaction("+254700000006", 100)
+    await service.attach_checkout_request(
+        transaction["id"],
+        "ws_CO_123",
+        {"status": "pending", "stk_push_response": {"ResponseCode": "0"}}
+    )
+
+    transaction_id = await service.get_transaction_id_by_checkout("ws_CO_123")
+    stored = await service.get_transaction(transaction_id)
+
+    assert transaction_id == transaction["id"]
+    assert stored["stk_push_id"] == "ws_CO_123"
+    assert await service.get_transaction_id_by_checkout("ws_CO_unknown") is None
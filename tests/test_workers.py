@@ -0,0 +1,32 @@
+import asyncio
+import pytest
+from app.core.workers import PeriodicWorker
+
+class FlakyWorker(PeriodicWorker):
+    """Fails its first round, then counts rounds."""
+
+    error_delay = 0.01
+
+    def __init__(self):
+        super().__init__()
+        self.rounds = 0
+
+    async def tick(self) -> float:
+        self.rounds += 1
+        if self.rounds == 1:
+            raise RuntimeError("vendor down")
+        return 0.01
+
+@pytest.mark.asyncio
+async def test_worker_survives_errors_until_stopped():
+    """Test a failing round is retried after error_delay and stop ends the loop."""
+    worker = FlakyWorker()
+    worker.start()
+    worker.start()  # Already running; no second task
+    await asyncio.sleep(0.1)
+    await worker.stop()
+
+    rounds = worker.rounds
+    assert rounds > 2
+    await asyncio.sleep(0.05)
+    assert worker.rounds == rounds